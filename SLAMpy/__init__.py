@@ -20,3 +20,14 @@ doi:10.3318/bioe.2016.22, 2016.
 
 from .scenario import Scenario, ScenarioV2, ScenarioV3
 from .scenariolist import ScenarioList
+from .batch import run_batch
+
+try:
+    from ._cache import SourceCache, StageCheckpoint
+except ImportError:  # arcpy is only required to run scenarios with the 'arcpy' backend
+    pass
+
+try:
+    from .executor import ScenarioExecutor
+except ImportError:  # concurrent.futures is not available in Python 2 (unless its backport is installed)
+    pass
@@ -0,0 +1,328 @@
+from os import path, sep, listdir, makedirs, remove, rename
+import hashlib
+import json
+import shutil
+import time
+import arcpy
+
+try:
+    string_types = basestring
+except NameError:  # i.e. Python 3
+    string_types = str
+
+
+# to increment whenever a change in the source tools alters their outputs, so that older entries are not reused
+_cache_version = '2'
+
+
+class SourceCache(object):
+    """Cache of the outputs of the source tools, stored in a folder with
+    one file geodatabase per entry.
+
+    An entry is identified by a fingerprint of the location (its
+    geometries and attributes, which reflect the selection made in the
+    region), of the input datasets (their own path and content, rather
+    than those of the geodatabase or workbook containing them),
+    of the other parameters of the tool (e.g. the nutrient, the fields),
+    and of the tool version. Any change in one of these leads to a
+    different entry, so that stale entries are never reused, they are
+    only evicted when the cache exceeds its maximum size (least recently
+    used entries first).
+    """
+    def __init__(self, folder, max_size=None):
+        """
+        :param folder: path of the folder where to store the cache entries (created if it does not exist) [required]
+        :type folder: str
+        :param max_size: maximum size of the cache in megabytes, no eviction if not provided [optional]
+        :type max_size: float
+        """
+        if not path.isdir(folder):
+            makedirs(folder)
+        self.folder = folder
+        self.max_size = max_size
+
+        self._index_file = sep.join([folder, 'index.json'])
+        self._index = self._load_index()
+
+    def _load_index(self):
+        if path.isfile(self._index_file):
+            with open(self._index_file, 'r') as f:
+                return json.load(f)
+        return dict()
+
+    def _save_index(self):
+        with open(self._index_file, 'w') as f:
+            json.dump(self._index, f, indent=1, sort_keys=True)
+
+    def _entry_gdb(self, key):
+        return sep.join([self.folder, '{}.gdb'.format(key)])
+
+    def key(self, tool, nutrient, location, arguments):
+        """
+        :param tool: name of the geoprocessing function producing the outputs [required]
+        :type tool: str
+        :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+        :type nutrient: str
+        :param location: fingerprint of the location of interest (see location_fingerprint) [required]
+        :type location: str
+        :param arguments: other arguments of the geoprocessing function (input datasets, field names, etc.) [required]
+        :type arguments: list
+        :return: the fingerprint identifying the outputs of the tool for these inputs
+        :rtype: str
+        """
+        return stage_key(tool, nutrient, location, arguments)
+
+    def fetch(self, key, project_name, out_gdb):
+        """Copy the outputs stored for the given key into the output geodatabase.
+
+        :return: the paths of the outputs copied (named as if they were produced for project_name), or None if the
+            cache does not contain an entry for this key
+        :rtype: tuple
+        """
+        entry = self._index.get(key)
+        if entry is None or not arcpy.Exists(self._entry_gdb(key)):
+            return None
+
+        outputs = list()
+        for name in entry['outputs']:
+            output = sep.join([out_gdb, project_name + name[len(entry['project']):]])
+            arcpy.Copy_management(in_data=sep.join([self._entry_gdb(key), name]), out_data=output)
+            outputs.append(output)
+
+        entry['last_used'] = time.time()
+        self._save_index()
+
+        return tuple(outputs)
+
+    def store(self, key, project_name, outputs, arguments):
+        """Copy the outputs produced by a tool into a new entry of the cache.
+
+        :param arguments: arguments of the geoprocessing function used to produce the outputs, the input datasets
+            amongst them are recorded for invalidation [required]
+        :type arguments: list
+        """
+        entry_gdb = self._entry_gdb(key)
+        if arcpy.Exists(entry_gdb):
+            arcpy.Delete_management(entry_gdb)
+        arcpy.CreateFileGDB_management(out_folder_path=self.folder, out_name=path.basename(entry_gdb))
+
+        for output in outputs:
+            arcpy.Copy_management(in_data=output, out_data=sep.join([entry_gdb, path.basename(output)]))
+
+        self._index[key] = {
+            'project': project_name,
+            'outputs': [path.basename(output) for output in outputs],
+            'dependencies': [_normalise(argument) for argument in arguments if _is_dataset(argument)],
+            'size': _folder_size(entry_gdb),
+            'last_used': time.time()
+        }
+        self._evict()
+        self._save_index()
+
+    def _remove(self, key):
+        entry_gdb = self._entry_gdb(key)
+        if arcpy.Exists(entry_gdb):
+            arcpy.Delete_management(entry_gdb)
+        elif path.isdir(entry_gdb):
+            shutil.rmtree(entry_gdb, ignore_errors=True)
+        del self._index[key]
+
+    def _evict(self):
+        # remove the least recently used entries until the cache fits within its maximum size
+        if self.max_size is None:
+            return
+        for key in sorted(self._index, key=lambda k: self._index[k]['last_used']):
+            if self.size() <= self.max_size:
+                break
+            self._remove(key)
+
+    def size(self):
+        """
+        :return: the size of all the entries in the cache in megabytes
+        :rtype: float
+        """
+        return sum(entry['size'] for entry in self._index.values()) / 1024. ** 2
+
+    def invalidate(self, dataset):
+        """Remove all the entries that were produced using the given input dataset.
+
+        :param dataset: path of the input dataset (e.g. feature class, table) [required]
+        :type dataset: str
+        :return: the number of entries removed
+        :rtype: int
+        """
+        dataset = _normalise(dataset)
+        keys = [key for key, entry in self._index.items() if dataset in entry['dependencies']]
+        for key in keys:
+            self._remove(key)
+        self._save_index()
+
+        return len(keys)
+
+    def clear(self):
+        """Remove all the entries in the cache."""
+        for key in list(self._index):
+            self._remove(key)
+        self._save_index()
+
+
+class StageCheckpoint(object):
+    """Manifest of the source stages completed during a run, stored in
+    a JSON file updated after each stage, so that a run interrupted
+    (e.g. killed) can be resumed without running these stages again.
+
+    A stage is recorded with the paths of its outputs, their number of
+    rows, the paths of its input datasets, and a key identifying the
+    stage for its inputs (see stage_key). A stage recorded is only
+    skipped if its key is unchanged and if its outputs still exist
+    with the same number of rows.
+    """
+    def __init__(self, manifest):
+        """
+        :param manifest: path of the JSON file of the manifest (created if it does not exist) [required]
+        :type manifest: str
+        """
+        self.manifest = manifest
+        self._stages = dict()
+        if path.isfile(manifest):
+            with open(manifest, 'r') as f:
+                self._stages = json.load(f)
+
+    def _save(self):
+        # write the manifest in full before replacing the previous one, so that it is never left truncated
+        temporary = self.manifest + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self._stages, f, indent=1, sort_keys=True)
+        if path.isfile(self.manifest):
+            remove(self.manifest)
+        rename(temporary, self.manifest)
+
+    def fetch(self, name, key):
+        """
+        :param name: name of the stage (e.g. 'agri') [required]
+        :type name: str
+        :param key: the fingerprint identifying the stage for its inputs (see stage_key) [required]
+        :type key: str
+        :return: the paths of the outputs of the stage, or None if the stage was not completed for these inputs, or
+            if its outputs were deleted or modified since
+        :rtype: tuple
+        """
+        entry = self._stages.get(name)
+        if entry is None or not entry['key'] == key:
+            return None
+        for output, count in zip(entry['outputs'], entry['counts']):
+            if not arcpy.Exists(output) or not _row_count(output) == count:
+                return None
+
+        return tuple(entry['outputs'])
+
+    def record(self, name, key, outputs, arguments):
+        """Record a stage as completed in the manifest.
+
+        :param arguments: arguments of the geoprocessing function used to produce the outputs [required]
+        :type arguments: list
+        """
+        self._stages[name] = {
+            'key': key,
+            'outputs': list(outputs),
+            'counts': [_row_count(output) for output in outputs],
+            'inputs': [_normalise(argument) for argument in arguments if _is_dataset(argument)],
+            'completed': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        self._save()
+
+    def clear(self):
+        """Remove all the stages from the manifest."""
+        self._stages = dict()
+        self._save()
+
+
+def stage_key(tool, nutrient, location, arguments):
+    """
+    :param tool: name of the geoprocessing function producing the outputs [required]
+    :type tool: str
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :param location: fingerprint of the location of interest (see location_fingerprint) [required]
+    :type location: str
+    :param arguments: other arguments of the geoprocessing function (input datasets, field names, etc.) [required]
+    :type arguments: list
+    :return: the fingerprint identifying the outputs of the tool for these inputs
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for part in [_cache_version, tool, nutrient, location] + \
+            [argument_fingerprint(argument) for argument in arguments]:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'|')
+
+    return digest.hexdigest()
+
+
+def location_fingerprint(location):
+    # the location is often re-created at each run (i.e. selection), so only its content is used
+    return _content_digest(location, arcpy.Describe(location))
+
+
+def dataset_fingerprint(dataset):
+    """
+    :param dataset: path of the dataset (e.g. feature class, table, sheet of a workbook) [required]
+    :type dataset: str
+    :return: the fingerprint of the dataset itself, i.e. its path and its type, and the digest of its content for
+        a table or a feature class (so that the other datasets stored in the same geodatabase or workbook do not
+        affect it)
+    :rtype: str
+    """
+    description = arcpy.Describe(dataset)
+    identity = '{}:{}'.format(_normalise(description.catalogPath), description.dataType)
+    if description.dataType not in _tabular_types:
+        return identity
+
+    return '{}@{}'.format(identity, _content_digest(dataset, description))
+
+
+def argument_fingerprint(argument):
+    # the datasets are identified by their path and their content, other arguments by their value
+    if _is_dataset(argument):
+        return dataset_fingerprint(argument)
+    return repr(argument)
+
+
+# the types of datasets whose rows are read for their fingerprint
+_tabular_types = ('FeatureClass', 'Table', 'ShapeFile', 'DbaseTable', 'TextFile', 'FeatureLayer', 'TableView')
+
+
+def _is_dataset(argument):
+    return isinstance(argument, string_types) and bool(argument) and arcpy.Exists(argument)
+
+
+def _content_digest(dataset, description):
+    # the spatial reference, the schema, and the values of the rows (including the geometries) of the dataset
+    digest = hashlib.sha1()
+    spatial_reference = getattr(description, 'spatialReference', None)
+    digest.update(str(getattr(spatial_reference, 'factoryCode', None)).encode('utf-8'))
+    fields = [field for field in arcpy.ListFields(dataset) if field.type not in ('OID', 'Geometry')
+              and field.name.lower() not in ('shape_length', 'shape_area')]
+    digest.update(repr([(field.name, field.type) for field in fields]).encode('utf-8'))
+
+    geometry = ['SHAPE@WKB'] if hasattr(description, 'shapeType') else []
+    with arcpy.da.SearchCursor(dataset, geometry + [field.name for field in fields]) as cursor:
+        for row in cursor:
+            if geometry:
+                digest.update(bytes(row[0]))
+            digest.update(repr(row[len(geometry):]).encode('utf-8'))
+
+    return digest.hexdigest()
+
+
+def _folder_size(folder):
+    return sum(path.getsize(sep.join([folder, name])) for name in listdir(folder)
+               if path.isfile(sep.join([folder, name])))
+
+
+def _normalise(dataset):
+    return path.normcase(path.abspath(dataset))
+
+
+def _row_count(dataset):
+    return int(arcpy.GetCount_management(dataset).getOutput(0))
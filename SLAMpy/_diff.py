@@ -0,0 +1,75 @@
+from collections import OrderedDict
+import numpy as np
+
+
+def deltas(loads, baseline):
+    """
+    :param loads: the loads to compare against the baseline [required]
+    :type loads: numpy.ndarray
+    :param baseline: the loads of the baseline (of the same shape as loads, or broadcastable to it) [required]
+    :type baseline: numpy.ndarray
+    :return: the absolute changes, and the relative changes in percent (NaN where the baseline is zero)
+    :rtype: tuple
+    """
+    delta = loads - baseline
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(baseline == 0, np.nan, 100 * delta / baseline)
+
+    return delta, relative
+
+
+def top_k(changes, k):
+    """
+    :param changes: the changes for each basin (rows) in each column (e.g. each scenario) [required]
+    :type changes: numpy.ndarray
+    :param k: the number of basins to keep in each column [required]
+    :type k: int
+    :return: the positions of the basins with the k largest changes in magnitude in each column (k x column),
+        sorted by decreasing magnitude, where NaN changes come last
+    :rtype: numpy.ndarray
+    """
+    magnitude = np.abs(changes)
+    magnitude = np.where(np.isnan(magnitude), -1., magnitude)
+    k = min(k, magnitude.shape[0])
+    if k == 0:
+        return np.empty((0, magnitude.shape[1]), dtype=int)
+
+    # only sort the k largest changes selected in linear time
+    positions = np.argpartition(-magnitude, k - 1, axis=0)[:k]
+    order = np.argsort(-np.take_along_axis(magnitude, positions, axis=0), axis=0, kind='mergesort')
+
+    return np.take_along_axis(positions, order, axis=0)
+
+
+def statistics(loads, baseline):
+    """Calculate the summary statistics of the changes between the loads
+    and the baseline in each column at once, where null values (as NaN)
+    are ignored.
+
+    :param loads: the loads for each basin (rows) in each column (e.g. each scenario, each source) [required]
+    :type loads: numpy.ndarray
+    :param baseline: the loads of the baseline (of the same shape as loads, or broadcastable to it) [required]
+    :type baseline: numpy.ndarray
+    :return: arrays of the values of the statistics (one value per column) by statistic name
+    :rtype: collections.OrderedDict
+    """
+    delta = loads - baseline
+    valid = ~np.isnan(delta)
+    count = valid.sum(axis=0)
+    filled = np.where(valid, delta, 0.)
+
+    stats = OrderedDict()
+    stats['baseline'] = np.nansum(np.broadcast_to(baseline, loads.shape), axis=0)
+    stats['load'] = np.nansum(loads, axis=0)
+    stats['delta'] = stats['load'] - stats['baseline']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats['relative'] = np.where(stats['baseline'] == 0, np.nan, 100 * stats['delta'] / stats['baseline'])
+        stats['mean'] = np.where(count == 0, np.nan, filled.sum(axis=0) / count)
+        stats['std'] = np.where(count == 0, np.nan,
+                                np.sqrt(np.where(valid, (delta - stats['mean']) ** 2, 0.).sum(axis=0) / count))
+    stats['min'] = np.where(count == 0, np.nan, np.where(valid, delta, np.inf).min(axis=0))
+    stats['max'] = np.where(count == 0, np.nan, np.where(valid, delta, -np.inf).max(axis=0))
+    stats['increased'] = (filled > 0).sum(axis=0)
+    stats['decreased'] = (filled < 0).sum(axis=0)
+
+    return stats
@@ -1,6 +1,8 @@
 from os import path, sep
 import arcpy
 
+from ._fields import calculate_fields, area_ha, product
+
 
 class AgriV2(object):
     def __init__(self):
@@ -109,7 +111,7 @@ class AgriV2(object):
 
 
 def agri_v2_geoprocessing(project_name, nutrient, location, in_arable, in_pasture, out_gdb, messages,
-                          out_arable=None, out_pasture=None):
+                          out_arable=None, out_pasture=None, in_overlay_arable=None, in_overlay_pasture=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -129,6 +131,14 @@ def agri_v2_geoprocessing(project_name, nutrient, location, in_arable, in_pastur
     :type out_arable: str
     :param out_pasture: path of the output feature class for pasture nutrient load [optional]
     :type out_pasture: str
+    :param in_overlay_arable: path of the feature class of the arable data already intersected with the location
+        (e.g. the output of this tool for the other nutrient) to use instead of processing in_arable again
+        [optional]
+    :type in_overlay_arable: str
+    :param in_overlay_pasture: path of the feature class of the pasture data already intersected with the location
+        (e.g. the output of this tool for the other nutrient) to use instead of processing in_pasture again
+        [optional]
+    :type in_overlay_pasture: str
     """
     # calculate load for arable
     messages.addMessage("> Calculating {} load for Arable.".format(nutrient))
@@ -136,26 +146,17 @@ def agri_v2_geoprocessing(project_name, nutrient, location, in_arable, in_pastur
     if not out_arable:
         out_arable = sep.join([out_gdb, project_name + '_{}_Arable'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, in_arable], out_feature_class=out_arable,
-                             join_attributes="ALL", output_type="INPUT")
-
-    arcpy.AddField_management(in_table=out_arable, field_name="Area_ha", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_arable, field="Area_ha",
-                                    expression="!shape.area@hectares!",
-                                    expression_type="PYTHON_9.3")
+    if in_overlay_arable:  # i.e. in_arable already intersected with location (e.g. for the other nutrient)
+        arcpy.CopyFeatures_management(in_features=in_overlay_arable, out_feature_class=out_arable)
+    else:
+        arcpy.Intersect_analysis(in_features=[location, in_arable], out_feature_class=out_arable,
+                                 join_attributes="ALL", output_type="INPUT")
 
-    arcpy.AddField_management(in_table=out_arable, field_name="GWArab2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_arable, field="GWArab2calc",
-                                    expression="!{}SwFromGw! * !Area_ha!".format(nutrient.lower()),
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_arable, field_name="Arab2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_arable, field="Arab2calc",
-                                    expression="!{}TotaltoSWreceptor! * !Area_ha!".format(nutrient.lower()),
-                                    expression_type="PYTHON_9.3")
+    sw_from_gw, total_to_sw = '{}SwFromGw'.format(nutrient.lower()), '{}TotaltoSWreceptor'.format(nutrient.lower())
+    calculate_fields(in_table=out_arable, in_fields=['SHAPE@AREA', sw_from_gw, total_to_sw],
+                     out_fields=[("Area_ha", area_ha(out_arable)),
+                                 ("GWArab2calc", lambda v: product(v[sw_from_gw], v["Area_ha"])),
+                                 ("Arab2calc", lambda v: product(v[total_to_sw], v["Area_ha"]))])
 
     # calculate load for pasture
     messages.addMessage("> Calculating {} load for Pasture.".format(nutrient))
@@ -163,26 +164,16 @@ def agri_v2_geoprocessing(project_name, nutrient, location, in_arable, in_pastur
     if not out_pasture:
         out_pasture = sep.join([out_gdb, project_name + '_{}_Pasture'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, in_pasture], out_feature_class=out_pasture,
-                             join_attributes="ALL", output_type="INPUT")
-
-    arcpy.AddField_management(in_table=out_pasture, field_name="Area_ha", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_pasture, field="Area_ha",
-                                    expression="!shape.area@hectares!",
-                                    expression_type="PYTHON_9.3")
+    if in_overlay_pasture:  # i.e. in_pasture already intersected with location (e.g. for the other nutrient)
+        arcpy.CopyFeatures_management(in_features=in_overlay_pasture, out_feature_class=out_pasture)
+    else:
+        arcpy.Intersect_analysis(in_features=[location, in_pasture], out_feature_class=out_pasture,
+                                 join_attributes="ALL", output_type="INPUT")
 
-    arcpy.AddField_management(in_table=out_pasture, field_name="GWPast2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_pasture, field="GWPast2calc",
-                                    expression="!{}SwFromGw! * !Area_ha!".format(nutrient.lower()),
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_pasture, field_name="Past2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_pasture, field="Past2calc",
-                                    expression="!{}TotaltoSWreceptor! * !Area_ha!".format(nutrient.lower()),
-                                    expression_type="PYTHON_9.3")
+    calculate_fields(in_table=out_pasture, in_fields=['SHAPE@AREA', sw_from_gw, total_to_sw],
+                     out_fields=[("Area_ha", area_ha(out_pasture)),
+                                 ("GWPast2calc", lambda v: product(v[sw_from_gw], v["Area_ha"])),
+                                 ("Past2calc", lambda v: product(v[total_to_sw], v["Area_ha"]))])
 
     return out_arable, out_pasture
 
@@ -1,6 +1,8 @@
 from os import path, sep
 import arcpy
 
+from ._fields import calculate_fields, area_ha, product
+
 
 class AtmosV2(object):
     def __init__(self):
@@ -100,7 +102,7 @@ class AtmosV2(object):
 
 
 def atmos_v2_geoprocessing(project_name, nutrient, location, in_atm_depo, out_gdb, messages,
-                           out_atm_depo=None):
+                           out_atm_depo=None, in_overlay=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -116,6 +118,10 @@ def atmos_v2_geoprocessing(project_name, nutrient, location, in_atm_depo, out_gd
     :type messages: instance of a class featuring a 'addMessage' method
     :param out_atm_depo: path of the output feature class for atmospheric deposition load [optional]
     :type out_atm_depo: str
+    :param in_overlay: path of the feature class of the atmospheric deposition data already intersected with the
+        location (e.g. the output of this tool for the other nutrient) to use instead of processing in_atm_depo
+        again [optional]
+    :type in_overlay: str
     """
     # calculate load for atmospheric deposition
     messages.addMessage("> Calculating {} load for Atmospheric Deposition.".format(nutrient))
@@ -123,25 +129,16 @@ def atmos_v2_geoprocessing(project_name, nutrient, location, in_atm_depo, out_gd
     if not out_atm_depo:
         out_atm_depo = sep.join([out_gdb, project_name + '_{}_AtmDepo'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, in_atm_depo], out_feature_class=out_atm_depo,
-                             join_attributes="ALL", output_type="INPUT")
-
-    arcpy.AddField_management(in_table=out_atm_depo, field_name="Area_ha", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_atm_depo, field="Area_ha",
-                                    expression="!shape.area@hectares!",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_atm_depo, field_name="AtmRate", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_atm_depo, field="AtmRate",
-                                    expression="!{}_Dep_tot!".format(nutrient),
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_atm_depo, field_name="Atm2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_atm_depo, field="Atm2calc",
-                                    expression="!AtmRate! * !Area_ha!".format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    if in_overlay:  # i.e. in_atm_depo already intersected with location (e.g. for the other nutrient)
+        arcpy.CopyFeatures_management(in_features=in_overlay, out_feature_class=out_atm_depo)
+    else:
+        arcpy.Intersect_analysis(in_features=[location, in_atm_depo], out_feature_class=out_atm_depo,
+                                 join_attributes="ALL", output_type="INPUT")
+
+    dep_tot = '{}_Dep_tot'.format(nutrient)
+    calculate_fields(in_table=out_atm_depo, in_fields=['SHAPE@AREA', dep_tot],
+                     out_fields=[("Area_ha", area_ha(out_atm_depo)),
+                                 ("AtmRate", lambda v: v[dep_tot]),
+                                 ("Atm2calc", lambda v: product(v["AtmRate"], v["Area_ha"]))])
 
     return out_atm_depo
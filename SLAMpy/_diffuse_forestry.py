@@ -1,6 +1,9 @@
 from os import path, sep
 import arcpy
 
+from ._diffuse_land_cover import read_land_cover_factors, calculate_land_cover_load
+from ._factors import land_cover_prefixes, land_cover_codes
+
 
 class ForestryV1(object):
     def __init__(self):
@@ -132,7 +135,7 @@ class ForestryV1(object):
 
 
 def forestry_v1_geoprocessing(project_name, nutrient, location, in_forest, in_lc_field, in_factors, out_gdb, messages,
-                              out_forest=None):
+                              out_forest=None, in_overlay=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -152,57 +155,32 @@ def forestry_v1_geoprocessing(project_name, nutrient, location, in_forest, in_lc
     :type messages: instance of a class featuring a 'addMessage' method
     :param out_forest: path of the output feature class for forestry load [optional]
     :type out_forest: str
+    :param in_overlay: path of the feature class of the land cover already intersected with the location
+        (e.g. the output of land_cover_v1_geoprocessing) to use instead of intersecting in_forest again [optional]
+    :type in_overlay: str
     """
     # calculate load for forestry
     messages.addMessage("> Calculating {} load for Forestry.".format(nutrient))
 
-    arcpy.MakeFeatureLayer_management(in_features=in_forest, out_layer='lyrForestry')
-    arcpy.SelectLayerByAttribute_management(in_layer_or_view='lyrForestry',
-                                            selection_type="NEW_SELECTION",
-                                            where_clause="{} LIKE '3%'".format(in_lc_field))
-
     if not out_forest:
         out_forest = sep.join([out_gdb, project_name + '_{}_Forestry'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, 'lyrForestry'], out_feature_class=out_forest,
-                             join_attributes="ALL", output_type="INPUT")
-
-    arcpy.AddField_management(in_table=out_forest, field_name="Area_ha", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_forest, field="Area_ha",
-                                    expression="!shape.area@hectares!",
-                                    expression_type="PYTHON_9.3")
-
-    c311, c312, c313, c324 = None, None, None, None
-    found = False
-    for row in arcpy.SearchCursor(in_factors):
-        if row.getValue('FactorName') == '{}_factors'.format(nutrient):
-            c311 = float(row.getValue('c311'))
-            c312 = float(row.getValue('c312'))
-            c313 = float(row.getValue('c313'))
-            c324 = float(row.getValue('c324'))
-            found = True
-            break
-    if not found:
-        raise Exception('Factors for {} are not available in {}'.format(nutrient, in_factors))
-
-    arcpy.AddField_management(in_table=out_forest, field_name="For1calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_forest, field="For1calc",
-                                    expression="factor(!{}!, float(!Area_ha!))".format(in_lc_field),
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def factor(code, area):
-                                        if code == '311':
-                                            return {} * area
-                                        elif code == '312':
-                                            return {} * area
-                                        elif code == '313':
-                                            return {} * area
-                                        elif code == '324':
-                                            return {} * area
-                                        else:
-                                            return 0.0
-                                    """.format(c311, c312, c313, c324))
+    # only the land cover types of forestry are kept
+    where_clause = "{} LIKE '{}%'".format(in_lc_field, land_cover_prefixes['forest'])
+
+    if in_overlay:  # i.e. land cover already intersected with location, only the relevant types need selecting
+        arcpy.Select_analysis(in_features=in_overlay, out_feature_class=out_forest,
+                              where_clause=where_clause)
+    else:
+        arcpy.MakeFeatureLayer_management(in_features=in_forest, out_layer='lyrForestry')
+        arcpy.SelectLayerByAttribute_management(in_layer_or_view='lyrForestry',
+                                                selection_type="NEW_SELECTION",
+                                                where_clause=where_clause)
+
+        arcpy.Intersect_analysis(in_features=[location, 'lyrForestry'], out_feature_class=out_forest,
+                                 join_attributes="ALL", output_type="INPUT")
+
+    factors = read_land_cover_factors(in_factors, nutrient, codes=land_cover_codes['forest'])
+    calculate_land_cover_load(out_forest, in_lc_field, factors, "For1calc")
 
     return out_forest
@@ -0,0 +1,86 @@
+from os import sep
+import arcpy
+
+from ._fields import calculate_fields, area_ha
+from ._factors import LandCoverFactors, land_cover_prefixes
+
+
+def land_cover_v1_geoprocessing(project_name, location, in_land_cover, in_lc_field, out_gdb, messages,
+                                out_land_cover=None):
+    """Intersect the location of interest with the land cover data once for the forestry, peat, and diffuse
+    urban tools (i.e. only keeping the Corine land cover types 1xx, 3xx, and 41x).
+
+    :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
+    :type project_name: str
+    :param location: path of the feature class for the location of interest [required]
+    :type location: str
+    :param in_land_cover: path of the input feature class of the land cover data [required]
+    :type in_land_cover: str
+    :param in_lc_field: name of the field in in_land_cover to use for the land cover type [required]
+    :type in_lc_field: str
+    :param out_gdb: path of the geodatabase where to store the output feature classes [required]
+    :type out_gdb: str
+    :param messages: object used for communication with the user interface [required]
+    :type messages: instance of a class featuring a 'addMessage' method
+    :param out_land_cover: path of the output feature class for the intersected land cover [optional]
+    :type out_land_cover: str
+    """
+    # intersect the land cover types of interest with the location
+    messages.addMessage("> Intersecting Location with Land Cover for Forestry, Peat, and Urban.")
+
+    arcpy.MakeFeatureLayer_management(in_features=in_land_cover, out_layer='lyrLandCover')
+    arcpy.SelectLayerByAttribute_management(in_layer_or_view='lyrLandCover',
+                                            selection_type="NEW_SELECTION",
+                                            where_clause=" OR ".join(
+                                                ["{} LIKE '{}%'".format(in_lc_field, prefix)
+                                                 for prefix in sorted(land_cover_prefixes.values())]))
+
+    if not out_land_cover:
+        out_land_cover = sep.join([out_gdb, project_name + '_LandCover'])
+
+    arcpy.Intersect_analysis(in_features=[location, 'lyrLandCover'], out_feature_class=out_land_cover,
+                             join_attributes="ALL", output_type="INPUT")
+
+    return out_land_cover
+
+
+def read_land_cover_factors(in_factors, nutrient, codes=None):
+    """
+    :param in_factors: path of the input table of the export factors for land cover types [required]
+    :type in_factors: str
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :param codes: only keep these land cover codes (e.g. land_cover_codes['forest']) [optional]
+    :type codes: list
+    :return: the export factors for the land cover types available in the table
+    :rtype: LandCoverFactors
+    """
+    with arcpy.da.SearchCursor(in_factors, '*') as cursor:
+        for row in cursor:
+            record = dict(zip(cursor.fields, row))
+            if record.get('FactorName') == '{}_factors'.format(nutrient):
+                return LandCoverFactors.from_record(record, codes)
+
+    raise Exception('Factors for {} are not available in {}'.format(nutrient, in_factors))
+
+
+def calculate_land_cover_load(in_table, in_lc_field, factors, out_field):
+    """Calculate the area and the load of each feature in one update pass, where the factors of all the features are
+    looked up at once from their land cover codes.
+
+    :param in_table: path of the feature class where to calculate the load [required]
+    :type in_table: str
+    :param in_lc_field: name of the field in in_table to use for the land cover type [required]
+    :type in_lc_field: str
+    :param factors: export factors of the land cover types of the source of interest [required]
+    :type factors: LandCoverFactors
+    :param out_field: name of the field where to store the load (e.g. 'For1calc') [required]
+    :type out_field: str
+    """
+    array = arcpy.da.TableToNumPyArray(in_table=in_table, field_names=['OID@', in_lc_field],
+                                       skip_nulls=False, null_value={in_lc_field: ''})
+    factor = dict(zip(array['OID@'].tolist(), factors.lookup(array[in_lc_field]).tolist()))
+
+    calculate_fields(in_table=in_table, in_fields=['OID@', 'SHAPE@AREA'],
+                     out_fields=[("Area_ha", area_ha(in_table)),
+                                 (out_field, lambda v: factor[v['OID@']] * v["Area_ha"])])
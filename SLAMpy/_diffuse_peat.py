@@ -1,6 +1,9 @@
 from os import path, sep
 import arcpy
 
+from ._diffuse_land_cover import read_land_cover_factors, calculate_land_cover_load
+from ._factors import land_cover_prefixes, land_cover_codes
+
 
 class PeatV1(object):
     def __init__(self):
@@ -131,7 +134,7 @@ class PeatV1(object):
 
 
 def peat_v1_geoprocessing(project_name, nutrient, location, in_peat, in_lc_field, in_factors, out_gdb, messages,
-                          out_peat=None):
+                          out_peat=None, in_overlay=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -151,52 +154,33 @@ def peat_v1_geoprocessing(project_name, nutrient, location, in_peat, in_lc_field
     :type messages: instance of a class featuring a 'addMessage' method
     :param out_peat: path of the output feature class for peatlands load [optional]
     :type out_peat: str
+    :param in_overlay: path of the feature class of the land cover already intersected with the location
+        (e.g. the output of land_cover_v1_geoprocessing) to use instead of intersecting in_peat again [optional]
+    :type in_overlay: str
     """
 
     # calculate load for peat
     messages.addMessage("> Calculating {} load for Peat.".format(nutrient))
 
-    arcpy.MakeFeatureLayer_management(in_features=in_peat, out_layer='lyrPeat')
-    arcpy.SelectLayerByAttribute_management(in_layer_or_view='lyrPeat',
-                                            selection_type="NEW_SELECTION",
-                                            where_clause="{} LIKE '41%'".format(in_lc_field))
-
     if not out_peat:
         out_peat = sep.join([out_gdb, project_name + '_{}_Peat'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, 'lyrPeat'], out_feature_class=out_peat,
-                             join_attributes="ALL", output_type="INPUT")
-
-    arcpy.AddField_management(in_table=out_peat, field_name="Area_ha", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_peat, field="Area_ha",
-                                    expression="!shape.area@hectares!",
-                                    expression_type="PYTHON_9.3")
-
-    c411, c412 = None, None
-    found = False
-    for row in arcpy.SearchCursor(in_factors):
-        if row.getValue('FactorName') == '{}_factors'.format(nutrient):
-            c411 = float(row.getValue('c411'))
-            c412 = float(row.getValue('c412'))
-            found = True
-            break
-    if not found:
-        raise Exception('Factors for {} are not available in {}'.format(nutrient, in_factors))
-
-    arcpy.AddField_management(in_table=out_peat, field_name="Peat1calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_peat, field="Peat1calc",
-                                    expression="factor(!{}!, float(!Area_ha!))".format(in_lc_field),
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def factor(code, area):
-                                        if code == '411':
-                                            return {} * area
-                                        elif code == '412':
-                                            return {} * area
-                                        else:
-                                            return 0.0
-                                    """.format(c411, c412))
+    # only the land cover types of peat are kept
+    where_clause = "{} LIKE '{}%'".format(in_lc_field, land_cover_prefixes['peat'])
+
+    if in_overlay:  # i.e. land cover already intersected with location, only the relevant types need selecting
+        arcpy.Select_analysis(in_features=in_overlay, out_feature_class=out_peat,
+                              where_clause=where_clause)
+    else:
+        arcpy.MakeFeatureLayer_management(in_features=in_peat, out_layer='lyrPeat')
+        arcpy.SelectLayerByAttribute_management(in_layer_or_view='lyrPeat',
+                                                selection_type="NEW_SELECTION",
+                                                where_clause=where_clause)
+
+        arcpy.Intersect_analysis(in_features=[location, 'lyrPeat'], out_feature_class=out_peat,
+                                 join_attributes="ALL", output_type="INPUT")
+
+    factors = read_land_cover_factors(in_factors, nutrient, codes=land_cover_codes['peat'])
+    calculate_land_cover_load(out_peat, in_lc_field, factors, "Peat1calc")
 
     return out_peat
@@ -1,6 +1,9 @@
 from os import path, sep
 import arcpy
 
+from ._diffuse_land_cover import read_land_cover_factors, calculate_land_cover_load
+from ._factors import land_cover_prefixes, land_cover_codes
+
 
 class DiffuseUrbanV1(object):
     def __init__(self):
@@ -131,7 +134,7 @@ class DiffuseUrbanV1(object):
 
 
 def urban_v1_geoprocessing(project_name, nutrient, location, in_urban, in_lc_field, in_factors, out_gdb, messages,
-                           out_urban=None):
+                           out_urban=None, in_overlay=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -151,66 +154,32 @@ def urban_v1_geoprocessing(project_name, nutrient, location, in_urban, in_lc_fie
     :type messages: instance of a class featuring a 'addMessage' method
     :param out_urban: path of the output feature class for diffuse urban load [optional]
     :type out_urban: str
+    :param in_overlay: path of the feature class of the land cover already intersected with the location
+        (e.g. the output of land_cover_v1_geoprocessing) to use instead of intersecting in_urban again [optional]
+    :type in_overlay: str
     """
     # calculate load for urban fabric
     messages.addMessage("> Calculating {} load for Urban.".format(nutrient))
 
-    arcpy.MakeFeatureLayer_management(in_features=in_urban, out_layer='lyrUrban')
-    arcpy.SelectLayerByAttribute_management(in_layer_or_view='lyrUrban',
-                                            selection_type="NEW_SELECTION",
-                                            where_clause="{} LIKE '1%'".format(in_lc_field))
-
     if not out_urban:
         out_urban = sep.join([out_gdb, project_name + '_{}_Urban'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, 'lyrUrban'], out_feature_class=out_urban,
-                             join_attributes="ALL", output_type="INPUT")
-
-    arcpy.AddField_management(in_table=out_urban, field_name="Area_ha", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_urban, field="Area_ha",
-                                    expression="!shape.area@hectares!",
-                                    expression_type="PYTHON_9.3")
-
-    c111, c112, c121, c122, c133, c141, c142 = None, None, None, None, None, None, None
-    found = False
-    for row in arcpy.SearchCursor(in_factors):
-        if row.getValue('FactorName') == '{}_factors'.format(nutrient):
-            c111 = float(row.getValue('c111'))
-            c112 = float(row.getValue('c112'))
-            c121 = float(row.getValue('c121'))
-            c122 = float(row.getValue('c122'))
-            c133 = float(row.getValue('c133'))
-            c141 = float(row.getValue('c141'))
-            c142 = float(row.getValue('c142'))
-            found = True
-            break
-    if not found:
-        raise Exception('Factors for {} are not available in {}'.format(nutrient, in_factors))
-
-    arcpy.AddField_management(in_table=out_urban, field_name="Urb1calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_urban, field="Urb1calc",
-                                    expression="factor(!{}!, float(!Area_ha!))".format(in_lc_field),
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def factor(code, area):
-                                        if code == '111':
-                                            return {} * area
-                                        elif code == '112':
-                                            return {} * area
-                                        elif code == '121':
-                                            return {} * area
-                                        elif code == '122':
-                                            return {} * area
-                                        elif code == '133':
-                                            return {} * area
-                                        elif code == '141':
-                                            return {} * area
-                                        elif code == '142':
-                                            return {} * area
-                                        else:
-                                            return 0.0
-                                    """.format(c111, c112, c121, c122, c133, c141, c142))
+    # only the land cover types of diffuse urban are kept
+    where_clause = "{} LIKE '{}%'".format(in_lc_field, land_cover_prefixes['urban'])
+
+    if in_overlay:  # i.e. land cover already intersected with location, only the relevant types need selecting
+        arcpy.Select_analysis(in_features=in_overlay, out_feature_class=out_urban,
+                              where_clause=where_clause)
+    else:
+        arcpy.MakeFeatureLayer_management(in_features=in_urban, out_layer='lyrUrban')
+        arcpy.SelectLayerByAttribute_management(in_layer_or_view='lyrUrban',
+                                                selection_type="NEW_SELECTION",
+                                                where_clause=where_clause)
+
+        arcpy.Intersect_analysis(in_features=[location, 'lyrUrban'], out_feature_class=out_urban,
+                                 join_attributes="ALL", output_type="INPUT")
+
+    factors = read_land_cover_factors(in_factors, nutrient, codes=land_cover_codes['urban'])
+    calculate_land_cover_load(out_urban, in_lc_field, factors, "Urb1calc")
 
     return out_urban
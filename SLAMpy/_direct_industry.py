@@ -1,6 +1,8 @@
 from os import path, sep
 import arcpy
 
+from ._fields import calculate_fields
+
 
 class IndustryV2(object):
     def __init__(self):
@@ -109,7 +111,7 @@ class IndustryV2(object):
 
 
 def industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4, out_gdb, messages,
-                              out_ipc=None, out_sect4=None):
+                              out_ipc=None, out_sect4=None, in_overlay_ipc=None, in_overlay_sect4=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -129,6 +131,14 @@ def industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4
     :type out_ipc: str
     :param out_sect4: path of the output feature class for Section 4 licensed industry load [optional]
     :type out_sect4: str
+    :param in_overlay_ipc: path of the feature class of the IPC industries data already intersected with the
+        location (e.g. the output of this tool for the other nutrient) to use instead of processing in_ipc again
+        [optional]
+    :type in_overlay_ipc: str
+    :param in_overlay_sect4: path of the feature class of the Section 4 industries data already intersected with the
+        location (e.g. the output of this tool for the other nutrient) to use instead of processing in_sect4 again
+        [optional]
+    :type in_overlay_sect4: str
     """
     # calculate load for IPC licences
     messages.addMessage("> Calculating {} load for IPC Industries.".format(nutrient))
@@ -136,14 +146,15 @@ def industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4
     if not out_ipc:
         out_ipc = sep.join([out_gdb, project_name + '_{}_IndustryIPC'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, in_ipc], out_feature_class=out_ipc,
-                             join_attributes="ALL", output_type="INPUT")
+    if in_overlay_ipc:  # i.e. in_ipc already intersected with location (e.g. for the other nutrient)
+        arcpy.CopyFeatures_management(in_features=in_overlay_ipc, out_feature_class=out_ipc)
+    else:
+        arcpy.Intersect_analysis(in_features=[location, in_ipc], out_feature_class=out_ipc,
+                                 join_attributes="ALL", output_type="INPUT")
 
-    arcpy.AddField_management(in_table=out_ipc, field_name="IPInd2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_ipc, field="IPInd2calc",
-                                    expression="!{}_2012_LAM!".format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    ipc_load = '{}_2012_LAM'.format(nutrient)
+    calculate_fields(in_table=out_ipc, in_fields=[ipc_load],
+                     out_fields=[("IPInd2calc", lambda v: v[ipc_load])])
 
     # calculate load for Section 4 licences
     messages.addMessage("> Calculating {} load for Section 4 Industries.".format(nutrient))
@@ -151,42 +162,28 @@ def industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4
     if not out_sect4:
         out_sect4 = sep.join([out_gdb, project_name + '_{}_IndustrySect4'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, in_sect4], out_feature_class=out_sect4,
-                             join_attributes="ALL", output_type="INPUT")
-
-    arcpy.AddField_management(in_table=out_sect4, field_name="Sect4_Flow", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_sect4, field="Sect4_Flow",
-                                    expression="flow(float(!Flow__m3_d!), float(!Discharge_!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def flow(flow_m3_d, discharge):
-                                    if flow_m3_d > 0:
-                                        return flow_m3_d
-                                    else:
-                                        return discharge
-                                    """)
-
-    arcpy.AddField_management(in_table=out_sect4, field_name="Sect4_ELV", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_sect4, field="Sect4_ELV",
-                                    expression="elv(float(!TON_ELV!), float(!TN_ELV!), float(!NO3_ELV!), "
-                                               "float(!NH3_ELV!), float(!NH4_ELV!), float(!NO2_ELV!), "
-                                               "float(!TP_ELV!), float(!PO4_ELV!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def elv(ton, tn, no3, nh3, nh4, no2, tp, po4):
-                                    nutrient = '{}'
-                                    if nutrient == 'N':
-                                        return float(max([ton, tn, no3, nh3, nh4, no2]))
-                                    else:
-                                        return float(max([tp, po4]))
-                                    """.format(nutrient))
-
-    arcpy.AddField_management(in_table=out_sect4, field_name="S4Ind2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_sect4, field="S4Ind2calc",
-                                    expression="!Sect4_ELV! * 0.25 * !Sect4_Flow! * 0.365",
-                                    expression_type="PYTHON_9.3")
+    if in_overlay_sect4:  # i.e. in_sect4 already intersected with location (e.g. for the other nutrient)
+        arcpy.CopyFeatures_management(in_features=in_overlay_sect4, out_feature_class=out_sect4)
+    else:
+        arcpy.Intersect_analysis(in_features=[location, in_sect4], out_feature_class=out_sect4,
+                                 join_attributes="ALL", output_type="INPUT")
+
+    elv_fields = ['TON_ELV', 'TN_ELV', 'NO3_ELV', 'NH3_ELV', 'NH4_ELV', 'NO2_ELV'] if nutrient == 'N' \
+        else ['TP_ELV', 'PO4_ELV']
+
+    def flow(v):
+        flow_m3_d, discharge = float(v['Flow__m3_d']), float(v['Discharge_'])
+        if flow_m3_d > 0:
+            return flow_m3_d
+        else:
+            return discharge
+
+    def elv(v):
+        return float(max([float(v[field]) for field in elv_fields]))
+
+    calculate_fields(in_table=out_sect4, in_fields=['Flow__m3_d', 'Discharge_'] + elv_fields,
+                     out_fields=[("Sect4_Flow", flow),
+                                 ("Sect4_ELV", elv),
+                                 ("S4Ind2calc", lambda v: v["Sect4_ELV"] * 0.25 * v["Sect4_Flow"] * 0.365)])
 
     return out_ipc, out_sect4
@@ -1,6 +1,8 @@
 from os import path, sep
 import arcpy
 
+from ._fields import calculate_fields
+
 
 class SepticV2(object):
     def __init__(self):
@@ -100,7 +102,7 @@ class SepticV2(object):
 
 
 def septic_v2_geoprocessing(project_name, nutrient, location, in_dwts, out_gdb, messages,
-                            out_dwts=None):
+                            out_dwts=None, in_overlay=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -116,6 +118,10 @@ def septic_v2_geoprocessing(project_name, nutrient, location, in_dwts, out_gdb,
     :type messages: instance of a class featuring a 'addMessage' method
     :param out_dwts: path of the output feature class for domestic septic tank systems load [optional]
     :type out_dwts: str
+    :param in_overlay: path of the feature class of the septic tank systems data already intersected with the
+        location (e.g. the output of this tool for the other nutrient) to use instead of processing in_dwts again
+        [optional]
+    :type in_overlay: str
     """
     # calculate load for septic tank systems
     messages.addMessage("> Calculating {} load for Septic Tank Systems.".format(nutrient))
@@ -123,19 +129,15 @@ def septic_v2_geoprocessing(project_name, nutrient, location, in_dwts, out_gdb,
     if not out_dwts:
         out_dwts = sep.join([out_gdb, project_name + '_{}_SepticTanks'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, in_dwts], out_feature_class=out_dwts,
-                             join_attributes="ALL", output_type="INPUT")
-
-    arcpy.AddField_management(in_table=out_dwts, field_name="GWSept2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_dwts, field="GWSept2calc",
-                                    expression="!GW_{}_2c!".format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    if in_overlay:  # i.e. in_dwts already intersected with location (e.g. for the other nutrient)
+        arcpy.CopyFeatures_management(in_features=in_overlay, out_feature_class=out_dwts)
+    else:
+        arcpy.Intersect_analysis(in_features=[location, in_dwts], out_feature_class=out_dwts,
+                                 join_attributes="ALL", output_type="INPUT")
 
-    arcpy.AddField_management(in_table=out_dwts, field_name="Sept2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_dwts, field="Sept2calc",
-                                    expression="!Total_{}_2c!".format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    gw_load, total_load = 'GW_{}_2c'.format(nutrient), 'Total_{}_2c'.format(nutrient)
+    calculate_fields(in_table=out_dwts, in_fields=[gw_load, total_load],
+                     out_fields=[("GWSept2calc", lambda v: v[gw_load]),
+                                 ("Sept2calc", lambda v: v[total_load])])
 
     return out_dwts
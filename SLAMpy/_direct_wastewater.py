@@ -1,6 +1,8 @@
 from os import path, sep
 import arcpy
 
+from ._fields import calculate_fields
+
 
 class WastewaterV3(object):
     def __init__(self):
@@ -116,7 +118,7 @@ class WastewaterV3(object):
 
 def wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_uww_field,
                                 out_gdb, messages,
-                                out_agglo=None):
+                                out_agglo=None, in_overlay=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -134,6 +136,10 @@ def wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_u
     :type messages: instance of a class featuring a 'addMessage' method
     :param out_agglo: path of the output feature class for wastewater treatment plants load [optional]
     :type out_agglo: str
+    :param in_overlay: path of the feature class of the wastewater treatment plants data already spatially joined to
+        the location (e.g. the output of this tool for the other nutrient) to use instead of processing in_agglo
+        again [optional]
+    :type in_overlay: str
     """
     # calculate load for wastewater treatment plants
     messages.addMessage("> Calculating {} load for Wastewater Treatment Plants.".format(nutrient))
@@ -141,15 +147,16 @@ def wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_u
     if not out_agglo:
         out_agglo = sep.join([out_gdb, project_name + '_{}_Wastewater'.format(nutrient)])
 
-    arcpy.SpatialJoin_analysis(target_features=in_agglo, join_features=location, out_feature_class=out_agglo,
-                               join_operation="JOIN_ONE_TO_ONE", join_type="KEEP_COMMON",
-                               match_option='CLOSEST', search_radius='2000 Meters')
+    if in_overlay:  # i.e. in_agglo already joined to location (e.g. for the other nutrient)
+        arcpy.CopyFeatures_management(in_features=in_overlay, out_feature_class=out_agglo)
+    else:
+        arcpy.SpatialJoin_analysis(target_features=in_agglo, join_features=location, out_feature_class=out_agglo,
+                                   join_operation="JOIN_ONE_TO_ONE", join_type="KEEP_COMMON",
+                                   match_option='CLOSEST', search_radius='2000 Meters')
 
-    arcpy.AddField_management(in_table=out_agglo, field_name="Wast3calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_agglo, field="Wast3calc",
-                                    expression="!{}!".format(in_uww_field).format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    uww_load = in_uww_field.format(nutrient)
+    calculate_fields(in_table=out_agglo, in_fields=[uww_load],
+                     out_fields=[("Wast3calc", lambda v: v[uww_load])])
 
     return out_agglo
 
@@ -0,0 +1,64 @@
+import re
+import numpy as np
+
+
+# the Corine land cover codes of the forestry, peat, and diffuse urban sources start with these prefixes
+land_cover_prefixes = {
+    'forest': '3',
+    'peat': '41',
+    'urban': '1'
+}
+
+# the Corine land cover codes with an export factor for the forestry, peat, and diffuse urban sources (the other codes
+# selected with the prefixes above get a factor of zero)
+land_cover_codes = {
+    'forest': ['311', '312', '313', '324'],
+    'peat': ['411', '412'],
+    'urban': ['111', '112', '121', '122', '133', '141', '142']
+}
+
+
+class LandCoverFactors(object):
+    """Export factors for Corine land cover types, looked up by land cover code.
+
+    The factors are built from the columns of a row of the factors table
+    named after the Corine codes (e.g. 'c311', 'c411'), only keeping the
+    codes of the source of interest (see land_cover_codes). The codes
+    absent from the factors get a factor of zero.
+    """
+    def __init__(self, factors):
+        self._factors = {str(code): float(factor) for code, factor in factors.items()}
+
+    @classmethod
+    def from_record(cls, record, codes=None):
+        """
+        :param record: values of the row of the factors table for the nutrient of interest, by column name [required]
+        :type record: dict
+        :param codes: only keep these land cover codes (e.g. land_cover_codes['forest']), if not provided all the
+            codes in the record are kept [optional]
+        :type codes: list
+        """
+        codes = None if codes is None else set(str(code) for code in codes)
+        factors = dict()
+        for column, value in record.items():
+            match = re.match(r'^c(\d+)$', str(column), flags=re.IGNORECASE)
+            if match and (codes is None or match.group(1) in codes) and value is not None:
+                factors[match.group(1)] = value
+
+        return cls(factors)
+
+    def __len__(self):
+        return len(self._factors)
+
+    def __contains__(self, code):
+        return str(code) in self._factors
+
+    def get(self, code, default=0.0):
+        # scalar lookup for one land cover code
+        return self._factors.get(str(code), default)
+
+    def lookup(self, codes, default=0.0):
+        # vectorised lookup for an array of land cover codes (only the distinct codes are looked up)
+        codes = np.asarray(codes).astype(str)
+        uniques, inverse = np.unique(codes, return_inverse=True)
+        return np.array([self._factors.get(code, default) for code in uniques], dtype=float)[inverse.ravel()]
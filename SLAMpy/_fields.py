@@ -0,0 +1,108 @@
+import numpy as np
+import arcpy
+
+
+def add_fields(in_table, field_names, field_type="DOUBLE"):
+    """
+    :param in_table: path of the table (or feature class) where to add the fields [required]
+    :type in_table: str
+    :param field_names: names of the fields to add [required]
+    :type field_names: list
+    :param field_type: type of the fields to add [optional]
+    :type field_type: str
+    """
+    # skip the fields already in the table (e.g. when it is a copy of the output for the other nutrient)
+    existing = [field.name.lower() for field in arcpy.ListFields(in_table)]
+    field_names = [name for name in field_names if name.lower() not in existing]
+    if not field_names:
+        return
+
+    if hasattr(arcpy.management, 'AddFields'):  # i.e. all fields added in one schema change (ArcGIS Pro)
+        arcpy.management.AddFields(in_table=in_table,
+                                   field_description=[[name, field_type] for name in field_names])
+    else:  # i.e. one schema change per field (ArcMap)
+        for name in field_names:
+            arcpy.AddField_management(in_table=in_table, field_name=name, field_type=field_type,
+                                      field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
+
+
+def calculate_fields(in_table, in_fields, out_fields):
+    """Add all the output fields to the table in one schema change, and calculate all of them in one update pass.
+
+    :param in_table: path of the table (or feature class) where to calculate the fields [required]
+    :type in_table: str
+    :param in_fields: names of the existing fields (or read-only tokens such as 'SHAPE@AREA') required to
+        calculate the output fields, the 'SHAPE@' token is not accepted because the cursor would write the geometry
+        of every row back to the table [required]
+    :type in_fields: list
+    :param out_fields: pairs of name and function for the fields to calculate, each function receives the
+        values of the row as a dictionary (including the output fields calculated before it) [required]
+    :type out_fields: list
+    """
+    if 'SHAPE@' in in_fields:
+        raise ValueError("The token 'SHAPE@' cannot be used to calculate fields (e.g. use 'SHAPE@AREA' instead).")
+
+    out_names = [name for name, function in out_fields]
+    add_fields(in_table, out_names)
+
+    names = list(in_fields) + out_names
+    with arcpy.da.UpdateCursor(in_table, names) as cursor:
+        for row in cursor:
+            values = dict(zip(names, row))
+            for name, function in out_fields:
+                values[name] = function(values)
+            cursor.updateRow([values[name] for name in names])
+
+
+def sum_fields_by(in_table, case_field, field_names):
+    """Sum the values of the fields for each unique value of the case field in one read of the table (i.e.
+    equivalent of the 'SUM' statistics of Statistics_analysis, where null values are ignored).
+
+    :param in_table: path of the table (or feature class) containing the fields to sum [required]
+    :type in_table: str
+    :param case_field: name of the field used to group the records [required]
+    :type case_field: str
+    :param field_names: names of the fields to sum [required]
+    :type field_names: list
+    :return: the sums of the fields (in the order of field_names) for each value of the case field, where the sum
+        is None if all the values of the group are null
+    :rtype: dict
+    """
+    array = arcpy.da.TableToNumPyArray(in_table=in_table, field_names=[case_field] + list(field_names),
+                                       skip_nulls=False, null_value={name: np.nan for name in field_names})
+    cases, inverse = np.unique(array[case_field], return_inverse=True)
+    inverse = inverse.ravel()
+
+    sums = list()
+    for name in field_names:
+        values = array[name].astype(float)
+        valid = ~np.isnan(values)
+        total = np.bincount(inverse, weights=np.where(valid, values, 0.), minlength=len(cases))
+        count = np.bincount(inverse, weights=valid, minlength=len(cases))
+        sums.append(np.where(count > 0, total, np.nan))
+
+    return {case: [None if np.isnan(s[i]) else float(s[i]) for s in sums]
+            for i, case in enumerate(cases.tolist())}
+
+
+def area_ha(in_table):
+    """
+    :param in_table: path of the feature class where to calculate the areas [required]
+    :type in_table: str
+    :return: the function giving the area in hectares from the value of the 'SHAPE@AREA' token (i.e. equivalent of
+        '!shape.area@hectares!'), which is in the linear unit of the spatial reference squared
+    :rtype: function
+    """
+    to_hectares = arcpy.Describe(in_table).spatialReference.metersPerUnit ** 2 / 10000.
+
+    return lambda values: values['SHAPE@AREA'] * to_hectares
+
+
+def product(*values):
+    # multiplication of field values, where a null value is propagated (rather than raising)
+    result = 1.0
+    for value in values:
+        if value is None:
+            return None
+        result *= value
+    return result
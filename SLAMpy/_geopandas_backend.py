@@ -0,0 +1,301 @@
+import re
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+from ._factors import LandCoverFactors, land_cover_prefixes, land_cover_codes
+from ._totals import sources_v3, input_fields, calculate_totals
+
+
+def read_features(dataset, where=None):
+    """
+    :param dataset: path of the feature class (in a file geodatabase) or of the shapefile to read [required]
+    :type dataset: str
+    :param where: SQL query to select a subset of the features [optional]
+    :type where: str
+    :return: the features and their attributes
+    :rtype: geopandas.GeoDataFrame
+    """
+    # split the path into the geodatabase and the feature class (if the dataset is stored in a geodatabase)
+    match = re.match(r'^(.*\.gdb)[\\/]+(.+)$', dataset, flags=re.IGNORECASE)
+    if match:
+        return gpd.read_file(match.group(1), layer=match.group(2), where=where)
+    else:
+        return gpd.read_file(dataset, where=where)
+
+
+def read_factors(in_factors, nutrient):
+    """
+    :param in_factors: path of the input table of the export factors (e.g. 'in/LAM_Factors.xlsx/Corine_N$') [required]
+    :type in_factors: str
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :return: the export factors for the given nutrient indexed by their names
+    :rtype: pandas.Series
+    """
+    # split the path into the workbook and the sheet (if the table is a spreadsheet)
+    match = re.match(r'^(.*\.xlsx?)[\\/]+(.+?)\$?$', in_factors, flags=re.IGNORECASE)
+    if match:
+        table = pd.read_excel(match.group(1), sheet_name=match.group(2))
+    elif in_factors.lower().endswith('.csv'):
+        table = pd.read_csv(in_factors)
+    else:
+        table = pd.DataFrame(read_features(in_factors).drop(columns='geometry', errors='ignore'))
+
+    table = table.set_index('FactorName')
+    if '{}_factors'.format(nutrient) not in table.index:
+        raise Exception('Factors for {} are not available in {}'.format(nutrient, in_factors))
+
+    return table.loc['{}_factors'.format(nutrient)]
+
+
+def _area_ha(features):
+    # equivalent of '!shape.area@hectares!' (the coordinate reference system is expected to be in metres)
+    return features.geometry.area.values / 10000.
+
+
+def _intersect(location, features):
+    # project the input features on the fly (like ArcGIS does) if coordinate reference systems differ
+    if features.crs is not None and location.crs is not None and not features.crs == location.crs:
+        features = features.to_crs(location.crs)
+
+    # points are kept whole and tagged with the basin they fall in, polygons are cut along the basin boundaries
+    if features.geom_type.isin(['Point', 'MultiPoint']).all():
+        return gpd.sjoin(features, location, how='inner', predicate='intersects').drop(columns='index_right')
+    else:
+        return gpd.overlay(location, features, how='intersection', keep_geom_type=True)
+
+
+def _spatial_join_closest(location, features, search_radius):
+    # project the input features on the fly (like ArcGIS does) if coordinate reference systems differ
+    if features.crs is not None and location.crs is not None and not features.crs == location.crs:
+        features = features.to_crs(location.crs)
+
+    joined = gpd.sjoin_nearest(features, location, how='inner', max_distance=search_radius)
+    # keep only one basin per feature when several basins are at the same distance (i.e. JOIN_ONE_TO_ONE)
+    return joined.loc[~joined.index.duplicated(keep='first')].drop(columns='index_right')
+
+
+def overlay_v3_sources(location, in_lc_field,
+                       in_arable, in_pasture, in_atm_depo, in_land_cover,
+                       in_ipc, in_sect4, in_dwts, in_agglo,
+                       messages):
+    """
+    :param location: features for the location of interest, with their basin identifier in a '_basin' column
+    :type location: geopandas.GeoDataFrame
+    :return: the features of each source intersected with the location of interest
+    :rtype: dict
+    """
+    overlays = dict()
+
+    messages.addMessage("> Intersecting Location with Arable and Pasture.")
+    overlays['arable'] = _intersect(location, read_features(in_arable))
+    overlays['pasture'] = _intersect(location, read_features(in_pasture))
+
+    messages.addMessage("> Intersecting Location with Atmospheric Deposition.")
+    overlays['atm_depo'] = _intersect(location, read_features(in_atm_depo))
+
+    messages.addMessage("> Intersecting Location with Land Cover for Forestry, Peat, and Urban.")
+    land_cover = read_features(in_land_cover)
+    codes = land_cover[in_lc_field].astype(str)
+    prefixes = tuple(land_cover_prefixes.values())
+    land_cover = _intersect(location, land_cover.loc[codes.str.startswith(prefixes).values])
+    codes = land_cover[in_lc_field].astype(str)
+    for category, prefix in land_cover_prefixes.items():
+        overlays[category] = land_cover.loc[codes.str.startswith(prefix).values]
+
+    messages.addMessage("> Intersecting Location with IPC and Section 4 Industries.")
+    overlays['ipc'] = _intersect(location, read_features(in_ipc))
+    overlays['sect4'] = _intersect(location, read_features(in_sect4))
+
+    messages.addMessage("> Intersecting Location with Septic Tank Systems.")
+    overlays['dwts'] = _intersect(location, read_features(in_dwts))
+
+    messages.addMessage("> Joining Wastewater Treatment Plants to closest Location.")
+    overlays['agglo'] = _spatial_join_closest(location, read_features(in_agglo), 2000.)
+
+    return overlays
+
+
+def calculate_v3_loads(nutrient, overlays, in_lc_field, in_factors, in_uww_field, messages):
+    """
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :param overlays: features of each source intersected with the location of interest [required]
+    :type overlays: dict
+    :return: the '*calc' load fields of each source, alongside the basin identifier
+    :rtype: dict
+    """
+    loads = dict()
+
+    messages.addMessage("> Calculating {} load for Arable and Pasture.".format(nutrient))
+    for category, prefix in [('arable', 'Arab'), ('pasture', 'Past')]:
+        features = overlays[category]
+        area = _area_ha(features)
+        loads[category] = pd.DataFrame({
+            '_basin': features['_basin'].values,
+            'GW{}2calc'.format(prefix): features['{}SwFromGw'.format(nutrient.lower())].values * area,
+            '{}2calc'.format(prefix): features['{}TotaltoSWreceptor'.format(nutrient.lower())].values * area
+        })
+
+    messages.addMessage("> Calculating {} load for Atmospheric Deposition.".format(nutrient))
+    features = overlays['atm_depo']
+    loads['atm_depo'] = pd.DataFrame({
+        '_basin': features['_basin'].values,
+        'Atm2calc': features['{}_Dep_tot'.format(nutrient)].values * _area_ha(features)
+    })
+
+    messages.addMessage("> Calculating {} load for Forestry, Peat, and Urban.".format(nutrient))
+    factors = read_factors(in_factors, nutrient)
+    for category, field in [('forest', 'For1calc'), ('peat', 'Peat1calc'), ('urban', 'Urb1calc')]:
+        features = overlays[category]
+        lookup = LandCoverFactors.from_record(factors.to_dict(), land_cover_codes[category])
+        loads[category] = pd.DataFrame({
+            '_basin': features['_basin'].values,
+            field: lookup.lookup(features[in_lc_field].values) * _area_ha(features)
+        })
+
+    messages.addMessage("> Calculating {} load for IPC and Section 4 Industries.".format(nutrient))
+    features = overlays['ipc']
+    loads['ipc'] = pd.DataFrame({
+        '_basin': features['_basin'].values,
+        'IPInd2calc': features['{}_2012_LAM'.format(nutrient)].values
+    })
+    features = overlays['sect4']
+    flow = np.where(features['Flow__m3_d'].values.astype(float) > 0,
+                    features['Flow__m3_d'].values.astype(float), features['Discharge_'].values.astype(float))
+    elv_fields = ['TON_ELV', 'TN_ELV', 'NO3_ELV', 'NH3_ELV', 'NH4_ELV', 'NO2_ELV'] if nutrient == 'N' \
+        else ['TP_ELV', 'PO4_ELV']
+    elv = features[elv_fields].values.astype(float).max(axis=1) if len(features) \
+        else np.zeros((0,), dtype=float)
+    loads['sect4'] = pd.DataFrame({
+        '_basin': features['_basin'].values,
+        'S4Ind2calc': elv * 0.25 * flow * 0.365
+    })
+
+    messages.addMessage("> Calculating {} load for Septic Tank Systems.".format(nutrient))
+    features = overlays['dwts']
+    loads['dwts'] = pd.DataFrame({
+        '_basin': features['_basin'].values,
+        'GWSept2calc': features['GW_{}_2c'.format(nutrient)].values,
+        'Sept2calc': features['Total_{}_2c'.format(nutrient)].values
+    })
+
+    messages.addMessage("> Calculating {} load for Wastewater Treatment Plants.".format(nutrient))
+    features = overlays['agglo']
+    loads['agglo'] = pd.DataFrame({
+        '_basin': features['_basin'].values,
+        'Wast3calc': features[in_uww_field.format(nutrient)].values
+    })
+
+    return loads
+
+
+def summarise_v3_loads(nutrient, location, loads, messages):
+    """
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :param location: features for the location of interest, with their basin identifier in a '_basin' column
+    :type location: geopandas.GeoDataFrame
+    :param loads: the '*calc' load fields of each source, alongside the basin identifier [required]
+    :type loads: dict
+    :return: the equivalent of the '*_Loads_Summary' attribute table indexed by basin
+    :rtype: pandas.DataFrame
+    """
+    messages.addMessage("> Calculating summary loads for all sources of {}.".format(nutrient))
+
+    summary = pd.DataFrame(location.drop(columns='geometry')).set_index('_basin')
+    for category in ['arable', 'pasture', 'atm_depo', 'forest', 'peat', 'urban', 'ipc', 'sect4', 'dwts', 'agglo']:
+        # sum per basin, basins without any feature are left null (like when joined to the summary)
+        sums = loads[category].groupby('_basin').sum(min_count=1)
+        sums.columns = ['SUM_{}'.format(c) for c in sums.columns]
+        summary = summary.join(sums)
+
+    messages.addMessage("> Calculating {} loads totals and sub-totals.".format(nutrient))
+
+    fields = input_fields(sources_v3)
+    for name, values in calculate_totals({name: summary[name].values for name in fields}, sources_v3).items():
+        summary[name] = values
+
+    return summary
+
+
+def read_location(region, selection, sort_field, messages):
+    """
+    :param region: path of the feature class for the region of interest [required]
+    :type region: str
+    :param selection: SQL query to further delineate the location within the region [optional]
+    :type selection: str
+    :param sort_field: name of the field in region used to sort the results into sub-regions [required]
+    :type sort_field: str
+    :param messages: object used for communication with the user interface [required]
+    :type messages: instance of a class featuring a 'addMessage' method
+    :return: the features for the location of interest, with their basin identifier in a '_basin' column
+    :rtype: geopandas.GeoDataFrame
+    """
+    messages.addMessage("> Reading Location(s) within Region.")
+    location = read_features(region, where=selection if selection else None)
+    if location.crs is not None and location.crs.is_geographic:
+        raise ValueError("The region must be in a projected coordinate system to calculate areas in hectares.")
+
+    return location[[sort_field, 'AREAKM2', 'geometry']].rename(columns={sort_field: '_basin'})
+
+
+def load_apportionment_v3_dataframes(nutrient, region, selection, sort_field, in_lc_field,
+                                     in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                                     in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                                     messages):
+    """Equivalent of the geoprocessing chain of the load apportionment V3 (including the post-processing V3)
+    using in-memory geometries and attributes instead of arcpy geoprocessing tools.
+
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :param region: path of the feature class for the region of interest [required]
+    :type region: str
+    :param selection: SQL query to further delineate the location within the region [optional]
+    :type selection: str
+    :param sort_field: name of the field in region used to sort the results into sub-regions [required]
+    :type sort_field: str
+    :param messages: object used for communication with the user interface [required]
+    :type messages: instance of a class featuring a 'addMessage' method
+    :return: the equivalent of the '*_Loads_Summary' attribute table indexed by basin
+    :rtype: pandas.DataFrame
+    """
+    # determine which location to work on
+    location = read_location(region, selection, sort_field, messages)
+
+    overlays = overlay_v3_sources(location, in_lc_field,
+                                  in_arable, in_pasture, in_atm_depo, in_land_cover,
+                                  in_ipc, in_sect4, in_dwts, in_agglo,
+                                  messages)
+
+    loads = calculate_v3_loads(nutrient, overlays, in_lc_field, in_factors, in_uww_field, messages)
+
+    return summarise_v3_loads(nutrient, location, loads, messages)
+
+
+def load_apportionment_v3_dataframes_n_and_p(region, selection, sort_field, in_lc_field,
+                                             in_arable, in_pasture, in_atm_depo, in_land_cover,
+                                             in_factors_n, in_factors_p,
+                                             in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                                             messages):
+    """Equivalent of load_apportionment_v3_dataframes for both nutrients, where the geometries are only
+    intersected once and then used to calculate the loads for nitrogen and for phosphorus.
+
+    :return: the equivalent of the '*_Loads_Summary' attribute tables indexed by basin for N and for P
+    :rtype: tuple
+    """
+    # determine which location to work on
+    location = read_location(region, selection, sort_field, messages)
+
+    overlays = overlay_v3_sources(location, in_lc_field,
+                                  in_arable, in_pasture, in_atm_depo, in_land_cover,
+                                  in_ipc, in_sect4, in_dwts, in_agglo,
+                                  messages)
+
+    return tuple(
+        summarise_v3_loads(nutrient, location,
+                           calculate_v3_loads(nutrient, overlays, in_lc_field, in_factors, in_uww_field, messages),
+                           messages)
+        for nutrient, in_factors in [('N', in_factors_n), ('P', in_factors_p)]
+    )
@@ -1,14 +1,25 @@
 from os import path, sep
+import sys
+import heapq
+import multiprocessing
 import arcpy
 
-from _diffuse_agriculture import agri_v2_geoprocessing
-from _diffuse_atm_depo import atmos_v2_geoprocessing
-from _diffuse_forestry import forestry_v1_geoprocessing
-from _diffuse_peat import peat_v1_geoprocessing
-from _diffuse_urban import urban_v1_geoprocessing
-from _direct_industry import industry_v2_geoprocessing
-from _direct_septic_tanks import septic_v2_geoprocessing
-from _direct_wastewater import wastewater_v2_geoprocessing, wastewater_v3_geoprocessing
+from ._cache import location_fingerprint, stage_key
+from ._diffuse_agriculture import agri_v2_geoprocessing
+from ._diffuse_atm_depo import atmos_v2_geoprocessing
+from ._diffuse_forestry import forestry_v1_geoprocessing
+from ._diffuse_land_cover import land_cover_v1_geoprocessing
+from ._diffuse_peat import peat_v1_geoprocessing
+from ._diffuse_urban import urban_v1_geoprocessing
+from ._direct_industry import industry_v2_geoprocessing
+from ._direct_septic_tanks import septic_v2_geoprocessing
+from ._direct_wastewater import wastewater_v2_geoprocessing, wastewater_v3_geoprocessing
+from ._fields import calculate_fields, sum_fields_by
+
+try:
+    string_types = basestring
+except NameError:  # i.e. Python 3
+    string_types = str
 
 
 class LoadApportionmentV3(object):
@@ -334,104 +345,413 @@ def load_apportionment_v3_geoprocessing(project_name, nutrient, location, in_lc_
                                         ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
                                         ex_ipc, ex_sect4, ex_dwts, ex_agglo,
                                         out_gdb,
-                                        messages):
+                                        messages,
+                                        processes=None, overlays=None, cache=None, checkpoint=None, resume=False,
+                                        progress=None):
+
+    # report the progress of each stage only if requested
+    report = progress if progress else (lambda stage, status: None)
+
+    # plan the geoprocessing function of each source load not reused
+    outputs, stages = load_apportionment_v3_stages(project_name, nutrient, location, in_lc_field,
+                                                   in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                                                   in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                                                   ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                                                   ex_ipc, ex_sect4, ex_dwts, ex_agglo,
+                                                   messages, overlays=overlays, progress=report)
+
+    # identify each stage by its inputs (including the location) to find its outputs in the cache or checkpoint
+    keys = dict()
+    if (cache is not None or checkpoint is not None) and stages:
+        fingerprint = location_fingerprint(location)
+        for name, categories, function, args, kwargs in stages:
+            keys[name] = stage_key(function.__name__, nutrient, fingerprint, args[3:])
+
+    # skip the stages completed in a previous run interrupted before its end, if their outputs are still valid
+    if checkpoint is not None and resume:
+        for stage in list(stages):
+            name, categories, function, args, kwargs = stage
+            completed = checkpoint.fetch(name, keys[name])
+            if completed:
+                messages.addMessage("> Resuming from checkpoint for {}.".format(", ".join(categories)))
+                outputs.update(zip(categories, completed))
+                stages.remove(stage)
+                report(name, 'skipped')
+
+    # reuse the outputs stored in the cache for the stages already run on the same location and inputs
+    if cache is not None:
+        for stage in list(stages):
+            name, categories, function, args, kwargs = stage
+            cached = cache.fetch(keys[name], project_name, out_gdb)
+            if cached:
+                messages.addMessage("> Reusing cached data for {}.".format(", ".join(categories)))
+                outputs.update(zip(categories, cached))
+                stages.remove(stage)
+                report(name, 'skipped')
+
+    # record each stage in the checkpoint as soon as it is completed
+    def completed_stage(name, categories, args, stage_outputs):
+        if checkpoint is not None:
+            checkpoint.record(name, keys[name], stage_outputs, args[3:])
+        outputs.update(zip(categories, stage_outputs))
+        report(name, 'completed')
+
+    # run the geoprocessing functions, either one after the other, or concurrently on a pool of processes
+    if processes and processes > 1 and len(stages) > 1:
+        for name, categories, function, args, kwargs in stages:
+            report(name, 'started')
+        _run_stages_in_parallel(project_name, stages, out_gdb, messages, processes, completed_stage)
+    else:
+        for name, categories, function, args, kwargs in stages:
+            report(name, 'started')
+            completed_stage(name, categories, args, _as_tuple(function(*(args + (out_gdb, messages)), **kwargs)))
 
-    # for each source load, reuse existing values if provided, otherwise run the appropriate geoprocessing function
+    # store the outputs of the stages that were run in the cache
+    if cache is not None:
+        for name, categories, function, args, kwargs in stages:
+            cache.store(keys[name], project_name, [outputs[category] for category in categories], args[3:])
+
+    return (
+        outputs['arable'], outputs['pasture'], outputs['atm_depo'], outputs['forest'], outputs['peat'],
+        outputs['urban'], outputs['ipc'], outputs['sect4'], outputs['dwts'], outputs['agglo']
+    )
+
+
+def load_apportionment_v3_stages(project_name, nutrient, location, in_lc_field,
+                                 in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                                 in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                                 ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                                 ex_ipc, ex_sect4, ex_dwts, ex_agglo,
+                                 messages,
+                                 overlays=None, progress=None):
+    """Plan the geoprocessing function of each source load, unless its existing outputs are reused.
+
+    :return: the existing outputs reused by category (e.g. 'arable'), and the stages to run, as tuples of name,
+        categories of the outputs, geoprocessing function, and its positional arguments (to be followed by out_gdb
+        and messages) and keyword arguments
+    :rtype: tuple
+    """
+    report = progress if progress else (lambda stage, status: None)
+
+    # source features already intersected with the location (e.g. in a run for the other nutrient) are copied
+    overlays = overlays if overlays else dict()
+
+    # for each source load, reuse existing values if provided, otherwise plan the appropriate geoprocessing function
+    outputs = dict()
+    stages = list()
     if ex_arable and ex_pasture:
         messages.addMessage("> Reusing existing data for arable and pasture.")
-        out_arable, out_pasture = ex_arable, ex_pasture
+        outputs['arable'], outputs['pasture'] = ex_arable, ex_pasture
+        report('agri', 'skipped')
     else:
-        out_arable, out_pasture = \
-            agri_v2_geoprocessing(project_name, nutrient, location, in_arable, in_pasture, out_gdb, messages)
+        stages.append(('agri', ['arable', 'pasture'], agri_v2_geoprocessing,
+                       (project_name, nutrient, location, in_arable, in_pasture),
+                       {'in_overlay_arable': overlays.get('arable'), 'in_overlay_pasture': overlays.get('pasture')}))
     if ex_atm_depo:
         messages.addMessage("> Reusing existing data for atmospheric deposition.")
-        out_atm_depo = ex_atm_depo
-    else:
-        out_atm_depo = \
-            atmos_v2_geoprocessing(project_name, nutrient, location, in_atm_depo, out_gdb, messages)
-    if ex_forest:
-        messages.addMessage("> Reusing existing data for forestry.")
-        out_forest = ex_forest
-    else:
-        out_forest = \
-            forestry_v1_geoprocessing(project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
-                                      out_gdb, messages)
-    if ex_peat:
-        messages.addMessage("> Reusing existing data for peatlands.")
-        out_peat = ex_peat
+        outputs['atm_depo'] = ex_atm_depo
+        report('atm_depo', 'skipped')
     else:
-        out_peat = \
-            peat_v1_geoprocessing(project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
-                                  out_gdb, messages)
-    if ex_urban:
-        messages.addMessage("> Reusing existing data for diffuse urban.")
-        out_urban = ex_urban
+        stages.append(('atm_depo', ['atm_depo'], atmos_v2_geoprocessing,
+                       (project_name, nutrient, location, in_atm_depo),
+                       {'in_overlay': overlays.get('atm_depo')}))
+    land_cover_categories = list()
+    for category, existing, label in [('forest', ex_forest, 'forestry'),
+                                      ('peat', ex_peat, 'peatlands'),
+                                      ('urban', ex_urban, 'diffuse urban')]:
+        if existing:
+            messages.addMessage("> Reusing existing data for {}.".format(label))
+            outputs[category] = existing
+        else:
+            land_cover_categories.append(category)
+    if land_cover_categories:
+        stages.append(('land_cover', land_cover_categories, _land_cover_sources_v1_geoprocessing,
+                       (project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
+                        land_cover_categories),
+                       {'overlays': [overlays.get(category) for category in land_cover_categories]}))
     else:
-        out_urban = \
-            urban_v1_geoprocessing(project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
-                                   out_gdb, messages)
+        report('land_cover', 'skipped')
     if ex_ipc and ex_sect4:
         messages.addMessage("> Reusing existing data for IPC and Section 4 industries.")
-        out_ipc, out_sect4 = ex_ipc, ex_sect4
+        outputs['ipc'], outputs['sect4'] = ex_ipc, ex_sect4
+        report('industry', 'skipped')
     else:
-        out_ipc, out_sect4 = \
-            industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4, out_gdb, messages)
+        stages.append(('industry', ['ipc', 'sect4'], industry_v2_geoprocessing,
+                       (project_name, nutrient, location, in_ipc, in_sect4),
+                       {'in_overlay_ipc': overlays.get('ipc'), 'in_overlay_sect4': overlays.get('sect4')}))
     if ex_dwts:
         messages.addMessage("> Reusing existing data for septic tanks.")
-        out_dwts = ex_dwts
+        outputs['dwts'] = ex_dwts
+        report('dwts', 'skipped')
     else:
-        out_dwts = \
-            septic_v2_geoprocessing(project_name, nutrient, location, in_dwts, out_gdb, messages)
+        stages.append(('dwts', ['dwts'], septic_v2_geoprocessing,
+                       (project_name, nutrient, location, in_dwts),
+                       {'in_overlay': overlays.get('dwts')}))
     if ex_agglo:
         messages.addMessage("> Reusing existing data for WWTPs.")
-        out_agglo = ex_agglo
+        outputs['agglo'] = ex_agglo
+        report('agglo', 'skipped')
     else:
-        out_agglo = \
-            wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_uww_field,
-                                        out_gdb, messages)
-
-    return (
-        out_arable, out_pasture, out_atm_depo, out_forest, out_peat,
-        out_urban, out_ipc, out_sect4, out_dwts, out_agglo
-    )
-
-
-def load_apportionment_v3_stats_and_summary(project_name, nutrient, location, sort_field, out_gdb,
-                                            out_arable, out_pasture, out_atm_depo, out_forest, out_peat, out_urban,
-                                            out_ipc, out_sect4, out_dwts, out_agglo,
-                                            messages,
-                                            out_summary=None):
+        stages.append(('agglo', ['agglo'], wastewater_v3_geoprocessing,
+                       (project_name, nutrient, location, in_agglo, in_uww_field),
+                       {'in_overlay': overlays.get('agglo')}))
+
+    return outputs, stages
+
+
+def _land_cover_sources_v1_geoprocessing(project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
+                                         categories, out_gdb, messages, overlays=None):
+    # reuse the land cover already intersected with the location for each source if available (e.g. in a run for
+    # the other nutrient), otherwise intersect the land cover only once if it is required by more than one of
+    # forestry, peat, and urban
+    if overlays and all(overlays):
+        in_overlays, in_overlay = overlays, None
+    elif len(categories) > 1:
+        in_overlay = land_cover_v1_geoprocessing(project_name, location, in_land_cover, in_lc_field,
+                                                 out_gdb, messages)
+        in_overlays = [in_overlay] * len(categories)
+    else:
+        in_overlays, in_overlay = [None] * len(categories), None
 
-    # calculate the summary statistics using the sorting field provided for each source load
-    messages.addMessage("> Calculating summary loads for all sources of {}.".format(nutrient))
+    functions = {
+        'forest': forestry_v1_geoprocessing,
+        'peat': peat_v1_geoprocessing,
+        'urban': urban_v1_geoprocessing
+    }
+    outputs = tuple(functions[category](project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
+                                        out_gdb, messages, in_overlay=overlay)
+                    for category, overlay in zip(categories, in_overlays))
 
-    arcpy.Statistics_analysis(in_table=out_arable, out_table=out_arable + '_stats',
-                              statistics_fields=[["GWArab2calc", "SUM"], ["Arab2calc", "SUM"]], case_field=sort_field)
-    arcpy.Statistics_analysis(in_table=out_pasture, out_table=out_pasture + '_stats',
-                              statistics_fields=[["GWPast2calc", "SUM"], ["Past2calc", "SUM"]], case_field=sort_field)
+    # garbage collection of the intersected land cover
+    if in_overlay:
+        arcpy.Delete_management(in_overlay)
 
-    arcpy.Statistics_analysis(in_table=out_atm_depo, out_table=out_atm_depo + '_stats',
-                              statistics_fields=[["Atm2calc", "SUM"]], case_field=sort_field)
+    return outputs
 
-    arcpy.Statistics_analysis(in_table=out_forest, out_table=out_forest + '_stats',
-                              statistics_fields=[["For1calc", "SUM"]], case_field=sort_field)
 
-    arcpy.Statistics_analysis(in_table=out_peat, out_table=out_peat + '_stats',
-                              statistics_fields=[["Peat1calc", "SUM"]], case_field=sort_field)
+def _as_tuple(outputs):
+    # geoprocessing functions producing only one output do not return it as a tuple
+    return outputs if isinstance(outputs, tuple) else (outputs,)
 
-    arcpy.Statistics_analysis(in_table=out_urban, out_table=out_urban + '_stats',
-                              statistics_fields=[["Urb1calc", "SUM"]], case_field=sort_field)
 
-    arcpy.Statistics_analysis(in_table=out_ipc, out_table=out_ipc + '_stats',
-                              statistics_fields=[["IPInd2calc", "SUM"]], case_field=sort_field)
-    arcpy.Statistics_analysis(in_table=out_sect4, out_table=out_sect4 + '_stats',
-                              statistics_fields=[["S4Ind2calc", "SUM"]], case_field=sort_field)
+class _MessagesLog(object):
+    # stand-in for the messages object in worker processes, messages are replayed in the parent process afterwards
+    def __init__(self):
+        self.messages = list()
+
+    def addMessage(self, msg):
+        self.messages.append(msg)
+
+
+def _process_pool(processes, initializer=None, initargs=()):
+    # child processes need to be spawned with a Python interpreter (rather than e.g. ArcMap.exe)
+    if not path.basename(sys.executable).lower().startswith('python'):
+        multiprocessing.set_executable(path.join(sys.exec_prefix, 'python.exe'))
+
+    return multiprocessing.Pool(processes=processes, initializer=initializer, initargs=initargs)
+
+
+def _run_stage_in_scratch(project_name, name, function, args, kwargs, scratch_folder):
+    # each worker writes in its own scratch geodatabase to avoid schema locks on the output geodatabase
+    arcpy.env.overwriteOutput = True
+    scratch_gdb = sep.join([scratch_folder, '{}_{}_scratch.gdb'.format(project_name, name)])
+    if arcpy.Exists(scratch_gdb):
+        arcpy.Delete_management(scratch_gdb)
+    arcpy.CreateFileGDB_management(out_folder_path=scratch_folder, out_name=path.basename(scratch_gdb))
+
+    log = _MessagesLog()
+    outputs = _as_tuple(function(*(args + (scratch_gdb, log)), **kwargs))
+
+    return scratch_gdb, outputs, log.messages
+
+
+def _is_in_memory(workspace):
+    # 'in_memory' for ArcMap and ArcGIS Pro, 'memory' for ArcGIS Pro only
+    return workspace.lower() in ('in_memory', 'memory')
+
+
+def _on_disk(value, shared_gdb, copies):
+    # the workers do not share the memory of the parent process, so the datasets kept in memory among their arguments
+    # (e.g. the selected location, the overlays of another scenario) are replaced by copies in a geodatabase on disk,
+    # made only once for all the workers
+    if isinstance(value, (list, tuple)):
+        return type(value)(_on_disk(v, shared_gdb, copies) for v in value)
+    if isinstance(value, dict):
+        return dict((k, _on_disk(v, shared_gdb, copies)) for k, v in value.items())
+    if not (isinstance(value, string_types) and _is_in_memory(value.replace('\\', '/').split('/')[0])):
+        return value
+
+    if value not in copies:
+        if not arcpy.Exists(shared_gdb):
+            arcpy.CreateFileGDB_management(out_folder_path=path.dirname(shared_gdb),
+                                           out_name=path.basename(shared_gdb))
+        copies[value] = sep.join([shared_gdb, value.replace('\\', '/').split('/')[-1]])
+        arcpy.Copy_management(in_data=value, out_data=copies[value])
+
+    return copies[value]
+
+
+def _run_stages_in_parallel(project_name, stages, out_gdb, messages, processes, completed_stage):
+    # the scratch geodatabases are created alongside the output geodatabase (or in the scratch folder of the
+    # environment if the outputs are kept in memory, since the memory of the workers is not shared)
+    scratch_folder = arcpy.env.scratchFolder if _is_in_memory(out_gdb) else path.dirname(out_gdb)
+
+    shared_gdb = sep.join([scratch_folder, '{}_shared_scratch.gdb'.format(project_name)])
+    copies = dict()
+
+    messages.addMessage("> Running {} source tools on {} processes.".format(len(stages),
+                                                                           min(processes, len(stages))))
+    pool = _process_pool(min(processes, len(stages)))
+    try:
+        results = [pool.apply_async(_run_stage_in_scratch,
+                                    (project_name, name, function, _on_disk(args, shared_gdb, copies),
+                                     _on_disk(kwargs, shared_gdb, copies), scratch_folder))
+                   for name, categories, function, args, kwargs in stages]
+
+        # collect the results in the order of the stages so that messages and outputs are deterministic
+        for (name, categories, function, args, kwargs), result in zip(stages, results):
+            scratch_gdb, scratch_outputs, log = result.get()
+            for msg in log:
+                messages.addMessage(msg)
+            # merge the outputs into the output geodatabase under the names they would have in a sequential run
+            stage_outputs = tuple(sep.join([out_gdb, path.basename(scratch_output)])
+                                  for scratch_output in scratch_outputs)
+            for scratch_output, output in zip(scratch_outputs, stage_outputs):
+                arcpy.Copy_management(in_data=scratch_output, out_data=output)
+            completed_stage(name, categories, args, stage_outputs)
+            # garbage collection of the scratch geodatabase
+            arcpy.Delete_management(scratch_gdb)
+    finally:
+        pool.close()
+        pool.join()
+        # garbage collection of the copies of the datasets kept in memory
+        if copies:
+            arcpy.Delete_management(shared_gdb)
+
+
+def load_apportionment_v3_partitioned(project_name, nutrient, location, sort_field, in_lc_field,
+                                      in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                                      in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                                      ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                                      ex_ipc, ex_sect4, ex_dwts, ex_agglo,
+                                      out_gdb,
+                                      messages,
+                                      partitions, processes=None):
+    # split the location into chunks of whole sub-regions balanced by area, so that the outputs of the source tools
+    # for all chunks put together are the same as for the whole location
+    chunks = _partition_location(location, sort_field, partitions)
+
+    # the wastewater treatment plants are joined to their closest sub-region (within a search radius), which may not
+    # be in the same chunk, so they are processed on the whole location (the join of points is cheap)
+    if not ex_agglo:
+        ex_agglo = wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_uww_field,
+                                               out_gdb, messages)
+
+    # the scratch geodatabases are created alongside the output geodatabase (or in the scratch folder of the
+    # environment if the outputs are kept in memory, since the memory of the workers is not shared)
+    scratch_folder = arcpy.env.scratchFolder if _is_in_memory(out_gdb) else path.dirname(out_gdb)
+    processes = min(processes if processes else len(chunks), len(chunks))
+
+    # the existing outputs are not read by the workers (they are only reused as they are), unlike the location and
+    # the inputs, which are copied on disk if they are kept in memory
+    shared_gdb = sep.join([scratch_folder, '{}_shared_scratch.gdb'.format(project_name)])
+    copies = dict()
+    existing = [ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                ex_ipc, ex_sect4, ex_dwts, ex_agglo]
+    args = _on_disk((project_name, nutrient, location, sort_field, in_lc_field,
+                     in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                     in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field), shared_gdb, copies) + (existing,)
+
+    messages.addMessage("> Running source tools on {} partitions of Location on {} processes.".format(len(chunks),
+                                                                                                   processes))
+    results = list()
+    pool = _process_pool(processes)
+    try:
+        pending = [pool.apply_async(_run_partition_in_scratch, args + (i, chunk, scratch_folder))
+                   for i, chunk in enumerate(chunks)]
+        # collect the results in the order of the chunks so that messages and outputs are deterministic
+        for result in pending:
+            scratch_gdb, scratch_outputs, log = result.get()
+            for msg in log:
+                messages.addMessage(msg)
+            results.append((scratch_gdb, scratch_outputs))
+    finally:
+        pool.close()
+        pool.join()
+        # garbage collection of the copies of the datasets kept in memory
+        if copies:
+            arcpy.Delete_management(shared_gdb)
+
+    # merge the outputs of all chunks into the output geodatabase under the names they would have in a single run
+    messages.addMessage("> Merging the outputs of the partitions of Location.")
+    outputs = list()
+    for i, reused in enumerate(existing):
+        if reused:
+            outputs.append(reused)
+        else:
+            output = sep.join([out_gdb, path.basename(results[0][1][i])])
+            arcpy.Merge_management(inputs=[scratch_outputs[i] for scratch_gdb, scratch_outputs in results],
+                                   output=output)
+            outputs.append(output)
+
+    # garbage collection of the scratch geodatabases
+    for scratch_gdb, scratch_outputs in results:
+        arcpy.Delete_management(scratch_gdb)
+
+    return tuple(outputs)
+
+
+def _partition_location(location, sort_field, partitions):
+    # total area of each sub-region (which may consist of several features)
+    areas = dict()
+    with arcpy.da.SearchCursor(location, [sort_field, 'SHAPE@AREA']) as cursor:
+        for value, area in cursor:
+            areas[value] = areas.get(value, 0.) + (area or 0.)
+
+    # assign the largest sub-regions first, each to the chunk with the smallest area so far
+    heap = [(0., i, list()) for i in range(min(partitions, len(areas)))]
+    for value in sorted(areas, key=lambda v: -areas[v]):
+        area, i, values = heapq.heappop(heap)
+        values.append(value)
+        heapq.heappush(heap, (area + areas[value], i, values))
+
+    return [values for area, i, values in sorted(heap, key=lambda chunk: chunk[1])]
+
+
+def _run_partition_in_scratch(project_name, nutrient, location, sort_field, in_lc_field,
+                              in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                              in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field, existing,
+                              index, values, scratch_folder):
+    # each worker writes in its own scratch geodatabase to avoid schema locks on the output geodatabase
+    arcpy.env.overwriteOutput = True
+    scratch_gdb = sep.join([scratch_folder, '{}_Partition{}_scratch.gdb'.format(project_name, index)])
+    if arcpy.Exists(scratch_gdb):
+        arcpy.Delete_management(scratch_gdb)
+    arcpy.CreateFileGDB_management(out_folder_path=scratch_folder, out_name=path.basename(scratch_gdb))
+
+    # select the sub-regions of the chunk
+    log = _MessagesLog()
+    log.addMessage("> Selecting partition {} of Location ({} sub-regions).".format(index + 1, len(values)))
+    chunk = sep.join([scratch_gdb, project_name + '_Partition'])
+    arcpy.Select_analysis(in_features=location, out_feature_class=chunk,
+                          where_clause="{} IN ({})".format(
+                              arcpy.AddFieldDelimiters(location, sort_field),
+                              ", ".join("'{}'".format(v.replace("'", "''")) if isinstance(v, string_types)
+                                        else str(v) for v in values)))
+
+    outputs = load_apportionment_v3_geoprocessing(project_name, nutrient, chunk, in_lc_field,
+                                                  in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                                                  in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                                                  *(existing + [scratch_gdb, log]))
+
+    return scratch_gdb, outputs, log.messages
 
-    arcpy.Statistics_analysis(in_table=out_dwts, out_table=out_dwts + '_stats',
-                              statistics_fields=[["GWSept2calc", "SUM"], ["Sept2calc", "SUM"]], case_field=sort_field)
 
-    arcpy.Statistics_analysis(in_table=out_agglo, out_table=out_agglo + '_stats',
-                              statistics_fields=[["Wast3calc", "SUM"]], case_field=sort_field)
+def load_apportionment_v3_stats_and_summary(project_name, nutrient, location, sort_field, out_gdb,
+                                            out_arable, out_pasture, out_atm_depo, out_forest, out_peat, out_urban,
+                                            out_ipc, out_sect4, out_dwts, out_agglo,
+                                            messages,
+                                            out_summary=None):
 
     # copy the input region or sub-region into the output gdb to store the results in
     messages.addMessage("> Creating output feature class to store load apportionment for {}.".format(nutrient))
@@ -441,51 +761,21 @@ def load_apportionment_v3_stats_and_summary(project_name, nutrient, location, so
 
     arcpy.CopyFeatures_management(in_features=location, out_feature_class=out_summary)
 
-    # combine the source loads into output summary
-    messages.addMessage("> Gathering all sources of {} in output feature class.".format(nutrient))
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_arable + '_stats', join_field=sort_field,
-                               fields=["SUM_GWArab2calc", "SUM_Arab2calc"])
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_pasture + '_stats', join_field=sort_field,
-                               fields=["SUM_GWPast2calc", "SUM_Past2calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_atm_depo + '_stats', join_field=sort_field,
-                               fields=["SUM_Atm2calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_forest + '_stats', join_field=sort_field,
-                               fields=["SUM_For1calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_peat + '_stats', join_field=sort_field,
-                               fields=["SUM_Peat1calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_urban + '_stats', join_field=sort_field,
-                               fields=["SUM_Urb1calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_ipc + '_stats', join_field=sort_field,
-                               fields=["SUM_IPInd2calc"])
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_sect4 + '_stats', join_field=sort_field,
-                               fields=["SUM_S4Ind2calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_dwts + '_stats', join_field=sort_field,
-                               fields=["SUM_GWSept2calc", "SUM_Sept2calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_agglo + '_stats', join_field=sort_field,
-                               fields=["SUM_Wast3calc"])
+    # calculate the summary loads using the sorting field provided for each source load, and gather them all
+    messages.addMessage("> Calculating summary loads for all sources of {}.".format(nutrient))
 
-    # garbage collection of the summary stats feature classes created for each individual source load
-    for source in [out_arable, out_pasture, out_atm_depo, out_forest, out_peat,
-                   out_urban, out_ipc, out_sect4, out_dwts, out_agglo]:
-        arcpy.Delete_management(source + '_stats')
+    summarise_source_loads(out_summary, sort_field, [
+        (out_arable, ["GWArab2calc", "Arab2calc"]),
+        (out_pasture, ["GWPast2calc", "Past2calc"]),
+        (out_atm_depo, ["Atm2calc"]),
+        (out_forest, ["For1calc"]),
+        (out_peat, ["Peat1calc"]),
+        (out_urban, ["Urb1calc"]),
+        (out_ipc, ["IPInd2calc"]),
+        (out_sect4, ["S4Ind2calc"]),
+        (out_dwts, ["GWSept2calc", "Sept2calc"]),
+        (out_agglo, ["Wast3calc"])
+    ])
 
     return out_summary
 
@@ -837,27 +1127,36 @@ def load_apportionment_v2_geoprocessing(project_name, nutrient, location, in_lc_
     else:
         out_atm_depo = \
             atmos_v2_geoprocessing(project_name, nutrient, location, in_atm_depo, out_gdb, messages)
+    # intersect the land cover only once if it is required by more than one of forestry, peat, and urban
+    if len([ex for ex in [ex_forest, ex_peat, ex_urban] if not ex]) > 1:
+        in_overlay = land_cover_v1_geoprocessing(project_name, location, in_land_cover, in_lc_field,
+                                                 out_gdb, messages)
+    else:
+        in_overlay = None
     if ex_forest:
         messages.addMessage("> Reusing existing data for forestry.")
         out_forest = ex_forest
     else:
         out_forest = \
             forestry_v1_geoprocessing(project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
-                                      out_gdb, messages)
+                                      out_gdb, messages, in_overlay=in_overlay)
     if ex_peat:
         messages.addMessage("> Reusing existing data for peatlands.")
         out_peat = ex_peat
     else:
         out_peat = \
             peat_v1_geoprocessing(project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
-                                  out_gdb, messages)
+                                  out_gdb, messages, in_overlay=in_overlay)
     if ex_urban:
         messages.addMessage("> Reusing existing data for diffuse urban.")
         out_urban = ex_urban
     else:
         out_urban = \
             urban_v1_geoprocessing(project_name, nutrient, location, in_land_cover, in_lc_field, in_factors,
-                                   out_gdb, messages)
+                                   out_gdb, messages, in_overlay=in_overlay)
+    # garbage collection of the intersected land cover
+    if in_overlay:
+        arcpy.Delete_management(in_overlay)
     if ex_ipc and ex_sect4:
         messages.addMessage("> Reusing existing data for IPC and Section 4 industries.")
         out_ipc, out_sect4 = ex_ipc, ex_sect4
@@ -890,37 +1189,6 @@ def load_apportionment_v2_stats_and_summary(project_name, nutrient, location, so
                                             messages,
                                             out_summary=None):
 
-    # calculate the summary statistics using the sorting field provided for each source load
-    messages.addMessage("> Calculating summary loads for all sources of {}.".format(nutrient))
-
-    arcpy.Statistics_analysis(in_table=out_arable, out_table=out_arable + '_stats',
-                              statistics_fields=[["GWArab2calc", "SUM"], ["Arab2calc", "SUM"]], case_field=sort_field)
-    arcpy.Statistics_analysis(in_table=out_pasture, out_table=out_pasture + '_stats',
-                              statistics_fields=[["GWPast2calc", "SUM"], ["Past2calc", "SUM"]], case_field=sort_field)
-
-    arcpy.Statistics_analysis(in_table=out_atm_depo, out_table=out_atm_depo + '_stats',
-                              statistics_fields=[["Atm2calc", "SUM"]], case_field=sort_field)
-
-    arcpy.Statistics_analysis(in_table=out_forest, out_table=out_forest + '_stats',
-                              statistics_fields=[["For1calc", "SUM"]], case_field=sort_field)
-
-    arcpy.Statistics_analysis(in_table=out_peat, out_table=out_peat + '_stats',
-                              statistics_fields=[["Peat1calc", "SUM"]], case_field=sort_field)
-
-    arcpy.Statistics_analysis(in_table=out_urban, out_table=out_urban + '_stats',
-                              statistics_fields=[["Urb1calc", "SUM"]], case_field=sort_field)
-
-    arcpy.Statistics_analysis(in_table=out_ipc, out_table=out_ipc + '_stats',
-                              statistics_fields=[["IPInd2calc", "SUM"]], case_field=sort_field)
-    arcpy.Statistics_analysis(in_table=out_sect4, out_table=out_sect4 + '_stats',
-                              statistics_fields=[["S4Ind2calc", "SUM"]], case_field=sort_field)
-
-    arcpy.Statistics_analysis(in_table=out_dwts, out_table=out_dwts + '_stats',
-                              statistics_fields=[["GWSept2calc", "SUM"], ["Sept2calc", "SUM"]], case_field=sort_field)
-
-    arcpy.Statistics_analysis(in_table=out_agglo, out_table=out_agglo + '_stats',
-                              statistics_fields=[["SWOWast2calc", "SUM"], ["Wast2calc", "SUM"]], case_field=sort_field)
-
     # copy the input region or sub-region into the output gdb to store the results in
     messages.addMessage("> Creating output feature class to store load apportionment for {}.".format(nutrient))
 
@@ -929,50 +1197,41 @@ def load_apportionment_v2_stats_and_summary(project_name, nutrient, location, so
 
     arcpy.CopyFeatures_management(in_features=location, out_feature_class=out_summary)
 
-    # combine the source loads into output summary
-    messages.addMessage("> Gathering all sources of {} in output feature class.".format(nutrient))
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_arable + '_stats', join_field=sort_field,
-                               fields=["SUM_GWArab2calc", "SUM_Arab2calc"])
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_pasture + '_stats', join_field=sort_field,
-                               fields=["SUM_GWPast2calc", "SUM_Past2calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_atm_depo + '_stats', join_field=sort_field,
-                               fields=["SUM_Atm2calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_forest + '_stats', join_field=sort_field,
-                               fields=["SUM_For1calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_peat + '_stats', join_field=sort_field,
-                               fields=["SUM_Peat1calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_urban + '_stats', join_field=sort_field,
-                               fields=["SUM_Urb1calc"])
-
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_ipc + '_stats', join_field=sort_field,
-                               fields=["SUM_IPInd2calc"])
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_sect4 + '_stats', join_field=sort_field,
-                               fields=["SUM_S4Ind2calc"])
+    # calculate the summary loads using the sorting field provided for each source load, and gather them all
+    messages.addMessage("> Calculating summary loads for all sources of {}.".format(nutrient))
 
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_dwts + '_stats', join_field=sort_field,
-                               fields=["SUM_GWSept2calc", "SUM_Sept2calc"])
+    summarise_source_loads(out_summary, sort_field, [
+        (out_arable, ["GWArab2calc", "Arab2calc"]),
+        (out_pasture, ["GWPast2calc", "Past2calc"]),
+        (out_atm_depo, ["Atm2calc"]),
+        (out_forest, ["For1calc"]),
+        (out_peat, ["Peat1calc"]),
+        (out_urban, ["Urb1calc"]),
+        (out_ipc, ["IPInd2calc"]),
+        (out_sect4, ["S4Ind2calc"]),
+        (out_dwts, ["GWSept2calc", "Sept2calc"]),
+        (out_agglo, ["SWOWast2calc", "Wast2calc"])
+    ])
 
-    arcpy.JoinField_management(in_data=out_summary, in_field=sort_field,
-                               join_table=out_agglo + '_stats', join_field=sort_field,
-                               fields=["SUM_SWOWast2calc", "SUM_Wast2calc"])
+    return out_summary
 
-    # garbage collection of the summary stats feature classes created for each individual source load
-    for source in [out_arable, out_pasture, out_atm_depo, out_forest, out_peat,
-                   out_urban, out_ipc, out_sect4, out_dwts, out_agglo]:
-        arcpy.Delete_management(source + '_stats')
 
-    return out_summary
+def summarise_source_loads(out_summary, sort_field, sources):
+    """Sum the load fields of each source output by sub-region, and write all the sums in the summary feature
+    class in one update pass (i.e. as 'SUM_<field>' fields, equivalent of Statistics_analysis and JoinField).
+
+    :param out_summary: path of the feature class of the sub-regions where to write the summary loads [required]
+    :type out_summary: str
+    :param sort_field: name of the field used to sort the results into sub-regions [required]
+    :type sort_field: str
+    :param sources: pairs of path of the source output and names of its load fields to sum [required]
+    :type sources: list
+    """
+    out_fields = list()
+    for source, fields in sources:
+        sums = sum_fields_by(source, sort_field, fields)
+        for i, field in enumerate(fields):
+            out_fields.append(('SUM_{}'.format(field),
+                               lambda v, sums=sums, i=i: sums[v[sort_field]][i] if v[sort_field] in sums else None))
+
+    calculate_fields(in_table=out_summary, in_fields=[sort_field], out_fields=out_fields)
@@ -1,6 +1,10 @@
 from os import path, sep
+import numpy as np
 import arcpy
 
+from ._fields import add_fields
+from ._totals import sources_v2, sources_v3, input_fields, calculate_totals
+
 
 class PostProcessingV3(object):
     def __init__(self):
@@ -61,7 +65,7 @@ class PostProcessingV3(object):
 
 
 def postprocessing_v3_geoprocessing(project_name, nutrient, out_gdb, messages,
-                                    out_summary=None):
+                                    out_summary=None, index_field=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -73,6 +77,11 @@ def postprocessing_v3_geoprocessing(project_name, nutrient, out_gdb, messages,
     :type messages: instance of a class featuring a 'addMessage' method
     :param out_summary: path of the output feature class containing the calculated nutrient loads [optional]
     :type out_summary: str
+    :param index_field: name of a field of out_summary to return alongside the calculated fields (e.g. the field
+        used to sort the results into sub-regions) [optional]
+    :type index_field: str
+    :return: the values of the area, of the calculated fields, and of the index field (if provided) by field name
+    :rtype: collections.OrderedDict
     """
 
     if not out_summary:
@@ -81,137 +90,8 @@ def postprocessing_v3_geoprocessing(project_name, nutrient, out_gdb, messages,
     # calculate load for atmospheric deposition
     messages.addMessage("> Calculating {} loads totals and sub-totals.".format(nutrient))
 
-    # calculate the required totals and sub-totals
-    arcpy.AddField_management(in_table=out_summary, field_name="Wastewater", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Wastewater",
-                                    expression="!SUM_Wast3calc! if !SUM_Wast3calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Industry", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Industry",
-                                    expression="!SUM_IPInd2calc! if !SUM_IPInd2calc! is not None else 0 + "
-                                               "!SUM_S4Ind2calc! if !SUM_S4Ind2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Diffuse_Urban", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Diffuse_Urban",
-                                    expression="!SUM_Urb1calc! if !SUM_Urb1calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Septic_Tank_Systems", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Septic_Tank_Systems",
-                                    expression="!SUM_Sept2calc! if !SUM_Sept2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Pasture", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Pasture",
-                                    expression="!SUM_GWPast2calc! if !SUM_GWPast2calc! is not None else 0 + "
-                                               "!SUM_Past2calc! if !SUM_Past2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Arable", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Arable",
-                                    expression="!SUM_GWArab2calc! if !SUM_GWArab2calc! is not None else 0 + "
-                                               "!SUM_Arab2calc! if !SUM_Arab2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Forestry", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Forestry",
-                                    expression="!SUM_For1calc! if !SUM_For1calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Peatlands", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Peatlands",
-                                    expression="!SUM_Peat1calc! if !SUM_Peat1calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Lake_Deposition", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Lake_Deposition",
-                                    expression="!SUM_Atm2calc! if !SUM_Atm2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="TotalDiffuse", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="TotalDiffuse",
-                                    expression="!Diffuse_Urban! + !Pasture! + !Arable! + "
-                                               "!Forestry! + !Peatlands! + !Lake_Deposition!",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="TotalPoint", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="TotalPoint",
-                                    expression="!Wastewater! + !Industry! + !Septic_Tank_Systems!",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Total", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Total",
-                                    expression="!TotalDiffuse! + !TotalPoint!",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="TotalHa", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="TotalHa",
-                                    expression="value(float(!Total!), float(!AREAKM2!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(total, area):
-                                    if area == 0:
-                                        return 0
-                                    else:
-                                        return total / (area * 100)
-                                    """)
-
-    arcpy.AddField_management(in_table=out_summary, field_name="PercentGW", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="PercentGW",
-                                    expression="value(float(!Total!), "
-                                               "float(!SUM_GWSept2calc! if !SUM_GWSept2calc! is not None else 0), "
-                                               "float(!SUM_GWPast2calc! if !SUM_GWPast2calc! is not None else 0), "
-                                               "float(!SUM_GWArab2calc! if !SUM_GWArab2calc! is not None else 0))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(total, gw_septic_tanks, gw_pasture, gw_arable):
-                                    if total == 0:
-                                        return 0
-                                    else:
-                                        return (gw_septic_tanks + gw_pasture + gw_arable) / total * 100
-                                    """)
-
-    arcpy.AddField_management(in_table=out_summary, field_name="PercentPoint", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="PercentPoint",
-                                    expression="value(float(!Total!), float(!TotalPoint!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(total, total_point):
-                                    if total == 0:
-                                        return 0
-                                    else:
-                                        return total_point / total * 100
-                                    """)
-
-    arcpy.AddField_management(in_table=out_summary, field_name="PercentPasture", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="PercentPasture",
-                                    expression="value(float(!Total!), float(!Pasture!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(total, pasture):
-                                    if total == 0:
-                                        return 0
-                                    else:
-                                        return pasture / total * 100
-                                    """)
+    # calculate the required totals and sub-totals for all sub-regions at once, and write them in one update pass
+    return calculate_totals_in_table(out_summary, sources_v3, index_field)
 
 
 class PostProcessingV2(object):
@@ -273,7 +153,7 @@ class PostProcessingV2(object):
 
 
 def postprocessing_v2_geoprocessing(project_name, nutrient, out_gdb, messages,
-                                    out_summary=None):
+                                    out_summary=None, index_field=None):
     """
     :param project_name: name of the project that will be used to identify the outputs in the geodatabase [required]
     :type project_name: str
@@ -285,6 +165,11 @@ def postprocessing_v2_geoprocessing(project_name, nutrient, out_gdb, messages,
     :type messages: instance of a class featuring a 'addMessage' method
     :param out_summary: path of the output feature class containing the calculated nutrient loads [optional]
     :type out_summary: str
+    :param index_field: name of a field of out_summary to return alongside the calculated fields (e.g. the field
+        used to sort the results into sub-regions) [optional]
+    :type index_field: str
+    :return: the values of the area, of the calculated fields, and of the index field (if provided) by field name
+    :rtype: collections.OrderedDict
     """
 
     if not out_summary:
@@ -293,135 +178,39 @@ def postprocessing_v2_geoprocessing(project_name, nutrient, out_gdb, messages,
     # calculate load for atmospheric deposition
     messages.addMessage("> Calculating {} loads totals and sub-totals.".format(nutrient))
 
-    # calculate the required totals and sub-totals
-    arcpy.AddField_management(in_table=out_summary, field_name="Wastewater", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Wastewater",
-                                    expression="!SUM_SWOWast2calc! if !SUM_SWOWast2calc! is not None else 0 + "
-                                               "!SUM_Wast2calc! if !SUM_Wast2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Industry", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Industry",
-                                    expression="!SUM_IPInd2calc! if !SUM_IPInd2calc! is not None else 0 + "
-                                               "!SUM_S4Ind2calc! if !SUM_S4Ind2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Diffuse_Urban", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Diffuse_Urban",
-                                    expression="!SUM_Urb1calc! if !SUM_Urb1calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Septic_Tank_Systems", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Septic_Tank_Systems",
-                                    expression="!SUM_Sept2calc! if !SUM_Sept2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Pasture", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Pasture",
-                                    expression="!SUM_GWPast2calc! if !SUM_GWPast2calc! is not None else 0 + "
-                                               "!SUM_Past2calc! if !SUM_Past2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Arable", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Arable",
-                                    expression="!SUM_GWArab2calc! if !SUM_GWArab2calc! is not None else 0 + "
-                                               "!SUM_Arab2calc! if !SUM_Arab2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Forestry", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Forestry",
-                                    expression="!SUM_For1calc! if !SUM_For1calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Peatlands", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Peatlands",
-                                    expression="!SUM_Peat1calc! if !SUM_Peat1calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Lake_Deposition", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Lake_Deposition",
-                                    expression="!SUM_Atm2calc! if !SUM_Atm2calc! is not None else 0",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="TotalDiffuse", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="TotalDiffuse",
-                                    expression="!Diffuse_Urban! + !Pasture! + !Arable! + "
-                                               "!Forestry! + !Peatlands! + !Lake_Deposition!",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="TotalPoint", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="TotalPoint",
-                                    expression="!Wastewater! + !Industry! + !Septic_Tank_Systems!",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="Total", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="Total",
-                                    expression="!TotalDiffuse! + !TotalPoint!",
-                                    expression_type="PYTHON_9.3")
-
-    arcpy.AddField_management(in_table=out_summary, field_name="TotalHa", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="TotalHa",
-                                    expression="value(float(!Total!), float(!AREAKM2!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(total, area):
-                                    if area == 0:
-                                        return 0
-                                    else:
-                                        return total / (area * 100)
-                                    """)
-
-    arcpy.AddField_management(in_table=out_summary, field_name="PercentGW", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="PercentGW",
-                                    expression="value(float(!Total!), "
-                                               "float(!SUM_GWSept2calc! if !SUM_GWSept2calc! is not None else 0), "
-                                               "float(!SUM_GWPast2calc! if !SUM_GWPast2calc! is not None else 0), "
-                                               "float(!SUM_GWArab2calc! if !SUM_GWArab2calc! is not None else 0))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(total, gw_septic_tanks, gw_pasture, gw_arable):
-                                    if total == 0:
-                                        return 0
-                                    else:
-                                        return (gw_septic_tanks + gw_pasture + gw_arable) / total * 100
-                                    """)
-
-    arcpy.AddField_management(in_table=out_summary, field_name="PercentPoint", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="PercentPoint",
-                                    expression="value(float(!Total!), float(!TotalPoint!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(total, total_point):
-                                    if total == 0:
-                                        return 0
-                                    else:
-                                        return total_point / total * 100
-                                    """)
-
-    arcpy.AddField_management(in_table=out_summary, field_name="PercentPasture", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_summary, field="PercentPasture",
-                                    expression="value(float(!Total!), float(!Pasture!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(total, pasture):
-                                    if total == 0:
-                                        return 0
-                                    else:
-                                        return pasture / total * 100
-                                    """)
+    # calculate the required totals and sub-totals for all sub-regions at once, and write them in one update pass
+    return calculate_totals_in_table(out_summary, sources_v2, index_field)
+
+
+def calculate_totals_in_table(in_table, sources, index_field=None):
+    """
+    :param in_table: path of the feature class containing the summary load fields (i.e. 'SUM_*' fields) [required]
+    :type in_table: str
+    :param sources: the summary load fields giving the load of each source (e.g. sources_v3) [required]
+    :type sources: list
+    :param index_field: name of a field of in_table to return alongside the calculated fields [optional]
+    :type index_field: str
+    :return: the values of the area, of the calculated fields, and of the index field (if provided) by field name
+    :rtype: collections.OrderedDict
+    """
+    # read all the required fields in one pass (null values as NaN)
+    fields = input_fields(sources)
+    array = arcpy.da.TableToNumPyArray(in_table=in_table,
+                                       field_names=['OID@'] + ([index_field] if index_field else []) + fields,
+                                       skip_nulls=False, null_value={name: np.nan for name in fields})
+
+    totals = calculate_totals({name: array[name] for name in fields}, sources)
+
+    # add all the calculated fields in one schema change, and write them in one pass
+    add_fields(in_table, list(totals))
+    positions = {oid: i for i, oid in enumerate(array['OID@'].tolist())}
+    with arcpy.da.UpdateCursor(in_table, ['OID@'] + list(totals)) as cursor:
+        for row in cursor:
+            i = positions[row[0]]
+            cursor.updateRow([row[0]] + [float(values[i]) for values in totals.values()])
+
+    if index_field:
+        totals[index_field] = array[index_field]
+    totals['AREAKM2'] = array['AREAKM2']
+
+    return totals
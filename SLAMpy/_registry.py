@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+import threading
+import weakref
+
+
+class NameRegistry(object):
+    """Registry of the names of the scenarios in use, which only holds
+    weak references to the scenarios, so that a name is released as
+    soon as its scenario is garbage-collected.
+
+    The names are kept in a hash table, so that registering, releasing,
+    and looking up a name takes constant time regardless of the number
+    of scenarios created. A name is checked and registered under a lock,
+    so that scenarios created in several threads cannot take the same
+    name.
+    """
+    def __init__(self):
+        self._scenarios = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._scenarios
+
+    def __len__(self):
+        return len(self._scenarios)
+
+    def names(self):
+        """
+        :return: the names of the scenarios currently alive
+        :rtype: list
+        """
+        return list(self._scenarios.keys())
+
+    def register(self, name, scenario):
+        """
+        :param name: name of the scenario [required]
+        :type name: str
+        :param scenario: scenario to register under this name [required]
+        :type scenario: Scenario
+        """
+        with self._lock:
+            if name in self._scenarios:
+                raise RuntimeError("A scenario named '{}' already exists, "
+                                   "please choose another name for this scenario.".format(name))
+            self._scenarios[name] = scenario
+
+    def release(self, name):
+        """Make the name available again while its scenario is still
+        alive (e.g. to replace the scenario with another one).
+
+        :param name: name of the scenario [required]
+        :type name: str
+        """
+        with self._lock:
+            self._scenarios.pop(name, None)
+
+    def clear(self):
+        """Make all the names available again."""
+        with self._lock:
+            self._scenarios.clear()
+
+
+class ScopedRegistry(object):
+    """Registry of the names of the scenarios shared by all the threads,
+    where each thread can open scopes with their own registry (see
+    scope), without affecting the names seen by the other threads (e.g.
+    the threads of a ScenarioExecutor).
+
+    It is used as a NameRegistry, and acts on the registry of the
+    innermost scope opened by the current thread, or on the shared
+    registry if the thread has no scope opened.
+    """
+    def __init__(self):
+        self._shared = NameRegistry()
+        self._local = threading.local()
+
+    def _scopes(self):
+        if not hasattr(self._local, 'scopes'):
+            self._local.scopes = list()
+        return self._local.scopes
+
+    def current(self):
+        """
+        :return: the registry in use in the current thread
+        :rtype: NameRegistry
+        """
+        scopes = self._scopes()
+        return scopes[-1] if scopes else self._shared
+
+    @contextmanager
+    def scope(self):
+        """Context manager giving the current thread a new registry
+        until its exit, where the previous one is in use again.
+        """
+        registry = NameRegistry()
+        scopes = self._scopes()
+        scopes.append(registry)
+        try:
+            yield registry
+        finally:
+            scopes.pop()
+
+    def __contains__(self, name):
+        return name in self.current()
+
+    def __len__(self):
+        return len(self.current())
+
+    def names(self):
+        return self.current().names()
+
+    def register(self, name, scenario):
+        self.current().register(name, scenario)
+
+    def release(self, name):
+        self.current().release(name)
+
+    def clear(self):
+        self.current().clear()
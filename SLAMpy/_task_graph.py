@@ -0,0 +1,235 @@
+from collections import OrderedDict
+import hashlib
+import time
+
+
+class TaskOutput(object):
+    """Placeholder for an output of a task in the arguments of another
+    task, replaced by the actual output when the graph is run."""
+    def __init__(self, task, index=0):
+        self.task = task
+        self.index = index
+
+    def __repr__(self):
+        return 'TaskOutput({!r}, {!r})'.format(self.task, self.index)
+
+
+class TaskGraph(object):
+    """Directed acyclic graph of tasks, where each task is identified by
+    a fingerprint of its function, of its inputs, and of the
+    fingerprints of the tasks it depends on, so that running the graph
+    again only recomputes the tasks whose inputs changed and the tasks
+    downstream of them.
+
+    The outputs of the tasks are kept as tuples, both in memory (for
+    the graph to be run again in the same session) and, if provided,
+    in a store (e.g. a StageCheckpoint, for the tasks whose outputs are
+    datasets) to be reused across sessions.
+    """
+    def __init__(self, name, fingerprint=repr):
+        """
+        :param name: name of the graph (e.g. the name of the scenario) [required]
+        :type name: str
+        :param fingerprint: function returning a string identifying an input of a task (e.g. its path and
+            content for a dataset), repr by default [optional]
+        :type fingerprint: callable
+        """
+        self.name = name
+        self.fingerprint = fingerprint
+
+        self._tasks = OrderedDict()
+        self._records = dict()
+
+    def adopt(self, other):
+        """Reuse the outputs recorded in memory by another graph (e.g. the
+        graph built for the previous inputs of the same pipeline), for
+        the tasks whose fingerprint is unchanged.
+
+        :param other: the graph whose records to reuse [required]
+        :type other: TaskGraph
+        """
+        self._records.update(other._records)
+
+    def __contains__(self, name):
+        return name in self._tasks
+
+    def add(self, name, function, args=(), kwargs=None, inputs=None, persist=True):
+        """
+        :param name: name of the task, unique in the graph [required]
+        :type name: str
+        :param function: function run by the task [required]
+        :type function: callable
+        :param args: positional arguments of the function, which may contain TaskOutput placeholders [optional]
+        :type args: tuple
+        :param kwargs: keyword arguments of the function, which may contain TaskOutput placeholders [optional]
+        :type kwargs: dict
+        :param inputs: the values identifying the inputs of the task (e.g. leaving out the object used for
+            messages), all the arguments that are not placeholders by default [optional]
+        :type inputs: list
+        :param persist: whether the outputs of the task are datasets to record in the store [optional]
+        :type persist: bool
+        :return: the placeholder of the first output of the task
+        :rtype: TaskOutput
+        """
+        if name in self._tasks:
+            raise ValueError("A task named '{}' already exists in the graph.".format(name))
+        kwargs = kwargs if kwargs else dict()
+        arguments = list(args) + [kwargs[key] for key in sorted(kwargs)]
+        depends = sorted(set(argument.task for argument in arguments if isinstance(argument, TaskOutput)))
+        for upstream in depends:
+            if upstream not in self._tasks:
+                raise KeyError("The task '{}' depends on the task '{}' which is not in the graph "
+                               "(tasks must be added after the tasks they depend on).".format(name, upstream))
+
+        self._tasks[name] = {
+            'function': function,
+            'args': tuple(args),
+            'kwargs': kwargs,
+            'inputs': inputs if inputs is not None else
+            [argument for argument in arguments if not isinstance(argument, TaskOutput)],
+            'depends': depends,
+            'persist': persist
+        }
+
+        return TaskOutput(name)
+
+    def output(self, name, index=0):
+        """
+        :return: the placeholder of an output of a task (or its actual value once the graph was run)
+        :rtype: TaskOutput
+        """
+        if name not in self._tasks:
+            raise KeyError("There is no task named '{}' in the graph.".format(name))
+        return TaskOutput(name, index)
+
+    def upstream(self, name):
+        """
+        :return: the names of the tasks the given task directly depends on
+        :rtype: list
+        """
+        return list(self._tasks[name]['depends'])
+
+    def downstream(self, name):
+        """
+        :return: the names of the tasks that directly or indirectly depend on the given task (in run order)
+        :rtype: list
+        """
+        affected = {name}
+        for task, spec in self._tasks.items():
+            if affected.intersection(spec['depends']):
+                affected.add(task)
+        return [task for task in self._tasks if task in affected and not task == name]
+
+    def _key(self, name, keys):
+        spec = self._tasks[name]
+        digest = hashlib.sha1()
+        for part in [name, getattr(spec['function'], '__name__', repr(spec['function']))] + \
+                [self.fingerprint(value) for value in spec['inputs']] + \
+                ['{}={}'.format(upstream, keys[upstream]) for upstream in spec['depends']]:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'|')
+
+        return digest.hexdigest()
+
+    def keys(self):
+        """
+        :return: the fingerprint of each task for the current inputs (in run order)
+        :rtype: collections.OrderedDict
+        """
+        keys = OrderedDict()
+        for name in self._tasks:  # tasks are added after their dependencies, so this is a topological order
+            keys[name] = self._key(name, keys)
+        return keys
+
+    def stale(self, store=None):
+        """
+        :return: the names of the tasks that would be recomputed if the graph was run (in run order)
+        :rtype: list
+        """
+        stale = list()
+        for name, key in self.keys().items():
+            record = self._records.get(name)
+            if record is not None and record['key'] == key:
+                continue
+            if store is not None and self._tasks[name]['persist'] and store.fetch(name, key):
+                continue
+            stale.append(name)
+        return stale
+
+    def _resolve(self, value):
+        if isinstance(value, TaskOutput):
+            return self._records[value.task]['outputs'][value.index]
+        return value
+
+    def run(self, store=None, progress=None):
+        """Run the tasks of the graph whose fingerprint changed since
+        they were last run (or recorded in the store), in the order in
+        which they were added.
+
+        :param store: object recording the outputs of the tasks (featuring the methods 'fetch' and 'record' of
+            StageCheckpoint) [optional]
+        :type store: object
+        :param progress: function called with the name of each task and its status ('started', 'completed', or
+            'skipped' if its outputs are reused) [optional]
+        :type progress: callable
+        :return: the outputs of each task (as tuples)
+        :rtype: collections.OrderedDict
+        """
+        report = progress if progress else (lambda task, status: None)
+        keys = OrderedDict()
+        for name, spec in self._tasks.items():
+            keys[name] = self._key(name, keys)
+
+            # reuse the outputs of the task if its inputs and upstream tasks are unchanged
+            record = self._records.get(name)
+            if record is not None and record['key'] == keys[name]:
+                record['duration'], record['status'] = 0., 'reused'
+                report(name, 'skipped')
+                continue
+            stored = store.fetch(name, keys[name]) if store is not None and spec['persist'] else None
+            if stored:
+                self._records[name] = {'key': keys[name], 'outputs': tuple(stored), 'duration': 0.,
+                                       'status': 'reused'}
+                report(name, 'skipped')
+                continue
+
+            # otherwise run the task with the outputs of the upstream tasks in place of the placeholders
+            report(name, 'started')
+            start = time.time()
+            outputs = spec['function'](*[self._resolve(argument) for argument in spec['args']],
+                                       **dict((key, self._resolve(value)) for key, value in spec['kwargs'].items()))
+            outputs = outputs if isinstance(outputs, tuple) else (outputs,)
+            self._records[name] = {'key': keys[name], 'outputs': outputs, 'duration': time.time() - start,
+                                   'status': 'computed'}
+            if store is not None and spec['persist']:
+                store.record(name, keys[name], outputs, spec['inputs'])
+            report(name, 'completed')
+
+        return OrderedDict((name, self._records[name]['outputs']) for name in self._tasks)
+
+    def timings(self):
+        """
+        :return: the duration (in seconds) and the status ('computed' or 'reused') of each task in the last run
+        :rtype: collections.OrderedDict
+        """
+        return OrderedDict((name, (self._records[name]['duration'], self._records[name]['status']))
+                           for name in self._tasks if name in self._records)
+
+    def to_dot(self):
+        """
+        :return: the graph in the DOT language (e.g. to render with Graphviz), where each task is labelled with its
+            duration and status in the last run
+        :rtype: str
+        """
+        lines = ['digraph "{}" {{'.format(self.name), '    rankdir=LR;']
+        for name in self._tasks:
+            label = name
+            if name in self._records:
+                label += '\\n{:.1f} s ({})'.format(self._records[name]['duration'], self._records[name]['status'])
+            lines.append('    "{}" [label="{}"];'.format(name, label))
+        for name, spec in self._tasks.items():
+            for upstream in spec['depends']:
+                lines.append('    "{}" -> "{}";'.format(upstream, name))
+        lines.append('}')
+
+        return '\n'.join(lines)
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+import numpy as np
+
+
+# the summary load fields giving the load of each source (in the order of the post-processing tools), where the
+# load is the first of its fields that is not null (as in the former expressions of the post-processing tools, e.g.
+# '!A! if !A! is not None else 0 + !B! if !B! is not None else 0', which only falls back to B if A is null)
+sources_v3 = [
+    ('Wastewater', ['SUM_Wast3calc']),
+    ('Industry', ['SUM_IPInd2calc', 'SUM_S4Ind2calc']),
+    ('Diffuse_Urban', ['SUM_Urb1calc']),
+    ('Septic_Tank_Systems', ['SUM_Sept2calc']),
+    ('Pasture', ['SUM_GWPast2calc', 'SUM_Past2calc']),
+    ('Arable', ['SUM_GWArab2calc', 'SUM_Arab2calc']),
+    ('Forestry', ['SUM_For1calc']),
+    ('Peatlands', ['SUM_Peat1calc']),
+    ('Lake_Deposition', ['SUM_Atm2calc'])
+]
+
+sources_v2 = [('Wastewater', ['SUM_SWOWast2calc', 'SUM_Wast2calc'])] + sources_v3[1:]
+
+_diffuse_sources = ['Diffuse_Urban', 'Pasture', 'Arable', 'Forestry', 'Peatlands', 'Lake_Deposition']
+
+_point_sources = ['Wastewater', 'Industry', 'Septic_Tank_Systems']
+
+_groundwater_fields = ['SUM_GWSept2calc', 'SUM_GWPast2calc', 'SUM_GWArab2calc']
+
+
+def input_fields(sources):
+    """
+    :param sources: the summary load fields giving the load of each source (e.g. sources_v3) [required]
+    :type sources: list
+    :return: the names of the fields required to calculate the totals and sub-totals
+    :rtype: list
+    """
+    fields = [field for source, fields_ in sources for field in fields_]
+    return fields + [field for field in _groundwater_fields if field not in fields] + ['AREAKM2']
+
+
+def calculate_totals(columns, sources):
+    """Calculate the loads of each source, their totals and sub-totals, and the percentages for all the
+    sub-regions at once, where null values (as NaN) are counted as zero.
+
+    :param columns: arrays of the values of the summary fields (see input_fields) by field name [required]
+    :type columns: dict
+    :param sources: the summary load fields giving the load of each source (e.g. sources_v3) [required]
+    :type sources: list
+    :return: arrays of the values of the calculated fields by field name (in the order of the post-processing tools)
+    :rtype: collections.OrderedDict
+    """
+    def total(values, names):
+        return np.sum([np.nan_to_num(np.asarray(values[name], dtype=float)) for name in names], axis=0)
+
+    def first_valid(values, names):
+        value = np.full(np.shape(values[names[0]]), np.nan)
+        for name in reversed(names):
+            column = np.asarray(values[name], dtype=float)
+            value = np.where(np.isnan(column), value, column)
+        return np.nan_to_num(value)
+
+    totals = OrderedDict()
+    for source, fields in sources:
+        totals[source] = first_valid(columns, fields)
+    totals['TotalDiffuse'] = total(totals, _diffuse_sources)
+    totals['TotalPoint'] = total(totals, _point_sources)
+    totals['Total'] = totals['TotalDiffuse'] + totals['TotalPoint']
+
+    area = np.asarray(columns['AREAKM2'], dtype=float)
+    total_ = totals['Total']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        totals['TotalHa'] = np.where(area == 0, 0., total_ / (area * 100))
+        totals['PercentGW'] = np.where(total_ == 0, 0., total(columns, _groundwater_fields) / total_ * 100)
+        totals['PercentPoint'] = np.where(total_ == 0, 0., totals['TotalPoint'] / total_ * 100)
+        totals['PercentPasture'] = np.where(total_ == 0, 0., totals['Pasture'] / total_ * 100)
+
+    return totals
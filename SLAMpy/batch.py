@@ -0,0 +1,294 @@
+"""Batch runs of ScenarioV3 for many selections (e.g. catchments) of
+the same region, as a Python function (`run_batch`) and as a command
+line tool (``python -m SLAMpy.batch --help``).
+"""
+from os import sep, getpid
+from collections import OrderedDict, deque
+import argparse
+import csv
+import multiprocessing
+import sys
+import traceback
+
+try:
+    import arcpy
+except ImportError:  # arcpy is only required to run scenarios with the 'arcpy' backend
+    arcpy = None
+
+try:
+    string_types = basestring
+except NameError:  # i.e. Python 3
+    string_types = str
+
+from .scenario import Scenario, ScenarioV3, Messages
+
+if arcpy is not None:
+    from ._load_apportionment import _process_pool
+else:  # i.e. not run from an ArcGIS application, so the workers are spawned with the current interpreter
+    def _process_pool(processes, initializer=None, initargs=()):
+        return multiprocessing.Pool(processes=processes, initializer=initializer, initargs=initargs)
+
+
+# the inputs of ScenarioV3.run shared by all the selections, and those that are feature classes (opened only once
+# by each worker as feature layers)
+_input_names = ['in_arable', 'in_pasture', 'in_atm_depo', 'in_land_cover', 'in_lc_field', 'in_factors',
+                'in_ipc', 'in_sect4', 'in_dwts', 'in_agglo', 'in_uww_field']
+
+_feature_inputs = ['in_arable', 'in_pasture', 'in_atm_depo', 'in_land_cover', 'in_ipc', 'in_sect4', 'in_dwts',
+                   'in_agglo']
+
+# state of the worker (i.e. the region, the inputs, and the geodatabase), set once by _init_worker
+_worker = dict()
+
+
+def run_batch(selections, nutrient, sort_field, region, out_folder, inputs, backend='arcpy', processes=None,
+              queue_size=None, messages=None):
+    """Run a ScenarioV3 for each selection of sub-regions of a region,
+    where a failure for one selection does not abort the batch.
+
+    The region is copied into memory and the inputs are opened (as
+    feature layers) only once by each worker, rather than once for each
+    selection, and the selections are scheduled over a pool of worker
+    processes with a bounded queue of pending selections.
+
+    :Parameters:
+
+        selections: `list` or `str`
+            The pairs of name and selection (a valid SQL query on the
+            *region*, see `ScenarioV3`) for each scenario to run, or
+            the location of a table (CSV file or ArcGIS table) with the
+            fields 'name' and 'selection'.
+
+                *Parameter example:*
+                    ``selections=[('Avoca', "EU_CD LIKE 'IE_EA_10A%'"),
+                                  ('Slaney', "EU_CD LIKE 'IE_SE_12S%'")]``
+
+        nutrient: `str`
+            The nutrient for which load apportionment is sought. It can
+            either 'N' for Nitrogen or 'P' for Phosphorus.
+
+        sort_field: `str`
+            The name of the field in the *region* feature class that
+            will be used to sort the output results into sub-regions.
+
+        region: `str`
+            The location of the feature class (or shapefile) that
+            delineates the area containing all the selections.
+
+        out_folder: `str`
+            The location of the folder where each worker creates its
+            output geodatabase (for the 'arcpy' backend).
+
+        inputs: `dict`
+            The inputs for ScenarioV3.run shared by all the selections
+            (i.e. *in_arable*, *in_pasture*, *in_atm_depo*,
+            *in_land_cover*, *in_lc_field*, *in_factors*, *in_ipc*,
+            *in_sect4*, *in_dwts*, *in_agglo*, *in_uww_field*).
+
+        backend: `str`, optional
+            The engine used to carry out the load apportionment, either
+            'arcpy' or 'geopandas' (see ScenarioV3.run). If not
+            provided, the default behaviour is to use 'arcpy'.
+
+        processes: `int`, optional
+            The number of worker processes on which the selections are
+            run concurrently. If not provided, the selections are run
+            one after the other in the current process.
+
+                *Parameter example:*
+                    ``processes=32``
+
+        queue_size: `int`, optional
+            The maximum number of selections submitted to the workers
+            and not collected yet, to bound the memory used by pending
+            results. If not provided, twice the number of processes is
+            used.
+
+        messages: `object`, optional
+            The object used for communication with the user (featuring
+            an 'addMessage' method). If not provided, messages are
+            printed.
+
+    :Returns:
+
+        `tuple`
+            The scenarios run (as an `OrderedDict` of `ScenarioV3` by
+            name, in the order of the selections), and the failures (as
+            an `OrderedDict` of error messages by name).
+    """
+    messages = messages if messages else Messages()
+    if isinstance(selections, string_types):
+        selections = read_selections(selections)
+    unknown = set(inputs) - set(_input_names)
+    if unknown:
+        raise ValueError("The following inputs are not valid: {}.".format(sorted(unknown)))
+
+    # check the names up front, since the scenarios are only created once their run is complete
+    names, duplicates = set(), set()
+    for name, selection in selections:
+        (duplicates if name in names else names).add(name)
+    duplicates = sorted(duplicates)
+    if duplicates:
+        raise ValueError("The following names are used for more than one selection: {}.".format(duplicates))
+    existing = sorted(name for name in names if name in Scenario._registry)
+    if existing:
+        raise RuntimeError("Scenarios named {} already exist, please choose other names for "
+                           "these selections.".format(existing))
+
+    initargs = (region, inputs, out_folder, backend)
+    tasks = [(name, selection, nutrient, sort_field) for name, selection in selections]
+    selections = dict(selections)
+
+    scenarios, failures = OrderedDict(), OrderedDict()
+
+    def collect(result):
+        name, outcome, error = result
+        if error is None:
+            scenarios[name] = _scenario_from_outcome(name, nutrient, sort_field, region, selections[name], outcome)
+        else:
+            failures[name] = error
+        messages.addMessage("> [{}/{}] {} for '{}'.".format(len(scenarios) + len(failures), len(tasks),
+                                                            'Completed' if error is None else 'Failed', name))
+
+    if processes and processes > 1:
+        pool = _process_pool(processes, initializer=_init_worker, initargs=initargs)
+        pending = deque()
+        try:
+            for task in tasks:
+                # wait for the oldest selection submitted before submitting more than the queue can hold
+                while len(pending) >= (queue_size if queue_size else 2 * processes):
+                    collect(_get_result(*pending.popleft()))
+                pending.append((task[0], pool.apply_async(_run_selection, task)))
+            while pending:
+                collect(_get_result(*pending.popleft()))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _init_worker(*initargs)
+        for task in tasks:
+            collect(_run_selection(*task))
+
+    return scenarios, failures
+
+
+def read_selections(table):
+    """
+    :param table: path of the CSV file or of the ArcGIS table with the fields 'name' and 'selection' [required]
+    :type table: str
+    :return: the pairs of name and selection in the table (in the order of its rows)
+    :rtype: list
+    """
+    if table.lower().endswith('.csv'):
+        with open(table, 'r') as f:
+            return [(row['name'], row['selection']) for row in csv.DictReader(f)]
+    if arcpy is None:
+        raise ImportError("Reading an ArcGIS table requires arcpy, use a CSV file instead.")
+    with arcpy.da.SearchCursor(table, ['name', 'selection']) as cursor:
+        return [(name, selection) for name, selection in cursor]
+
+
+def _init_worker(region, inputs, out_folder, backend):
+    # open the region and the inputs once for all the selections run by this worker
+    _worker.clear()
+    _worker['backend'] = backend
+    _worker['region'] = region
+    _worker['inputs'] = dict(inputs)
+    if not backend == 'arcpy':
+        return
+
+    arcpy.env.overwriteOutput = True
+    gdb = 'Batch_{}.gdb'.format(getpid())
+    if not arcpy.Exists(sep.join([out_folder, gdb])):
+        arcpy.CreateFileGDB_management(out_folder_path=out_folder, out_name=gdb)
+    _worker['out_gdb'] = sep.join([out_folder, gdb])
+
+    _worker['region'] = 'in_memory/Batch_Region'
+    arcpy.CopyFeatures_management(in_features=region, out_feature_class=_worker['region'])
+    for name in _feature_inputs:
+        if inputs.get(name):
+            arcpy.MakeFeatureLayer_management(in_features=inputs[name], out_layer='lyrBatch_{}'.format(name))
+            _worker['inputs'][name] = 'lyrBatch_{}'.format(name)
+
+
+def _run_selection(name, selection, nutrient, sort_field):
+    # run the scenario for one selection, returning its loads rather than the scenario (whose name is only
+    # registered in the process collecting the results), or the error if it failed
+    scenario = None
+    try:
+        scenario = ScenarioV3(name, nutrient, sort_field, _worker['region'], selection=selection)
+        if _worker['backend'] == 'arcpy':
+            scenario.run(_worker['out_gdb'], scratch_workspace='in_memory', **_worker['inputs'])
+        else:
+            scenario.run(None, backend=_worker['backend'], **_worker['inputs'])
+
+        return name, {
+            'loads': scenario.load_values,
+            'basins': list(scenario.basins),
+            'areas': scenario.areas
+        }, None
+    except Exception:
+        return name, None, traceback.format_exc()
+    finally:
+        if scenario is not None:
+            # garbage collection of the intermediate outputs kept in memory, and release of the name
+            for output in scenario._outputs.values():
+                if arcpy is not None and output and output.startswith('in_memory') and arcpy.Exists(output):
+                    arcpy.Delete_management(output)
+            Scenario._registry.release(name)
+
+
+def _get_result(name, result):
+    # the failure of a worker process itself is recorded for its selection, like any other failure
+    try:
+        return result.get()
+    except Exception:
+        return name, None, traceback.format_exc()
+
+
+def _scenario_from_outcome(name, nutrient, sort_field, region, selection, outcome):
+    scenario = ScenarioV3(name, nutrient, sort_field, region, selection=selection)
+    scenario._set_load_values(outcome['loads'], outcome['basins'])
+    scenario.areas = outcome['areas']
+
+    return scenario
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m SLAMpy.batch',
+        description="Run the source load apportionment (ScenarioV3) for many selections of a region, "
+                    "writing the loads of each selection to '<name>.<nutrient>.csv' in the output folder, "
+                    "and the failures (if any) to 'failures.csv'.")
+    parser.add_argument('--selections', required=True,
+                        help="CSV file or ArcGIS table with the fields 'name' and 'selection'")
+    parser.add_argument('--nutrient', required=True, choices=['N', 'P'])
+    parser.add_argument('--sort-field', required=True, help="field of the region to sort the results by")
+    parser.add_argument('--region', required=True, help="feature class containing all the selections")
+    parser.add_argument('--out-folder', required=True, help="folder where to write the outputs")
+    for name in _input_names:
+        parser.add_argument('--{}'.format(name.replace('_', '-')), dest=name)
+    parser.add_argument('--backend', default='arcpy', choices=['arcpy', 'geopandas'])
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--queue-size', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    inputs = dict((name, getattr(args, name)) for name in _input_names if getattr(args, name))
+    scenarios, failures = run_batch(args.selections, args.nutrient, args.sort_field, args.region,
+                                    args.out_folder, inputs, backend=args.backend, processes=args.processes,
+                                    queue_size=args.queue_size)
+
+    for scenario in scenarios.values():
+        scenario.write_to_csv(args.out_folder)
+    if failures:
+        with open(sep.join([args.out_folder, 'failures.csv']), 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'error'])
+            for name, error in failures.items():
+                writer.writerow([name, error])
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Runs of ScenarioV3 in the background (e.g. from a dashboard or a
+notebook), with futures, progress events, and cancellation.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from .scenario import ScenarioV3
+
+
+class RunCancelled(RuntimeError):
+    """Raised by a run cancelled between two of its stages."""
+    pass
+
+
+class ScenarioRun(object):
+    """Handle on the run of a scenario submitted to a ScenarioExecutor,
+    giving access to its future, to its progress events, and to its
+    cancellation.
+
+    Each progress event is a `dict` with the keys 'scenario' (the name
+    of the scenario), 'stage' (the name of the stage, or 'run' for the
+    run as a whole), 'status' (one of 'submitted', 'started',
+    'completed', 'skipped', 'cancelled', or 'failed'), and 'time'.
+    """
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.future = None
+
+        self._events = queue.Queue()
+        self._cancelled = threading.Event()
+
+    def _report(self, stage, status):
+        # called by the run at each stage, where the cancellation takes effect before a stage starts
+        if status == 'started' and self._cancelled.is_set():
+            raise RunCancelled("The run of the scenario '{}' was cancelled before "
+                               "the stage '{}'.".format(self.scenario.name, stage))
+        self._events.put({'scenario': self.scenario.name, 'stage': stage, 'status': status, 'time': time.time()})
+
+    def cancel(self):
+        """Cancel the run, either before it starts, or before the next
+        of its stages starts (the stage in progress is not
+        interrupted).
+
+        :Returns:
+
+            `bool`
+                Whether the run is cancelled (`False` if it is already
+                complete).
+        """
+        if self.future.cancel():
+            self._events.put({'scenario': self.scenario.name, 'stage': 'run', 'status': 'cancelled',
+                              'time': time.time()})
+            return True
+        self._cancelled.set()
+
+        return not self.future.done()
+
+    def cancelled(self):
+        """Whether the cancellation of the run was requested."""
+        return self._cancelled.is_set() or self.future.cancelled()
+
+    def done(self):
+        """Whether the run is complete (i.e. succeeded, failed, or
+        cancelled)."""
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """Wait for the run to complete and return its scenario, or
+        raise the exception that made it fail (`RunCancelled` if it was
+        cancelled between two stages).
+
+        :Parameters:
+
+            timeout: `float`, optional
+                The maximum time to wait (in seconds). If not provided,
+                the wait is not limited.
+        """
+        return self.future.result(timeout)
+
+    def events(self, timeout=None):
+        """Iterate over the progress events of the run as they occur,
+        until the run is complete.
+
+        :Parameters:
+
+            timeout: `float`, optional
+                The maximum time to wait for the next event (in
+                seconds), after which the iteration stops. If not
+                provided, the wait is not limited.
+        """
+        waited = 0.
+        while True:
+            try:
+                yield self._events.get(timeout=0.1)
+                waited = 0.
+            except queue.Empty:
+                if self.future.done() and self._events.empty():
+                    return
+                waited += 0.1
+                if timeout is not None and waited >= timeout:
+                    return
+
+    def awaitable(self, loop=None):
+        """Return the run as an awaitable for `asyncio` (Python 3 only),
+        resolving to its scenario.
+
+        :Parameters:
+
+            loop: `asyncio.AbstractEventLoop`, optional
+                The event loop. If not provided, the current event loop
+                is used.
+        """
+        import asyncio
+
+        return asyncio.wrap_future(self.future, loop=loop)
+
+
+class ScenarioExecutor(object):
+    """Executor running scenarios in the background on a pool of
+    threads, where the number of threads limits the number of scenarios
+    run concurrently.
+
+    Note, arcpy is not designed to run several geoprocessing tools
+    concurrently in the same process, so with the 'arcpy' backend, the
+    concurrency is best kept to 1 and the source tools of each run
+    spread over worker processes instead (see *processes* and
+    *partitions* in ScenarioV3.run).
+    """
+    def __init__(self, max_workers=1):
+        """
+        :param max_workers: the maximum number of scenarios run concurrently [optional]
+        :type max_workers: int
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._runs = list()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def submit(self, scenario, *args, **kwargs):
+        """Submit the run of a scenario, which starts as soon as fewer
+        than *max_workers* runs are in progress.
+
+        :Parameters:
+
+            scenario: `ScenarioV3`
+                The scenario to run.
+
+            args, kwargs:
+                The arguments for ScenarioV3.run (except *progress*,
+                which is provided by the executor).
+
+        :Returns:
+
+            `ScenarioRun`
+        """
+        if not isinstance(scenario, ScenarioV3):
+            raise TypeError("Only instances of {} can be submitted.".format(ScenarioV3.__name__))
+        if 'progress' in kwargs:
+            raise ValueError("The progress of the run is reported by the executor, see ScenarioRun.events.")
+
+        run = ScenarioRun(scenario)
+        run._report('run', 'submitted')
+        run.future = self._executor.submit(_run_scenario, run, args, kwargs)
+        self._runs = [run_ for run_ in self._runs if not run_.done()] + [run]
+
+        return run
+
+    def shutdown(self, wait=True, cancel=False):
+        """Stop accepting new runs and release the threads once the runs
+        in progress are complete.
+
+        :Parameters:
+
+            wait: `bool`, optional
+                Whether to wait for the runs to complete. If not
+                provided, the runs are waited for.
+
+            cancel: `bool`, optional
+                Whether to cancel the runs not complete yet (see
+                ScenarioRun.cancel). If not provided, they are not
+                cancelled.
+        """
+        if cancel:
+            for run in self._runs:
+                run.cancel()
+        self._executor.shutdown(wait=wait)
+
+
+def _run_scenario(run, args, kwargs):
+    try:
+        run._report('run', 'started')
+        run.scenario.run(*args, progress=run._report, **kwargs)
+    except RunCancelled:
+        run._events.put({'scenario': run.scenario.name, 'stage': 'run', 'status': 'cancelled', 'time': time.time()})
+        raise
+    except Exception:
+        run._events.put({'scenario': run.scenario.name, 'stage': 'run', 'status': 'failed', 'time': time.time()})
+        raise
+    run._report('run', 'completed')
+
+    return run.scenario
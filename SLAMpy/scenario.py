@@ -1,13 +1,28 @@
-import arcpy
+import hashlib
+import json
+import time
+from contextlib import contextmanager
 import numpy as np
 import pandas as pd
-from os import sep
+from os import path, sep
 from matplotlib.gridspec import GridSpec
 import matplotlib.pyplot as plt
 
-from ._load_apportionment import load_apportionment_v2_geoprocessing, load_apportionment_v2_stats_and_summary, \
-    load_apportionment_v3_geoprocessing, load_apportionment_v3_stats_and_summary
-from ._post_processing import postprocessing_v2_geoprocessing, postprocessing_v3_geoprocessing
+from ._diff import deltas, top_k, statistics
+from ._registry import ScopedRegistry
+from ._task_graph import TaskGraph, TaskOutput
+
+try:
+    import arcpy
+except ImportError:  # arcpy is only required to run scenarios with the 'arcpy' backend
+    arcpy = None
+
+if arcpy is not None:
+    from ._load_apportionment import load_apportionment_v2_geoprocessing, load_apportionment_v2_stats_and_summary, \
+        load_apportionment_v3_geoprocessing, load_apportionment_v3_stats_and_summary, \
+        load_apportionment_v3_partitioned, load_apportionment_v3_stages
+    from ._post_processing import postprocessing_v2_geoprocessing, postprocessing_v3_geoprocessing
+    from ._cache import SourceCache, StageCheckpoint, argument_fingerprint
 
 
 _area_header_arcmap = ['AREAKM2']
@@ -17,6 +32,8 @@ _area_header_csv = ['area [ha]']
 _source_headers_arcmap = ['Arable', 'Pasture', 'Lake_Deposition', 'Forestry', 'Peatlands',
                           'Diffuse_Urban', 'Industry', 'Septic_Tank_Systems', 'Wastewater']
 
+_source_categories = ['Diffuse'] * 6 + ['Point'] * 3
+
 _source_headers_csv = ['arable [kg yr-1]', 'pasture [kg yr-1]', 'lake deposition [kg yr-1]',
                        'forestry [kg yr-1]', 'peatlands [kg yr-1]', 'diffuse urban [kg yr-1]',
                        'industry [kg yr-1]', 'septic tank systems [kg yr-1]', 'wastewater [kg yr-1]']
@@ -54,76 +71,261 @@ class Messages(object):
 
 class Scenario(object):
 
-    _current = list()
+    # names of the scenarios alive (weakly referenced, so that the name of a scenario garbage-collected is released)
+    _registry = ScopedRegistry()
 
     def __init__(self, name, nutrient, overwrite=True):
 
-        arcpy.env.overwriteOutput = overwrite
+        if arcpy is not None:
+            arcpy.env.overwriteOutput = overwrite
 
         self.__version__ = None
         if nutrient in ['N', 'P']:
             self.nutrient = nutrient
         else:
             raise ValueError("The nutrient for this scenario can only be 'N' for Nitrogen or 'P' for Phosphorus.")
-        if name not in self._current:
-            self.name = name
-            self._current.append(name)
-        else:
-            raise RuntimeError("A scenario named '{}' already exists, "
-                               "please choose another name for this scenario.".format(name))
+        Scenario._registry.register(name, self)
+        self.name = name
 
         self.areas = None
         self.loads = None
 
         self._msg = Messages()
 
-    @staticmethod
-    def _arctable_to_dataframe(feature_, index_field, value_fields, index_name=None, value_names=None):
-        if not isinstance(index_field, str):
-            raise TypeError("The argument 'index_field' must be a string.")
-        if not isinstance(value_fields, list):
-            raise TypeError("The argument 'value_fields' must be a list.")
-
-        if not index_name:
-            index_name = index_field
+    @classmethod
+    @contextmanager
+    def registry_scope(cls):
+        """Context manager giving the scenarios created within it their
+        own registry of names, so that they can reuse the names of the
+        scenarios created outside of it (and vice versa), and restoring
+        the previous registry on exit (e.g. one scope per session of a
+        long-running worker).
+
+        The scope only applies to the thread opening it, the scenarios
+        created in the other threads (e.g. by a `ScenarioExecutor`)
+        keep using their own registry.
+        """
+        with Scenario._registry.scope() as registry:
+            yield registry
+
+    @property
+    def loads(self):
+        """The loads for each basin and each source as a
+        `pandas.DataFrame` with a 'load' column and a multi-index
+        (basin, category, source). It is a view on the array of
+        loads (see `load_values`) only built when first accessed,
+        to modify the loads, assign a new DataFrame.
+        """
+        if self._load_values is None:
+            return None
+        if self._loads_view is None:
+            self._loads_view = self._stack_loads_array(self._load_values, self._basins)
+        return self._loads_view
+
+    @loads.setter
+    def loads(self, loads):
+        if loads is None:
+            self._set_load_values(None, None)
         else:
-            if not isinstance(index_name, str):
-                raise TypeError("The argument 'index_name' must be a string.")
-        if not value_names:
-            value_names = value_fields
+            self._set_load_values(*self._unstack_loads_dataframe(loads))
+
+    @property
+    def load_values(self):
+        """The loads as a 2-D `numpy.ndarray` with one row per basin
+        (in the order of `basins`) and one column per source.
+        """
+        return self._load_values
+
+    @property
+    def basins(self):
+        """The basins of the scenario as a `pandas.Index`."""
+        return self._basins
+
+    @property
+    def basin_fingerprint(self):
+        """A fingerprint of the set of basins of the scenario (i.e.
+        regardless of their order), computed once for the loads
+        assigned, to compare the basins of scenarios in constant time.
+        The fingerprint is a digest of the sorted basins, so that it
+        does not depend on the process (unlike the hash of a string,
+        which is salted for each interpreter).
+        """
+        if self._basins is None:
+            return None
+        if self._basin_fingerprint is None:
+            digest = hashlib.sha1('\n'.join(sorted(repr(basin) for basin in self._basins.tolist())).encode('utf-8'))
+            self._basin_fingerprint = (len(self._basins), digest.hexdigest())
+        return self._basin_fingerprint
+
+    def _set_load_values(self, values, basins):
+        if values is None:
+            self._load_values, self._basins = None, None
         else:
-            if not isinstance(value_names, list):
-                raise TypeError("The argument 'value_names' must be a list.")
+            self._load_values = np.ascontiguousarray(values, dtype=float)
+            self._basins = pd.Index(basins, name='basin')
+            if not self._load_values.shape == (len(self._basins), len(_source_headers_arcmap)):
+                raise ValueError("The loads must be given for each basin and each of the "
+                                 "{} sources.".format(len(_source_headers_arcmap)))
+        self._loads_view = None
+        self._basin_fingerprint = None
+
+    def source_totals(self):
+        """Return the total load for each source over all the basins as
+        a `pandas.Series` indexed by source.
+        """
+        if self._load_values is None:
+            raise RuntimeError("The scenario '{}' was not run yet.".format(self.name))
+        return pd.Series(np.nansum(self._load_values, axis=0), index=_source_headers_arcmap, name='load')
+
+    def basin_totals(self):
+        """Return the total load for each basin over all the sources as
+        a `pandas.Series` indexed by basin.
+        """
+        if self._load_values is None:
+            raise RuntimeError("The scenario '{}' was not run yet.".format(self.name))
+        return pd.Series(np.nansum(self._load_values, axis=1), index=self._basins, name='load')
+
+    def _aligned_baseline(self, baseline):
+        # the loads of the baseline in the order of the basins of the scenario
+        if not isinstance(baseline, Scenario):
+            raise TypeError("The baseline must be an instance of {}.".format(Scenario.__name__))
+        for scenario in [self, baseline]:
+            if scenario.load_values is None:
+                raise RuntimeError("The scenario '{}' was not run yet.".format(scenario.name))
+        if not self.nutrient == baseline.nutrient:
+            raise ValueError("The scenario '{}' cannot be compared with the baseline '{}' because their "
+                             "nutrients do not match.".format(self.name, baseline.name))
+        if self._basins.equals(baseline.basins):
+            return baseline.load_values
+
+        positions = baseline.basins.get_indexer(self._basins)
+        if (positions < 0).any():
+            missing = [basin for basin, position in zip(self._basins, positions) if position < 0]
+            raise KeyError("The following basins of the scenario '{}' are not available in "
+                           "the baseline '{}': {}".format(self.name, baseline.name, missing))
+        return baseline.load_values[positions]
+
+    def diff(self, baseline):
+        """Return the changes in the loads for each basin and each
+        source against a baseline as a `pandas.DataFrame` with the
+        columns 'baseline', 'load', 'delta', and 'relative' (in percent,
+        NaN where the baseline is zero) and a multi-index (basin,
+        category, source).
+
+        :Parameters:
 
-        return pd.DataFrame([row for row in arcpy.da.SearchCursor(feature_, [index_field] + value_fields)],
-                            columns=[index_name] + value_names).set_index(index_name, drop=True)
+            baseline: `Scenario`
+                The scenario to compare against, containing (at least)
+                all the basins of this scenario.
+        """
+        base = self._aligned_baseline(baseline)
+        delta, relative = deltas(self._load_values, base)
+
+        diff = self._stack_loads_array(self._load_values.copy(), self._basins)
+        diff.insert(0, 'baseline', base.reshape(-1))
+        diff['delta'] = delta.reshape(-1)
+        diff['relative'] = relative.reshape(-1)
+
+        return diff
+
+    def top_changes(self, baseline, k=10, sources=None, relative=False):
+        """Return the k basins with the largest changes in total load
+        (in magnitude) against a baseline as a `pandas.DataFrame`
+        indexed by basin (sorted by decreasing change) with the columns
+        'baseline', 'load', 'delta', and 'relative' (in percent).
+
+        :Parameters:
+
+            baseline: `Scenario`
+                The scenario to compare against, containing (at least)
+                all the basins of this scenario.
+
+            k: `int`, optional
+                The number of basins to return. If not provided, 10
+                basins are returned.
 
-    def _get_areas_dataframe(self, feature_, index_field, area_field):
-        # get the dataframe for the basin areas
-        df_areas = self._arctable_to_dataframe(feature_, index_field, area_field,
-                                               index_name='basin', value_names=['area_km2'])
+            sources: `list`, optional
+                The sources to include in the totals. If not provided,
+                all sources are included.
+
+                    *Parameter example:*
+                        ``sources=['Arable', 'Pasture']``
+
+            relative: `bool`, optional
+                Whether to rank the basins by relative change rather
+                than by absolute change. If not provided, the basins are
+                ranked by absolute change.
+        """
+        columns = [_source_headers_arcmap.index(source) for source in sources] if sources is not None \
+            else slice(None)
+        loads = np.nansum(self._load_values[:, columns], axis=1)
+        base = np.nansum(self._aligned_baseline(baseline)[:, columns], axis=1)
+        delta, relative_ = deltas(loads, base)
+
+        positions = top_k((relative_ if relative else delta)[:, np.newaxis], k)[:, 0]
+
+        return pd.DataFrame({'baseline': base[positions], 'load': loads[positions],
+                             'delta': delta[positions], 'relative': relative_[positions]},
+                            index=self._basins[positions], columns=['baseline', 'load', 'delta', 'relative'])
+
+    def diff_statistics(self, baseline):
+        """Return the summary statistics of the changes in the loads
+        against a baseline for each source and for their total as a
+        `pandas.DataFrame` indexed by source, with the columns
+        'baseline', 'load', 'delta', and 'relative' (for the loads over
+        all the basins), 'mean', 'std', 'min', and 'max' (for the
+        changes across the basins), and 'increased' and 'decreased'
+        (for the number of basins whose load changed).
+
+        :Parameters:
+
+            baseline: `Scenario`
+                The scenario to compare against, containing (at least)
+                all the basins of this scenario.
+        """
+        base = self._aligned_baseline(baseline)
+        stats = statistics(np.column_stack([self._load_values, np.nansum(self._load_values, axis=1)]),
+                           np.column_stack([base, np.nansum(base, axis=1)]))
+
+        return pd.DataFrame(stats, index=_source_headers_arcmap + ['Total'], columns=list(stats))
+
+    @staticmethod
+    def _format_areas_dataframe(df_areas):
         # convert km2 to ha
-        df_areas /= 100
+        df_areas = df_areas / 100
         # rename column to remove unit
         df_areas.columns = ['area']
 
         return df_areas
 
-    def _get_loads_dataframe(self, feature_, index_field, source_fields):
-        # get the dataframe for the basin loads per source
-        df_loads = self._arctable_to_dataframe(feature_, index_field, source_fields,
-                                               index_name='basin')
-        # add a second level to the column header for category (i.e. diffuse or point)
-        df_loads.columns = pd.MultiIndex.from_arrays([['Diffuse'] * 6 + ['Point'] * 3, df_loads.columns])
-        # collapse the multi-level columns into a second and third indices to get a multi-index dataframe
-        df_loads = df_loads.stack([0, 1]).to_frame()
-        # rename the multi-index indices and column
-        df_loads.index.names = ['basin', 'category', 'source']
-        df_loads.columns = ['load']
-        # because the stack sorted the indices, reorder the source level of the multi-index
-        df_loads = df_loads.reindex(labels=source_fields, level='source')
-
-        return df_loads
+    @staticmethod
+    def _stack_loads_array(values, basins):
+        # repeat the basins for each source, and tile the categories and sources for each basin, to get the
+        # multi-index of the row-major flattened array (i.e. without copying the values)
+        n_basins, n_sources = values.shape
+        index = pd.MultiIndex.from_arrays([np.repeat(np.asarray(basins), n_sources),
+                                           np.tile(_source_categories, n_basins),
+                                           np.tile(_source_headers_arcmap, n_basins)],
+                                          names=['basin', 'category', 'source'])
+
+        return pd.DataFrame(values.reshape(-1, 1), index=index, columns=['load'], copy=False)
+
+    @staticmethod
+    def _unstack_loads_dataframe(df_loads):
+        # collapse the category level and spread the sources into columns, keeping the basins in their order
+        loads = df_loads['load'] if 'load' in df_loads.columns else df_loads.iloc[:, 0]
+        loads = loads.reset_index(level='category', drop=True)
+        basins = loads.index.get_level_values('basin').unique()
+        loads = loads.unstack('source').reindex(index=basins, columns=_source_headers_arcmap)
+
+        return loads.values, basins
+
+    def _set_from_summary_dataframe(self, summary):
+        summary.index.name = 'basin'
+
+        # collect areas as pandas DataFrame and loads as array
+        self.areas = self._format_areas_dataframe(summary[_area_header_arcmap].copy())
+        self._set_load_values(summary[_source_headers_arcmap].values, summary.index)
 
     def plot_as_donut(self, file_name, output_location=None, file_format='pdf',
                       width=0.35, colour_palette=None, title_on=True,
@@ -156,10 +358,8 @@ class Scenario(object):
         kw = dict(arrowprops=dict(arrowstyle="-"),
                   bbox=bbox_props, zorder=0, va="center")
 
-        donut_val = self.loads.groupby(
-            ['source']).agg(
-            {'load': 'sum'}).apply(
-            lambda x: 100 * x / float(x.sum())).values.flatten()
+        totals = self.source_totals().values
+        donut_val = 100 * totals / float(totals.sum())
 
         donut = ax.pie(
             donut_val,
@@ -201,88 +401,344 @@ class Scenario(object):
                     facecolor='white', edgecolor='none', format=file_format)
 
     @classmethod
-    def read_from_csv(cls, file_path):
+    def read_from_csv(cls, file_path, basins=None, sources=None, chunksize=None, sidecar=False, name=None):
+        """Read a scenario from a CSV file written with `write_to_csv`.
+
+        :Parameters:
+
+            file_path: `str`
+                The location of the CSV file, whose name must follow
+                the pattern '<name>.<nutrient>.csv'.
+
+            basins: `list`, optional
+                The basins to read (in this order), the rows for the
+                other basins are skipped while the file is read. If not
+                provided, all basins are read.
+
+                    *Parameter example:*
+                        ``basins=['IE_EA_09L010700', 'IE_EA_09L010600']``
+
+            sources: `list`, optional
+                The sources to read (the loads for the others are left
+                as NaN). If not provided, all sources are read.
+
+                    *Parameter example:*
+                        ``sources=['Arable', 'Pasture']``
+
+            chunksize: `int`, optional
+                The number of rows of the file read at once. If not
+                provided, the file is read in chunks of 100,000 rows.
+
+            sidecar: `bool`, optional
+                Whether to cache the content of the file in binary
+                files alongside it ('<file_path>.loads.npy' and
+                '<file_path>.basins.npy', re-written when the CSV file
+                is more recent), and to read the basins requested from
+                them through memory-mapping. If not provided, the CSV
+                file is always read.
+
+            name: `str`, optional
+                The name to give to the scenario. If not provided, the
+                name is inferred from the file name.
+
+        :Returns:
+
+            `Scenario`
+        """
         # infer attributes for Scenario from standardised file name
         file_name = file_path.split(sep)[-1]
-        name, nutrient, extension = file_name.split('.')
-
-        # use pandas to read the file
-        summary = pd.read_csv(file_path, header=0, index_col=0)
-
-        # split read in dataframe into two separate dataframes for loads and areas
-        loads = summary.drop('area [ha]', axis=1)
-        areas = summary.loc[:, 'area [ha]'].to_frame('area [ha]')
-
-        # rename areas column to drop unit
-        areas.columns = ['area']
-
-        # convert loads column names into how they are found in ArcMap
-        loads.columns = _source_headers_arcmap
-        # add a second level to the column header for category (i.e. diffuse or point)
-        loads.columns = pd.MultiIndex.from_arrays([['Diffuse'] * 6 + ['Point'] * 3, loads.columns])
-        # collapse the multi-level columns into a second and third indices to get a multi-index dataframe
-        loads = loads.stack([0, 1]).to_frame()
-        # give names to the multi-index indices
-        loads.index.names = ['basin', 'category', 'source']
-        # rename loads column to drop unit
-        loads.columns = ['load']
-        # because the stack sorted the indices, reorder the source level of the multi-index
-        loads = loads.reindex(labels=_source_headers_arcmap, level='source')
+        name_, nutrient, extension = file_name.split('.')
+
+        if sources is not None:
+            unknown = [source for source in sources if source not in _source_headers_arcmap]
+            if unknown:
+                raise ValueError("The following sources are not valid: {}.".format(unknown))
+
+        # read the loads and the areas (as the last column) for the basins requested
+        if sidecar:
+            values, basins_ = cls._read_csv_sidecar(file_path, basins, chunksize)
+        else:
+            values, basins_ = cls._read_csv_chunks(file_path, basins, sources, chunksize)
+
+        if sources is not None:
+            values[:, [i for i, source in enumerate(_source_headers_arcmap) if source not in sources]] = np.nan
 
         # create an instance of the class from all the information collected and processed
-        instance = cls(name, nutrient)
-        instance.loads = loads
-        instance.areas = areas
+        instance = cls(name if name else name_, nutrient)
+        instance._set_load_values(values[:, :-1], basins_)
+        instance.areas = pd.DataFrame({'area': values[:, -1]}, index=instance.basins)
 
         return instance
 
+    @staticmethod
+    def _read_csv_chunks(file_path, basins, sources, chunksize):
+        # read only the header to find the columns to parse (files written before the area header included its unit
+        # are also supported)
+        header = pd.read_csv(file_path, header=0, nrows=0).columns.tolist()
+        index_column, source_columns, area_column = header[0], header[1:-1], header[-1]
+        selected = [i for i, source in enumerate(_source_headers_arcmap) if sources is None or source in sources]
+
+        # stream the file, only keeping the rows of the basins requested
+        wanted = set(basins) if basins is not None else None
+        chunks = list()
+        for chunk in pd.read_csv(file_path, header=0, index_col=0, chunksize=chunksize if chunksize else 100000,
+                                 usecols=[index_column] + [source_columns[i] for i in selected] + [area_column]):
+            chunks.append(chunk if wanted is None else chunk[chunk.index.isin(wanted)])
+        summary = pd.concat(chunks) if chunks else pd.DataFrame(columns=[area_column])
+
+        if basins is not None:
+            available = set(summary.index)
+            missing = [basin for basin in basins if basin not in available]
+            if missing:
+                raise KeyError("The following basins are not available in the file '{}': {}".format(file_path,
+                                                                                                   missing))
+            summary = summary.loc[list(basins)]
+
+        values = np.full((len(summary), len(_source_headers_arcmap) + 1), np.nan)
+        values[:, selected] = summary[[source_columns[i] for i in selected]].values
+        values[:, -1] = summary[area_column].values
+
+        return values, summary.index
+
+    @classmethod
+    def _read_csv_sidecar(cls, file_path, basins, chunksize):
+        # (re-)write the sidecar files if they do not exist or if they are older than the CSV file
+        loads_file, basins_file = file_path + '.loads.npy', file_path + '.basins.npy'
+        if not (path.isfile(loads_file) and path.isfile(basins_file)
+                and path.getmtime(loads_file) >= path.getmtime(file_path)
+                and path.getmtime(basins_file) >= path.getmtime(file_path)):
+            values, basins_ = cls._read_csv_chunks(file_path, None, None, chunksize)
+            np.save(loads_file, values)
+            # the basins keep their type (e.g. integers), only those read as Python objects (i.e. strings) are
+            # stored as fixed-width strings, for the file to be memory-mapped without pickling
+            basins_ = np.asarray(basins_)
+            np.save(basins_file, basins_.astype(str) if basins_.dtype == object else basins_)
+
+        # only read the rows requested from the memory-mapped files
+        values = np.load(loads_file, mmap_mode='r')
+        basins_ = pd.Index(np.load(basins_file, mmap_mode='r'))
+        if basins is None:
+            return np.array(values), basins_
+
+        positions = basins_.get_indexer(basins)
+        if (positions < 0).any():
+            missing = [basin for basin, position in zip(basins, positions) if position < 0]
+            raise KeyError("The following basins are not available in the file '{}': {}".format(file_path,
+                                                                                               missing))
+        return np.array(values[positions]), basins_[positions]
+
     def write_to_csv(self, output_location=None):
         # infer file name from scenario's attributes
         file_name = '{}.{}.csv'.format(self.name, self.nutrient)
         # generate file pth from from file_name and output location if given
         file_path = output_location + sep + file_name if output_location else file_name
 
-        # make deep copies of the dataframes
-        loads = self.loads.copy(deep=True)
-        areas = self.areas.copy(deep=True)
-
-        # remove the 'category' in multi-index
-        loads.reset_index(level=1, drop=True, inplace=True)
-        # unstack dataframe to get 'sources' as columns
-        loads = loads.unstack(level=1)
-        # remove the first level of the multi-column (i.e. 'load')
-        loads = loads.droplevel(level=0, axis=1)
-        # reorder the columns because unstack sorted them
-        loads = loads[_source_headers_arcmap]
-        # use the formatted version of the headers to include units
-        loads.columns = _source_headers_csv
-
-        # merge the two dataframes into one
-        summary = loads.join(areas)
+        # get the loads with 'sources' as columns, using the formatted version of the headers to include units
+        loads = pd.DataFrame(self._load_values, index=self._basins, columns=_source_headers_csv)
+
+        # merge the two dataframes into one, using the formatted version of the header to include units
+        summary = loads.join(self.areas['area'].rename(_area_header_csv[0]))
         # rename the index
         summary.index.name = 'basins \\ {} loads'.format(self.nutrient)
 
         # save as CSV file
         summary.to_csv(file_path)
 
+    def _metadata(self):
+        # the attributes of the scenario required to restore it, and those describing its run (if any)
+        metadata = {
+            'name': self.name,
+            'nutrient': self.nutrient,
+            'version': self.__version__,
+            'sources': _source_headers_arcmap,
+            'written': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        for attribute in ['sort_field', 'region', 'selection']:
+            if hasattr(self, attribute):
+                metadata[attribute] = getattr(self, attribute)
+
+        return metadata
+
+    def write_to_parquet(self, output_location=None, compression='snappy'):
+        """Write the loads and the areas of the scenario, alongside its
+        nutrient, its version, and its run metadata, into one Parquet
+        file named '<name>.<nutrient>.parquet' (requires `pyarrow`).
+
+        :Parameters:
+
+            output_location: `str`, optional
+                The location of the folder where to write the file. If
+                not provided, the file is written in the current
+                working directory.
+
+            compression: `str`, optional
+                The compression codec to use (any codec supported by
+                `pyarrow`). If not provided, 'snappy' is used.
+
+                    *Parameter example:*
+                        ``compression='zstd'``
+
+        :Returns:
+
+            `str`
+                The path of the file written.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._load_values is None:
+            raise RuntimeError("The scenario '{}' cannot be written because it was not run yet.".format(self.name))
+
+        # infer file name from scenario's attributes
+        file_name = '{}.{}.parquet'.format(self.name, self.nutrient)
+        # generate file pth from from file_name and output location if given
+        file_path = output_location + sep + file_name if output_location else file_name
+
+        # one typed column for the basins, for each source, and for the areas
+        columns = [pa.array(np.asarray(self._basins))] + \
+            [pa.array(self._load_values[:, i]) for i in range(len(_source_headers_arcmap))] + \
+            [pa.array(self.areas['area'].reindex(self._basins).values.astype(float))]
+        table = pa.Table.from_arrays(columns, names=['basin'] + _source_headers_arcmap + ['area'])
+        table = table.replace_schema_metadata({'slampy': json.dumps(self._metadata())})
+
+        pq.write_table(table, file_path, compression=compression)
+
+        return file_path
+
     @classmethod
-    def from_subset_in_existing_scenario(cls, existing_scenario, basin_subset_list, new_name):
-        # use the list of basin subset on the existing scenario to get the two subset dataframes
-        try:
-            lo = existing_scenario.loads.loc[basin_subset_list]
-            ar = existing_scenario.areas.loc[basin_subset_list]
-        except KeyError:  # pandas.DataFrame.loc will raise a KeyError if any item in list is missing in DataFrame index
-            # figure out which basin(s) is (are) missing to return a more informative error message
-            missing = [m for m in basin_subset_list if m not in
-                       existing_scenario.areas.index.values.tolist()]
+    def read_from_parquet(cls, file_path, basins=None, sources=None, name=None):
+        """Read a scenario from a Parquet file written with
+        `write_to_parquet` (requires `pyarrow`).
+
+        :Parameters:
+
+            file_path: `str`
+                The location of the Parquet file.
+
+            basins: `list`, optional
+                The basins to read (in this order), the rows for the
+                other basins are skipped while the file is read. If not
+                provided, all basins are read.
+
+                    *Parameter example:*
+                        ``basins=['IE_EA_09L010700', 'IE_EA_09L010600']``
+
+            sources: `list`, optional
+                The sources to read (the loads for the others are left
+                as NaN). If not provided, all sources are read.
+
+                    *Parameter example:*
+                        ``sources=['Arable', 'Pasture']``
+
+            name: `str`, optional
+                The name to give to the scenario. If not provided, the
+                name stored in the file is used.
+
+        :Returns:
+
+            `Scenario`
+        """
+        import pyarrow.parquet as pq
+
+        if sources is not None:
+            unknown = [source for source in sources if source not in _source_headers_arcmap]
+            if unknown:
+                raise ValueError("The following sources are not valid: {}.".format(unknown))
+        columns = ['basin'] + (list(sources) if sources is not None else _source_headers_arcmap) + ['area']
+
+        # read only the columns and the row groups required
+        table = pq.read_table(file_path, columns=columns,
+                              filters=[('basin', 'in', list(basins))] if basins is not None else None)
+        metadata = json.loads(pq.read_schema(file_path).metadata[b'slampy'].decode('utf-8'))
+
+        basins_ = table.column('basin').to_pandas().values
+        values = np.full((len(basins_), len(_source_headers_arcmap)), np.nan)
+        for i, source in enumerate(_source_headers_arcmap):
+            if source in columns:
+                values[:, i] = table.column(source).to_pandas().values
+        areas = table.column('area').to_pandas().values
+
+        # keep the basins in the order requested (the filter returns them in the order of the file)
+        if basins is not None:
+            positions = pd.Index(basins_).get_indexer(list(basins))
+            if (positions < 0).any():
+                missing = [basin for basin, position in zip(basins, positions) if position < 0]
+                raise KeyError("The following basins are not available in the file '{}': {}".format(file_path,
+                                                                                                   missing))
+            values, basins_, areas = values[positions], basins_[positions], areas[positions]
+
+        # create an instance of the class from all the information collected and processed
+        instance = cls(name if name else metadata['name'], metadata['nutrient'])
+        instance._set_load_values(values, basins_)
+        instance.areas = pd.DataFrame({'area': areas}, index=instance.basins)
+        for attribute in ['sort_field', 'region', 'selection']:
+            if attribute in metadata and not hasattr(instance, attribute):
+                setattr(instance, attribute, metadata[attribute])
+        if instance.__version__ is None:
+            instance.__version__ = metadata['version']
+
+        return instance
+
+    def _basin_positions(self, basins):
+        # positions of the basins in the arrays of the scenario (the hash table of the index is built only once)
+        positions = self._basins.get_indexer(basins)
+        if (positions < 0).any():
+            missing = [basin for basin, position in zip(basins, positions) if position < 0]
             raise KeyError("Error when generating a subset Scenario: "
                            "the following basins are not available in "
-                           "the Scenario '{}': {}".format(existing_scenario.name, missing))
+                           "the Scenario '{}': {}".format(self.name, missing))
 
-        # create an instance of the class from all the information collected and processed
+        return positions
+
+    @classmethod
+    def from_subset_in_existing_scenario(cls, existing_scenario, basin_subset_list, new_name):
+        # use the list of basin subset on the existing scenario to get the positions of the basins
+        positions = existing_scenario._basin_positions(basin_subset_list)
+
+        return cls._from_positions_in_existing_scenario(existing_scenario, positions, new_name)
+
+    @classmethod
+    def from_subsets_in_existing_scenario(cls, existing_scenario, basin_subsets):
+        """Generate several subset scenarios from an existing scenario at
+        once.
+
+        :Parameters:
+
+            existing_scenario: `Scenario`
+                The scenario containing all the basins of the subsets.
+
+            basin_subsets: `dict`
+                The basins of each subset (as a list), by name of the
+                subset scenario to generate.
+
+                    *Parameter example:*
+                        ``basin_subsets={'Avoca': ['IE_EA_10A010100', 'IE_EA_10A010200'],
+                                         'Slaney': ['IE_SE_12S020100']}``
+
+        :Returns:
+
+            `dict`
+                The subset scenarios by name.
+        """
+        names = list(basin_subsets)
+        subsets = [list(basin_subsets[name]) for name in names]
+
+        # look up the positions of the basins of all subsets at once
+        positions = existing_scenario._basin_positions([basin for subset in subsets for basin in subset])
+        bounds = np.cumsum([0] + [len(subset) for subset in subsets])
+
+        instances = dict()
+        for name, start, end in zip(names, bounds[:-1], bounds[1:]):
+            instances[name] = cls._from_positions_in_existing_scenario(existing_scenario, positions[start:end], name)
+
+        return instances
+
+    @classmethod
+    def _from_positions_in_existing_scenario(cls, existing_scenario, positions, new_name):
+        # gather the loads and areas of the basins at the given positions in the existing scenario
         instance = cls(new_name, existing_scenario.nutrient)
-        instance.loads = lo
-        instance.areas = ar
+        instance._set_load_values(existing_scenario.load_values[positions], existing_scenario.basins[positions])
+        instance.areas = existing_scenario.areas.reindex(instance.basins)
 
         return instance
 
@@ -381,11 +837,16 @@ class ScenarioV3(Scenario):
             'agglo': None
         }
 
+        # graph of the tasks of the last run built with task_graph (to reuse their outputs in the next one)
+        self._task_graph = None
+
     def run(self, out_gdb, in_arable=None, in_pasture=None, in_atm_depo=None,
             in_land_cover=None, in_lc_field=None, in_factors=None,
             in_ipc=None, in_sect4=None, in_dwts=None, in_agglo=None, in_uww_field=None,
             ex_arable=None, ex_pasture=None, ex_atm_depo=None, ex_forest=None, ex_peat=None, ex_urban=None,
-            ex_ipc=None, ex_sect4=None, ex_dwts=None, ex_agglo=None):
+            ex_ipc=None, ex_sect4=None, ex_dwts=None, ex_agglo=None,
+            backend='arcpy', processes=None, overlays=None, cache=None, scratch_workspace=None, partitions=None,
+            checkpoint=None, resume=False, progress=None):
         """Run the geo-processing tools to determine the source load
         apportionment for the given nutrient in the given region.
 
@@ -606,55 +1067,227 @@ class ScenarioV3(Scenario):
                 corresponding to the existing output for the urban
                 wastewater treatment plants load using the wastewater
                 discharges tool V3. Must contain fields: 'Wast3calc'.
+
+            *Execution options*
+
+            backend: `str`, optional
+                The engine used to carry out the load apportionment.
+                It can either be 'arcpy' to run the ArcGIS
+                geoprocessing tools (writing all outputs in *out_gdb*),
+                or 'geopandas' to compute the loads in memory with
+                GeoPandas and NumPy, without requiring ArcGIS (in which
+                case *out_gdb* is not used and the existing outputs
+                cannot be reused). If not provided, the default
+                behaviour is to use 'arcpy'.
+
+                    *Parameter example:*
+                        ``backend='geopandas'``
+
+            processes: `int`, optional
+                The number of worker processes on which the source
+                tools are run concurrently with the 'arcpy' backend.
+                Each worker writes in its own scratch geodatabase
+                (created alongside *out_gdb*) and its outputs are then
+                copied into *out_gdb* under the same names as in a
+                sequential run. If not provided, the source tools are
+                run one after the other.
+
+                    *Parameter example:*
+                        ``processes=8``
+
+            overlays: `ScenarioV3`, optional
+                A ScenarioV3 instance already run with the 'arcpy'
+                backend on the same *region* and *selection* (e.g. for
+                the other nutrient). Its outputs are copied instead of
+                intersecting the inputs with the region again, and the
+                loads are calculated for the nutrient of this scenario.
+                If not provided, the inputs are intersected with the
+                region.
+
+                    *Parameter example:*
+                        ``overlays=my_scenario_for_n``
+
+            cache: `str` or `SourceCache`, optional
+                The location of the folder (or an instance of
+                SourceCache) where the outputs of the source tools are
+                cached with the 'arcpy' backend. The outputs of a
+                source tool are reused when it was already run on the
+                same location with the same inputs (unchanged since),
+                and stored otherwise. If not provided, all the source
+                tools are run.
+
+                    *Parameter example:*
+                        ``cache='SLAMpy/cache'``
+
+            scratch_workspace: `str`, optional
+                The workspace where the intermediate outputs (i.e. the
+                selected region and the outputs of the source tools)
+                are written with the 'arcpy' backend. Use 'in_memory'
+                to keep them in memory, in which case only the summary
+                is written in *out_gdb* (or nothing at all if *out_gdb*
+                is also 'in_memory'). The intermediate outputs kept in
+                memory remain available to be reused by other scenarios
+                during the session. With *processes* or *partitions*,
+                the datasets kept in memory that the worker processes
+                read (e.g. the selected region) are copied on disk for
+                the duration of the run, since the workers do not share
+                the memory of this process. If not provided, the
+                intermediate outputs are written in *out_gdb*.
+
+                    *Parameter example:*
+                        ``scratch_workspace='in_memory'``
+
+            partitions: `int`, optional
+                The number of chunks into which the region is split with
+                the 'arcpy' backend, each made of whole sub-regions (as
+                per *sort_field*) and of similar total area, on which
+                the source tools are run concurrently on *processes*
+                worker processes (one per chunk if *processes* is not
+                provided). The outputs of all chunks are then merged
+                into *out_gdb* under the same names as in a single run,
+                giving the same loads. The wastewater discharges tool is
+                run on the whole region, since the treatment plants are
+                joined to their closest sub-region, which may be in
+                another chunk. Cannot be combined with *overlays* or
+                *cache*. If not provided, the region is not split.
+
+                    *Parameter example:*
+                        ``partitions=32``
+
+            checkpoint: `str` or `StageCheckpoint`, optional
+                The location of the JSON file (or an instance of
+                StageCheckpoint) where each source tool is recorded as
+                soon as it is completed with the 'arcpy' backend, with
+                the paths of its outputs, their number of rows, and the
+                fingerprints of its inputs. If not provided, no
+                checkpoint is recorded.
+
+                    *Parameter example:*
+                        ``checkpoint='SLAMpy/out/MyRegion.checkpoint.json'``
+
+            resume: `bool`, optional
+                Whether to skip the source tools recorded in
+                *checkpoint* (e.g. by a previous run interrupted before
+                its end), provided that the location and their inputs
+                are unchanged, and that their outputs still exist with
+                the same number of rows. If not provided, all the
+                source tools are run.
+
+                    *Parameter example:*
+                        ``resume=True``
+
+            progress: callable, optional
+                A function called with the name of each stage of the run
+                (e.g. 'agri', 'summary') and its status ('started',
+                'completed', or 'skipped' if its outputs are reused).
+                An exception raised by this function aborts the run
+                (e.g. to cancel it between two stages). If not
+                provided, the progress is not reported.
+
+                    *Parameter example:*
+                        ``progress=lambda stage, status: print(stage, status)``
         """
+        report = progress if progress else (lambda stage, status: None)
+
+        # check whether the backend requested is supported
+        if backend == 'geopandas':
+            if overlays is not None or cache is not None or scratch_workspace is not None or partitions \
+                    or checkpoint is not None:
+                raise ValueError("Existing outputs cannot be reused (nor the region partitioned) with the "
+                                 "'geopandas' backend.")
+            report('geopandas', 'started')
+            self._run_with_geopandas(in_arable, in_pasture, in_atm_depo,
+                                     in_land_cover, in_lc_field, in_factors,
+                                     in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                                     [ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                                      ex_ipc, ex_sect4, ex_dwts, ex_agglo])
+            report('geopandas', 'completed')
+            return
+        elif not backend == 'arcpy':
+            raise ValueError("The backend for this scenario can only be 'arcpy' or 'geopandas'.")
+        elif arcpy is None:
+            raise ImportError("The 'arcpy' backend requires ArcGIS, use the 'geopandas' backend instead.")
 
         # check whether the output geodatabase provided as a string is actually one
         if not arcpy.Describe(out_gdb).dataType == "Workspace":
             raise TypeError("The output geodatabase is not a valid ArcGIS workspace.")
 
         # check if there is sufficient information to proceed (i.e. existing outputs [checked first], or inputs)
-        self._check_ex_or_in('arable', ex_arable, [in_arable])
-        self._check_ex_or_in('pasture', ex_pasture, [in_pasture])
-        self._check_ex_or_in('atm_depo', ex_atm_depo, [in_atm_depo])
-        self._check_ex_or_in('forest', ex_forest, [in_land_cover, in_factors])
-        self._check_ex_or_in('peat', ex_peat, [in_land_cover, in_factors])
-        self._check_ex_or_in('urban', ex_urban, [in_land_cover, in_factors])
-        self._check_ex_or_in('ipc', ex_ipc, [in_ipc])
-        self._check_ex_or_in('sect4', ex_sect4, [in_sect4])
-        self._check_ex_or_in('dwts', ex_dwts, [in_dwts])
-        self._check_ex_or_in('agglo', ex_agglo, [in_agglo])
-
-        # check whether required fields are provided
-        if not in_lc_field:
-            raise ValueError("The field 'in_lc_field' required for the forest, peat, and urban tools is not provided.")
-        if not in_uww_field:
-            raise ValueError("The field 'in_uww_field' required for the agglomeration wastewater tool.")
+        self._check_inputs(in_arable, in_pasture, in_atm_depo, in_land_cover, in_lc_field, in_factors,
+                           in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                           ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                           ex_ipc, ex_sect4, ex_dwts, ex_agglo)
+
+        # check whether the intersected outputs to reuse are compatible with this scenario
+        if overlays is not None:
+            overlays = self._check_overlays(overlays)
+
+        # check whether the partitioned run requested is possible
+        if partitions and partitions > 1 and (overlays is not None or cache is not None or checkpoint is not None):
+            raise ValueError("A partitioned run cannot reuse the outputs of another scenario, of a cache, "
+                             "or of a checkpoint.")
+
+        # check whether the checkpoint is provided as a file rather than as a StageCheckpoint instance
+        if resume and checkpoint is None:
+            raise ValueError("A checkpoint is required to resume a run.")
+        if checkpoint is not None and not isinstance(checkpoint, StageCheckpoint):
+            checkpoint = StageCheckpoint(checkpoint)
+
+        # check whether the cache is provided as a folder rather than as a SourceCache instance
+        if cache is not None and not isinstance(cache, SourceCache):
+            cache = SourceCache(cache)
+
+        # determine where to write the intermediate outputs
+        if not scratch_workspace:
+            scratch_workspace = out_gdb
+        elif not arcpy.Describe(scratch_workspace).dataType == "Workspace":
+            raise TypeError("The scratch workspace is not a valid ArcGIS workspace.")
 
         # determine which location to work on
         if self.selection:  # i.e. selection requested
+            report('selection', 'started')
             self._msg.addMessage("> Selecting requested Location(s) within Region.")
-            location = sep.join([out_gdb, self.name + '_SelectedRegion'])
+            location = sep.join([scratch_workspace, self.name + '_SelectedRegion'])
             arcpy.Select_analysis(in_features=self.region, out_feature_class=location, where_clause=self.selection)
+            report('selection', 'completed')
         else:
             location = self.region
 
-        # run geoprocessing functions for each source load
-        (out_arable, out_pasture, out_atm_depo, out_forest, out_peat,
-            out_urban, out_ipc, out_sect4, out_dwts, out_agglo) = load_apportionment_v3_geoprocessing(
-                self.name, self.nutrient, location, in_lc_field,
-                in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
-                in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
-                ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
-                ex_ipc, ex_sect4, ex_dwts, ex_agglo,
-                out_gdb,
-                self._msg)
+        # run geoprocessing functions for each source load (on chunks of the location if requested)
+        if partitions and partitions > 1:
+            report('partitions', 'started')
+            (out_arable, out_pasture, out_atm_depo, out_forest, out_peat,
+                out_urban, out_ipc, out_sect4, out_dwts, out_agglo) = load_apportionment_v3_partitioned(
+                    self.name, self.nutrient, location, self.sort_field, in_lc_field,
+                    in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                    in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                    ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                    ex_ipc, ex_sect4, ex_dwts, ex_agglo,
+                    scratch_workspace,
+                    self._msg,
+                    partitions, processes=processes)
+            report('partitions', 'completed')
+        else:
+            (out_arable, out_pasture, out_atm_depo, out_forest, out_peat,
+                out_urban, out_ipc, out_sect4, out_dwts, out_agglo) = load_apportionment_v3_geoprocessing(
+                    self.name, self.nutrient, location, in_lc_field,
+                    in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                    in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                    ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                    ex_ipc, ex_sect4, ex_dwts, ex_agglo,
+                    scratch_workspace,
+                    self._msg,
+                    processes=processes, overlays=overlays, cache=cache, checkpoint=checkpoint, resume=resume,
+                    progress=report)
 
         # run geoprocessing functions for load apportionment
+        report('summary', 'started')
         out_summary = load_apportionment_v3_stats_and_summary(
             self.name, self.nutrient, location, self.sort_field, out_gdb,
             out_arable, out_pasture, out_atm_depo, out_forest, out_peat,
             out_urban, out_ipc, out_sect4, out_dwts, out_agglo,
             self._msg)
+        report('summary', 'completed')
 
         # garbage collection
         if self.selection:
@@ -673,11 +1306,277 @@ class ScenarioV3(Scenario):
         self._outputs['agglo'] = out_agglo
 
         # run postprocessing
-        postprocessing_v3_geoprocessing(self.name, self.nutrient, out_gdb, self._msg, out_summary=out_summary)
+        report('postprocessing', 'started')
+        summary = postprocessing_v3_geoprocessing(self.name, self.nutrient, out_gdb, self._msg,
+                                                   out_summary=out_summary, index_field=self.sort_field)
+
+        # collect areas and loads as pandas DataFrames (from the values calculated, rather than reading them back)
+        self._set_from_summary_dataframe(pd.DataFrame(summary).set_index(self.sort_field))
+        report('postprocessing', 'completed')
+
+    @classmethod
+    def run_n_and_p(cls, name_n, name_p, sort_field, region, out_gdb, selection=None, overwrite=True,
+                    in_arable=None, in_pasture=None, in_atm_depo=None,
+                    in_land_cover=None, in_lc_field=None, in_factors_n=None, in_factors_p=None,
+                    in_ipc=None, in_sect4=None, in_dwts=None, in_agglo=None, in_uww_field=None,
+                    backend='arcpy', processes=None, cache=None):
+        """Run the geo-processing tools to determine the source load
+        apportionment for both nitrogen and phosphorus in the given
+        region, intersecting the inputs with the region only once.
+
+        The inputs for agriculture, atmospheric deposition,
+        industries, septic tank systems, and wastewater all carry the
+        fields for both nutrients, so the features intersected for
+        the nitrogen scenario are reused as they are for the
+        phosphorus scenario.
+
+        :Parameters:
 
-        # collect areas and loads as pandas DataFrames
-        self.areas = self._get_areas_dataframe(out_summary, self.sort_field, _area_header_arcmap)
-        self.loads = self._get_loads_dataframe(out_summary, self.sort_field, _source_headers_arcmap)
+            name_n: `str`
+                The identifier for the scenario for nitrogen.
+
+                    *Parameter example:*
+                        ``name_n='AvocaCatchment_N'``
+
+            name_p: `str`
+                The identifier for the scenario for phosphorus.
+
+                    *Parameter example:*
+                        ``name_p='AvocaCatchment_P'``
+
+            in_factors_n: `str`
+                The location of the spreadsheet containing the export
+                factors from the different land cover types for N.
+
+                    *Parameter example:*
+                        ``in_factors_n='SLAMpy\in\LAM_Factors.xlsx\Corine_N$'``
+
+            in_factors_p: `str`
+                The location of the spreadsheet containing the export
+                factors from the different land cover types for P.
+
+                    *Parameter example:*
+                        ``in_factors_p='SLAMpy\in\LAM_Factors.xlsx\Corine_P$'``
+
+            All other parameters are the same as for the
+            initialisation of a ScenarioV3 object and for its `run`
+            method.
+
+        :Returns:
+
+            `tuple`
+                The two ScenarioV3 instances run for N and for P (in
+                this order).
+        """
+        scenario_n = cls(name_n, 'N', sort_field, region, selection, overwrite)
+        scenario_p = cls(name_p, 'P', sort_field, region, selection, overwrite)
+
+        inputs = dict(in_arable=in_arable, in_pasture=in_pasture, in_atm_depo=in_atm_depo,
+                      in_land_cover=in_land_cover, in_lc_field=in_lc_field,
+                      in_ipc=in_ipc, in_sect4=in_sect4, in_dwts=in_dwts, in_agglo=in_agglo,
+                      in_uww_field=in_uww_field)
+
+        if backend == 'geopandas':
+            # GeoPandas is only required for this backend, so only import it when it is requested
+            from ._geopandas_backend import load_apportionment_v3_dataframes_n_and_p
+
+            cls._check_geopandas_inputs(in_factors=in_factors_n, **inputs)
+            cls._check_geopandas_inputs(in_factors=in_factors_p, **inputs)
+
+            summaries = load_apportionment_v3_dataframes_n_and_p(
+                region, selection, sort_field, in_lc_field,
+                in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors_n, in_factors_p,
+                in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                scenario_n._msg)
+            for scenario, summary in zip([scenario_n, scenario_p], summaries):
+                scenario._set_from_summary_dataframe(summary)
+        else:
+            scenario_n.run(out_gdb, in_factors=in_factors_n, backend=backend, processes=processes, cache=cache,
+                           **inputs)
+            scenario_p.run(out_gdb, in_factors=in_factors_p, backend=backend, processes=processes, cache=cache,
+                           overlays=scenario_n, **inputs)
+
+        return scenario_n, scenario_p
+
+    def _check_inputs(self, in_arable, in_pasture, in_atm_depo, in_land_cover, in_lc_field, in_factors,
+                      in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                      ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                      ex_ipc, ex_sect4, ex_dwts, ex_agglo):
+        # check if there is sufficient information to proceed (i.e. existing outputs [checked first], or inputs)
+        self._check_ex_or_in('arable', ex_arable, [in_arable])
+        self._check_ex_or_in('pasture', ex_pasture, [in_pasture])
+        self._check_ex_or_in('atm_depo', ex_atm_depo, [in_atm_depo])
+        self._check_ex_or_in('forest', ex_forest, [in_land_cover, in_factors])
+        self._check_ex_or_in('peat', ex_peat, [in_land_cover, in_factors])
+        self._check_ex_or_in('urban', ex_urban, [in_land_cover, in_factors])
+        self._check_ex_or_in('ipc', ex_ipc, [in_ipc])
+        self._check_ex_or_in('sect4', ex_sect4, [in_sect4])
+        self._check_ex_or_in('dwts', ex_dwts, [in_dwts])
+        self._check_ex_or_in('agglo', ex_agglo, [in_agglo])
+
+        # check whether required fields are provided
+        if not in_lc_field:
+            raise ValueError("The field 'in_lc_field' required for the forest, peat, and urban tools is not provided.")
+        if not in_uww_field:
+            raise ValueError("The field 'in_uww_field' required for the agglomeration wastewater tool.")
+
+    def task_graph(self, out_gdb, in_arable=None, in_pasture=None, in_atm_depo=None,
+                   in_land_cover=None, in_lc_field=None, in_factors=None,
+                   in_ipc=None, in_sect4=None, in_dwts=None, in_agglo=None, in_uww_field=None,
+                   ex_arable=None, ex_pasture=None, ex_atm_depo=None, ex_forest=None, ex_peat=None, ex_urban=None,
+                   ex_ipc=None, ex_sect4=None, ex_dwts=None, ex_agglo=None,
+                   scratch_workspace=None):
+        """Build the run of the scenario with the 'arcpy' backend as a
+        graph of tasks (the selection of the location, the source
+        tools, the summary, the post-processing, and the collection of
+        the loads), where each task is identified by a fingerprint of
+        its inputs (i.e. paths and contents of the input datasets,
+        other arguments) and of the tasks it depends on.
+
+        Running the graph (see `TaskGraph.run`) gives the same loads as
+        `run`. When the graph is built again (e.g. with another
+        *in_dwts*), the outputs of the previous graph of the scenario
+        are reused for the tasks whose fingerprint is unchanged, so
+        that only the tasks affected (e.g. the septic tank systems tool
+        and the tasks downstream of it) are recomputed. Passing a
+        `StageCheckpoint` as the store to `TaskGraph.run` also allows
+        reusing the outputs across sessions. The graph gives access to
+        the duration of each task (see `TaskGraph.timings`) and to its
+        representation in the DOT language (see `TaskGraph.to_dot`).
+
+        Note, unlike in `run`, the selected location is kept in the
+        scratch workspace, since it is an output of the graph.
+
+        :Parameters:
+
+            The parameters are the same as for `run`.
+
+        :Returns:
+
+            `TaskGraph`
+        """
+        if arcpy is None:
+            raise ImportError("The task graph relies on the 'arcpy' backend, which requires ArcGIS.")
+        if not arcpy.Describe(out_gdb).dataType == "Workspace":
+            raise TypeError("The output geodatabase is not a valid ArcGIS workspace.")
+        self._check_inputs(in_arable, in_pasture, in_atm_depo, in_land_cover, in_lc_field, in_factors,
+                           in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                           ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+                           ex_ipc, ex_sect4, ex_dwts, ex_agglo)
+        if not scratch_workspace:
+            scratch_workspace = out_gdb
+
+        # each task is keyed on its data inputs and on the keys of its upstream tasks, but not on the workspaces
+        # where its outputs are written (whose content changes with every output written)
+        graph = TaskGraph(self.name, fingerprint=argument_fingerprint)
+
+        # selection of the location of interest within the region
+        location = graph.add('selection', self._select_location, (self.region, self.selection, scratch_workspace),
+                             inputs=[self.region, self.selection])
+
+        # one task for each source tool not reused (with the same stages as in run)
+        outputs, stages = load_apportionment_v3_stages(
+            self.name, self.nutrient, location, in_lc_field,
+            in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+            in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+            ex_arable, ex_pasture, ex_atm_depo, ex_forest, ex_peat, ex_urban,
+            ex_ipc, ex_sect4, ex_dwts, ex_agglo,
+            self._msg)
+        for name, categories, function, args, kwargs in stages:
+            graph.add(name, function, args + (scratch_workspace, self._msg), kwargs,
+                      inputs=list(args[:2]) + list(args[3:]))
+            for i, category in enumerate(categories):
+                outputs[category] = graph.output(name, i)
+        outputs = [outputs[category] for category in
+                   ['arable', 'pasture', 'atm_depo', 'forest', 'peat', 'urban', 'ipc', 'sect4', 'dwts', 'agglo']]
+
+        # summary of the loads of all the sources by sub-region, post-processing, and collection of the loads
+        summary = graph.add('summary', load_apportionment_v3_stats_and_summary,
+                            (self.name, self.nutrient, location, self.sort_field, out_gdb) + tuple(outputs) +
+                            (self._msg,),
+                            inputs=[self.name, self.nutrient, self.sort_field] +
+                            [output for output in outputs if not isinstance(output, TaskOutput)])
+        totals = graph.add('postprocessing', postprocessing_v3_geoprocessing,
+                           (self.name, self.nutrient, out_gdb, self._msg),
+                           {'out_summary': summary, 'index_field': self.sort_field},
+                           inputs=[self.name, self.nutrient, self.sort_field], persist=False)
+        graph.add('loads', self._set_from_task_graph, (totals,) + tuple(outputs), inputs=[], persist=False)
+
+        # reuse the outputs of the previous graph of the scenario for the tasks whose fingerprint is unchanged
+        if self._task_graph is not None:
+            graph.adopt(self._task_graph)
+        self._task_graph = graph
+
+        return graph
+
+    def _select_location(self, region, selection, workspace):
+        if not selection:
+            return region
+        self._msg.addMessage("> Selecting requested Location(s) within Region.")
+        location = sep.join([workspace, self.name + '_SelectedRegion'])
+        arcpy.Select_analysis(in_features=region, out_feature_class=location, where_clause=selection)
+
+        return location
+
+    def _set_from_task_graph(self, summary, *outputs):
+        # assign the outputs to the class instance attributes, and collect areas and loads as pandas DataFrames
+        for category, output in zip(['arable', 'pasture', 'atm_depo', 'forest', 'peat', 'urban',
+                                     'ipc', 'sect4', 'dwts', 'agglo'], outputs):
+            self._outputs[category] = output
+        self._set_from_summary_dataframe(pd.DataFrame(summary).set_index(self.sort_field))
+
+    def _check_overlays(self, overlays):
+        # check that the outputs to reuse come from a run of this version on the same location
+        if not isinstance(overlays, ScenarioV3):
+            raise TypeError("The outputs to reuse must be given as an instance of ScenarioV3.")
+        if not (overlays.region == self.region and overlays.selection == self.selection):
+            raise ValueError("The outputs to reuse were not obtained for the same region and selection.")
+        for category, output in overlays._outputs.items():
+            if output is None or not arcpy.Exists(output):
+                raise ValueError("The output for {} of the scenario '{}' is not available to be reused "
+                                 "(the scenario may not have been run).".format(category, overlays.name))
+
+        return dict(overlays._outputs)
+
+    def _run_with_geopandas(self, in_arable, in_pasture, in_atm_depo,
+                            in_land_cover, in_lc_field, in_factors,
+                            in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+                            existing):
+        # GeoPandas is only required for this backend, so only import it when it is requested
+        from ._geopandas_backend import load_apportionment_v3_dataframes
+
+        # check that there is no attempt at reusing existing outputs (only available for the 'arcpy' backend)
+        if any(existing):
+            raise ValueError("Existing outputs cannot be reused with the 'geopandas' backend.")
+
+        self._check_geopandas_inputs(in_arable, in_pasture, in_atm_depo,
+                                     in_land_cover, in_lc_field, in_factors,
+                                     in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field)
+
+        # compute the summary table in memory
+        summary = load_apportionment_v3_dataframes(
+            self.nutrient, self.region, self.selection, self.sort_field, in_lc_field,
+            in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+            in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field,
+            self._msg)
+
+        self._set_from_summary_dataframe(summary)
+
+    @staticmethod
+    def _check_geopandas_inputs(in_arable, in_pasture, in_atm_depo,
+                                in_land_cover, in_lc_field, in_factors,
+                                in_ipc, in_sect4, in_dwts, in_agglo, in_uww_field):
+        # check that all inputs are provided
+        for input_ in [in_arable, in_pasture, in_atm_depo, in_land_cover, in_factors,
+                       in_ipc, in_sect4, in_dwts, in_agglo]:
+            if not input_:
+                raise RuntimeError("All inputs must be provided to run with the 'geopandas' backend.")
+
+        # check whether required fields are provided
+        if not in_lc_field:
+            raise ValueError("The field 'in_lc_field' required for the forest, peat, and urban tools is not provided.")
+        if not in_uww_field:
+            raise ValueError("The field 'in_uww_field' required for the agglomeration wastewater tool.")
 
     @staticmethod
     def _check_ex_or_in(category, existing, inputs):
@@ -1110,11 +2009,11 @@ class ScenarioV2(Scenario):
         self._outputs['agglo'] = out_agglo
 
         # run postprocessing
-        postprocessing_v2_geoprocessing(self.name, self.nutrient, out_gdb, self._msg, out_summary=out_summary)
+        summary = postprocessing_v2_geoprocessing(self.name, self.nutrient, out_gdb, self._msg,
+                                                   out_summary=out_summary, index_field=self.sort_field)
 
-        # collect areas and loads as pandas DataFrames
-        self.areas = self._get_areas_dataframe(out_summary, self.sort_field, _area_header_arcmap)
-        self.loads = self._get_loads_dataframe(out_summary, self.sort_field, _source_headers_arcmap)
+        # collect areas and loads as pandas DataFrames (from the values calculated, rather than reading them back)
+        self._set_from_summary_dataframe(pd.DataFrame(summary).set_index(self.sort_field))
 
     @staticmethod
     def _check_ex_or_in(category, existing, inputs):
@@ -1,11 +1,16 @@
 import numpy as np
 import pandas as pd
-from os import sep
-from collections import MutableSequence
+from os import path, sep, listdir, makedirs
+try:
+    from collections.abc import MutableSequence
+except ImportError:  # Python 2
+    from collections import MutableSequence
 from matplotlib.gridspec import GridSpec
 import matplotlib.pyplot as plt
 
-from scenario import Scenario, _source_headers_arcmap, _source_colour_palette, _source_fancy_names
+from ._diff import deltas, top_k, statistics
+from .scenario import Scenario, _source_headers_arcmap, _source_categories, _source_colour_palette, \
+    _source_fancy_names
 
 
 class ScenarioList(MutableSequence):
@@ -14,16 +19,55 @@ class ScenarioList(MutableSequence):
 
         self.scenarios = list()
         self.nutrient = None
+
+        # names of the scenarios in the list and fingerprint of their basins, to check new scenarios in constant time
+        self._name_set = set()
+        self._basin_fingerprint = None
+
+        # array of the loads of the scenarios (scenario x basin x source), with spare capacity for insertions,
+        # alongside the arrays of loads they were taken from (to detect scenarios whose loads were re-assigned)
+        self._cube = None
+        self._cube_sources = list()
+        self._basins = None
+
         self.extend(list(*args, **kwargs))
 
     def __getitem__(self, index): return self.scenarios[index]
 
     def __setitem__(self, index, value):
 
-        self._check_scenario(value)
-        self.scenarios[index] = value
-
-    def __delitem__(self, index): del self.scenarios[index]
+        if isinstance(index, slice):
+            scenarios = list(self.scenarios)
+            scenarios[index] = list(value)
+            self._rebuild(scenarios)
+        else:
+            # the name of the scenario replaced is available to the new scenario
+            self._name_set.discard(self.scenarios[index].name)
+            try:
+                self._check_scenario(value)
+            except Exception:
+                self._name_set.add(self.scenarios[index].name)
+                raise
+            self.scenarios[index] = value
+            self._name_set.add(value.name)
+            self._cube[index % len(self.scenarios)] = self._aligned_loads(value)
+            self._cube_sources[index] = value.load_values
+
+    def __delitem__(self, index):
+
+        if isinstance(index, slice):
+            scenarios = list(self.scenarios)
+            del scenarios[index]
+            self._rebuild(scenarios)
+        else:
+            self._name_set.discard(self.scenarios[index].name)
+            del self.scenarios[index]
+            n = len(self.scenarios)
+            index = index % (n + 1)
+            self._cube[index:n] = self._cube[index + 1:n + 1].copy()
+            del self._cube_sources[index]
+            if not self.scenarios:
+                self._cube, self._basins, self._basin_fingerprint = None, None, None
 
     def __len__(self): return len(self.scenarios)
 
@@ -31,6 +75,282 @@ class ScenarioList(MutableSequence):
 
         self._check_scenario(value)
         self.scenarios.insert(index, value)
+        self._name_set.add(value.name)
+
+        # position of the insertion following the semantics of list.insert
+        n = len(self.scenarios)
+        index = max(0, min(index + n - 1 if index < 0 else index, n - 1))
+
+        if self._basins is None:
+            self._basins = value.basins
+        if self._cube is None or self._cube.shape[0] < n:
+            self._grow_cube(n)
+        self._cube[index + 1:n] = self._cube[index:n - 1].copy()
+        self._cube[index] = self._aligned_loads(value)
+        self._cube_sources.insert(index, value.load_values)
+
+    def _aligned_loads(self, scenario):
+        # reorder the loads of the scenario to follow the order of the basins in the list
+        if scenario.basins.equals(self._basins):
+            return scenario.load_values
+        positions = scenario.basins.get_indexer(self._basins)
+        if (positions < 0).any():
+            raise ValueError("The loads of the scenario '{}' cannot be aligned with the {} because it "
+                             "does not contain all the basins of the existing scenarios in the "
+                             "list.".format(scenario.name, self.__class__.__name__))
+        return scenario.load_values[positions]
+
+    def _grow_cube(self, minimum):
+        # double the capacity to make the cost of successive insertions constant on average
+        capacity = max(minimum, 2 * (self._cube.shape[0] if self._cube is not None else 0), 4)
+        cube = np.empty((capacity, len(self._basins), len(_source_headers_arcmap)))
+        if self._cube is not None:
+            cube[:self._cube.shape[0]] = self._cube
+        self._cube = cube
+
+    def _rebuild(self, scenarios):
+        # check and add the scenarios from scratch, restoring the list as it was if any of them is not valid
+        previous = (self.scenarios, self.nutrient, self._name_set, self._basin_fingerprint,
+                    self._cube, self._cube_sources, self._basins)
+        self.scenarios, self._name_set, self._basin_fingerprint = list(), set(), None
+        self._cube, self._cube_sources, self._basins = None, list(), None
+        try:
+            for scenario in scenarios:
+                self.insert(len(self), scenario)
+        except Exception:
+            (self.scenarios, self.nutrient, self._name_set, self._basin_fingerprint,
+             self._cube, self._cube_sources, self._basins) = previous
+            raise
+
+    @property
+    def cube(self):
+        """The loads of all the scenarios as a 3-D `numpy.ndarray`
+        (basin x source x scenario), where the basins follow the order
+        of `basins`, the sources follow the standard order, and the
+        scenarios follow the order of the list.
+        """
+        if not self.scenarios:
+            return None
+        # refresh the scenarios whose loads were re-assigned since they were added to the list
+        for i, scenario in enumerate(self.scenarios):
+            if scenario.load_values is not self._cube_sources[i]:
+                if not self._basin_fingerprint == scenario.basin_fingerprint:
+                    raise ValueError("The loads of the scenario '{}' were re-assigned with basins that do not "
+                                     "match the basins of the other scenarios in the {}.".format(
+                                         scenario.name, self.__class__.__name__))
+                self._cube[i] = self._aligned_loads(scenario)
+                self._cube_sources[i] = scenario.load_values
+
+        return self._cube[:len(self.scenarios)].transpose(1, 2, 0)
+
+    @property
+    def basins(self):
+        """The basins common to all the scenarios as a `pandas.Index`."""
+        return self._basins
+
+    def _names(self):
+        return [scenario.name for scenario in self.scenarios]
+
+    def source_totals(self):
+        """Return the total load for each source (rows) in each scenario
+        (columns) as a `pandas.DataFrame`.
+        """
+        return pd.DataFrame(np.nansum(self.cube, axis=0), index=_source_headers_arcmap, columns=self._names())
+
+    def basin_totals(self, sources=None):
+        """Return the total load for each basin (rows) in each scenario
+        (columns) as a `pandas.DataFrame`.
+
+        :Parameters:
+
+            sources: `list`, optional
+                The sources to include in the totals. If not provided,
+                all sources are included.
+
+                    *Parameter example:*
+                        ``sources=['Arable', 'Pasture']``
+        """
+        cube = self.cube
+        if sources is not None:
+            cube = cube[:, [_source_headers_arcmap.index(source) for source in sources], :]
+        return pd.DataFrame(np.nansum(cube, axis=1), index=self._basins, columns=self._names())
+
+    def shares(self):
+        """Return the share (in percent) of the total load of each
+        scenario (columns) coming from each source (rows) as a
+        `pandas.DataFrame`.
+        """
+        totals = np.nansum(self.cube, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = np.where(totals.sum(axis=0) == 0, 0., 100 * totals / totals.sum(axis=0))
+        return pd.DataFrame(shares, index=_source_headers_arcmap, columns=self._names())
+
+    def ranks(self, sources=None, ascending=False):
+        """Return the rank of each basin (rows) by total load in each
+        scenario (columns) as a `pandas.DataFrame`, where rank 1 is the
+        basin with the largest load (by default).
+
+        :Parameters:
+
+            sources: `list`, optional
+                The sources to include in the totals used for ranking.
+                If not provided, all sources are included.
+
+            ascending: `bool`, optional
+                Whether rank 1 is the basin with the smallest load. If
+                not provided, rank 1 is the basin with the largest load.
+        """
+        return self.basin_totals(sources).rank(axis=0, method='min', ascending=ascending).astype(int)
+
+    def _baseline_loads(self, baseline):
+        # the loads of the baseline (a scenario, or the name of a scenario in the list) in the order of the basins
+        if not isinstance(baseline, Scenario):
+            if baseline not in self._name_set:
+                raise KeyError("There is no scenario named '{}' in the {}.".format(baseline,
+                                                                                  self.__class__.__name__))
+            baseline = self.scenarios[self._names().index(baseline)]
+        if baseline.load_values is None:
+            raise RuntimeError("The scenario '{}' was not run yet.".format(baseline.name))
+        if not (self.nutrient == baseline.nutrient and self._basin_fingerprint == baseline.basin_fingerprint):
+            raise ValueError("The baseline '{}' cannot be compared with the scenarios in the {} because its "
+                             "nutrient or its basins do not match theirs.".format(baseline.name,
+                                                                                  self.__class__.__name__))
+        return self._aligned_loads(baseline)
+
+    def _basin_changes(self, baseline, sources, chunksize):
+        # the total loads (of the sources given) of each basin in the scenarios and in the baseline, chunk by chunk
+        # of scenarios, so that only a chunk of the cube is copied at once
+        if not self.scenarios:
+            raise RuntimeError("The {} is empty.".format(self.__class__.__name__))
+        columns = [_source_headers_arcmap.index(source) for source in sources] if sources is not None \
+            else slice(None)
+        base = np.nansum(self._baseline_loads(baseline)[:, columns], axis=1)[:, np.newaxis]
+
+        cube = self.cube
+        step = chunksize if chunksize else 100
+        for start in range(0, len(self.scenarios), step):
+            stop = min(start + step, len(self.scenarios))
+            yield start, stop, np.nansum(cube[:, columns, start:stop], axis=1), base
+
+    def diff(self, baseline, sources=None, relative=False, chunksize=None):
+        """Return the change in total load of each basin (rows) in each
+        scenario (columns) against a baseline as a `pandas.DataFrame`.
+
+        :Parameters:
+
+            baseline: `Scenario` or `str`
+                The scenario to compare against (with the same basins
+                as the scenarios in the list), or the name of a
+                scenario in the list.
+
+            sources: `list`, optional
+                The sources to include in the totals (e.g. one source
+                for the changes per source). If not provided, all
+                sources are included.
+
+                    *Parameter example:*
+                        ``sources=['Arable', 'Pasture']``
+
+            relative: `bool`, optional
+                Whether to return the relative changes (in percent,
+                NaN where the baseline is zero) rather than the
+                absolute changes. If not provided, the absolute changes
+                are returned.
+
+            chunksize: `int`, optional
+                The number of scenarios processed at once. If not
+                provided, 100 scenarios are processed at once.
+        """
+        changes = np.empty((len(self._basins), len(self.scenarios))) if self.scenarios else None
+        for start, stop, loads, base in self._basin_changes(baseline, sources, chunksize):
+            changes[:, start:stop] = deltas(loads, base)[1 if relative else 0]
+
+        return pd.DataFrame(changes, index=self._basins, columns=self._names())
+
+    def top_changes(self, baseline, k=10, sources=None, relative=False, chunksize=None):
+        """Return the k basins with the largest changes in total load
+        (in magnitude) in each scenario against a baseline as a
+        `pandas.DataFrame` with a multi-index (scenario, rank) and the
+        columns 'basin', 'baseline', 'load', 'delta', and 'relative'
+        (in percent).
+
+        :Parameters:
+
+            baseline: `Scenario` or `str`
+                The scenario to compare against (with the same basins
+                as the scenarios in the list), or the name of a
+                scenario in the list.
+
+            k: `int`, optional
+                The number of basins to return for each scenario. If
+                not provided, 10 basins are returned.
+
+            sources: `list`, optional
+                The sources to include in the totals. If not provided,
+                all sources are included.
+
+            relative: `bool`, optional
+                Whether to rank the basins by relative change rather
+                than by absolute change. If not provided, the basins are
+                ranked by absolute change.
+
+            chunksize: `int`, optional
+                The number of scenarios processed at once. If not
+                provided, 100 scenarios are processed at once.
+        """
+        names = self._names()
+        frames = list()
+        for start, stop, loads, base in self._basin_changes(baseline, sources, chunksize):
+            delta, relative_ = deltas(loads, base)
+            positions = top_k(relative_ if relative else delta, k)
+            n_ranks, n_scenarios = positions.shape
+            columns = np.arange(n_scenarios)
+            frames.append(pd.DataFrame({
+                'scenario': np.tile(names[start:stop], n_ranks),
+                'rank': np.repeat(np.arange(1, n_ranks + 1), n_scenarios),
+                'basin': np.asarray(self._basins)[positions].reshape(-1),
+                'baseline': base[positions, 0].reshape(-1),
+                'load': loads[positions, columns].reshape(-1),
+                'delta': delta[positions, columns].reshape(-1),
+                'relative': relative_[positions, columns].reshape(-1)
+            }, columns=['scenario', 'rank', 'basin', 'baseline', 'load', 'delta', 'relative']))
+
+        # order the rows by scenario (in the order of the list), then by rank
+        top = pd.concat(frames).set_index(['scenario', 'rank'])
+
+        return top.reindex(pd.MultiIndex.from_product([names, np.arange(1, min(k, len(self._basins)) + 1)],
+                                                      names=['scenario', 'rank']))
+
+    def diff_statistics(self, baseline, sources=None, chunksize=None):
+        """Return the summary statistics of the changes in total load of
+        each scenario against a baseline as a `pandas.DataFrame` indexed
+        by scenario, with the columns 'baseline', 'load', 'delta', and
+        'relative' (for the loads over all the basins), 'mean', 'std',
+        'min', and 'max' (for the changes across the basins), and
+        'increased' and 'decreased' (for the number of basins whose
+        load changed).
+
+        :Parameters:
+
+            baseline: `Scenario` or `str`
+                The scenario to compare against (with the same basins
+                as the scenarios in the list), or the name of a
+                scenario in the list.
+
+            sources: `list`, optional
+                The sources to include in the totals. If not provided,
+                all sources are included.
+
+            chunksize: `int`, optional
+                The number of scenarios processed at once. If not
+                provided, 100 scenarios are processed at once.
+        """
+        frames = list()
+        for start, stop, loads, base in self._basin_changes(baseline, sources, chunksize):
+            stats = statistics(loads, base)
+            frames.append(pd.DataFrame(stats, index=self._names()[start:stop], columns=list(stats)))
+
+        return pd.concat(frames)
 
     def _check_scenario(self, value):
         # check that the object given is an instance of Scenario or a subclass of Scenario
@@ -40,28 +360,312 @@ class ScenarioList(MutableSequence):
                                          Scenario.__name__))
 
         # check that the name of the scenario doesn't already exist
-        if value.name in [s.name for s in self.scenarios]:
+        if value.name in self._name_set:
             raise RuntimeError("A scenario named '{}' already exists in the {}, "
                                "please choose another name for this scenario.".format(value.name,
                                                                                       self.__class__.__name__))
 
         # check that the scenario was already run
-        if value.loads is None:
+        if value.load_values is None:
             raise RuntimeError("The scenario '{}' cannot be added to the {} because it "
                                "was not run yet.".format(value.name, self.__class__.__name__))
 
-        if len(self.scenarios) > 0:  # if there is at least one Scenario already in the list
+        if self._basin_fingerprint is not None:  # if there is at least one Scenario already in the list
             # check that nutrient is the same
-            if not self.scenarios[0].nutrient == value.nutrient:
+            if not self.nutrient == value.nutrient:
                 raise ValueError("The scenario '{}' cannot be added to the {} because its "
-                                 "nutrient does not match the nutrient of the existing scenarios in the list.")
-            # check that the multi-index of the 'loads' dataframes are equal
-            if not self.scenarios[0].loads.sort_index().index.equals(value.loads.sort_index().index):
+                                 "nutrient does not match the nutrient of the existing scenarios "
+                                 "in the list.".format(value.name, self.__class__.__name__))
+            # check that the basins are the same (regardless of their order)
+            if not self._basin_fingerprint == value.basin_fingerprint:
                 raise ValueError("The scenario '{}' cannot be added to the {} because its "
                                  "index does not match the indices of the existing scenarios in the list: "
-                                 "it is likely that they contain different basins.")
+                                 "it is likely that they contain different basins.".format(value.name,
+                                                                                          self.__class__.__name__))
         else:
             self.nutrient = value.nutrient
+            self._basin_fingerprint = value.basin_fingerprint
+
+    def write_to_parquet(self, output_location, compression='snappy'):
+        """Write all the scenarios into one Parquet dataset partitioned
+        by scenario (i.e. one 'scenario=<name>' sub-folder per
+        scenario, containing the file written with
+        `Scenario.write_to_parquet`) (requires `pyarrow`).
+
+        :Parameters:
+
+            output_location: `str`
+                The location of the folder of the dataset (created if
+                it does not exist).
+
+            compression: `str`, optional
+                The compression codec to use (any codec supported by
+                `pyarrow`). If not provided, 'snappy' is used.
+        """
+        for scenario in self.scenarios:
+            partition = sep.join([output_location, 'scenario={}'.format(scenario.name)])
+            if not path.isdir(partition):
+                makedirs(partition)
+            scenario.write_to_parquet(partition, compression=compression)
+
+    @classmethod
+    def read_from_parquet(cls, input_location, scenarios=None, basins=None, sources=None):
+        """Read the scenarios of a Parquet dataset written with
+        `write_to_parquet` (requires `pyarrow`).
+
+        :Parameters:
+
+            input_location: `str`
+                The location of the folder of the dataset.
+
+            scenarios: `list`, optional
+                The names of the scenarios to read (the other partitions
+                are not read). If not provided, all scenarios are read.
+
+            basins: `list`, optional
+                The basins to read. If not provided, all basins are
+                read.
+
+            sources: `list`, optional
+                The sources to read (the loads for the others are left
+                as NaN). If not provided, all sources are read.
+
+        :Returns:
+
+            `ScenarioList`
+        """
+        partitions = sorted(folder for folder in listdir(input_location) if folder.startswith('scenario='))
+        if scenarios is not None:
+            missing = set(scenarios) - set(folder[len('scenario='):] for folder in partitions)
+            if missing:
+                raise KeyError("The following scenarios are not available in the dataset "
+                               "'{}': {}".format(input_location, sorted(missing)))
+            partitions = ['scenario={}'.format(name) for name in scenarios]
+
+        instances = list()
+        for folder in partitions:
+            files = [f for f in listdir(sep.join([input_location, folder])) if f.endswith('.parquet')]
+            for f in files:
+                instances.append(Scenario.read_from_parquet(sep.join([input_location, folder, f]),
+                                                            basins=basins, sources=sources))
+
+        return cls(instances)
+
+    def write(self, file_path, file_format=None, chunksize=None, compression=None):
+        """Write all the scenarios into one table in long format (one
+        row per scenario, basin, and source, with the columns
+        'scenario', 'nutrient', 'basin', 'category', 'source', 'load',
+        and 'area'), streamed to the file in chunks of rows.
+
+        :Parameters:
+
+            file_path: `str`
+                The location of the file to write.
+
+            file_format: `str`, optional
+                The format of the file, one of 'csv', 'parquet'
+                (requires `pyarrow`), or 'hdf5' (requires `tables`).
+                If not provided, the format is inferred from the
+                extension of the file.
+
+            chunksize: `int`, optional
+                The number of rows written at once (rounded to a whole
+                number of scenarios). If not provided, chunks of about
+                1,000,000 rows are written.
+
+            compression: `str`, optional
+                The compression codec to use for Parquet files (any
+                codec supported by `pyarrow`, 'snappy' by default) or
+                HDF5 files (any library supported by `tables`, none by
+                default). Not used for CSV files.
+
+                    *Parameter example:*
+                        ``compression='zstd'``
+
+        :Returns:
+
+            `str`
+                The path of the file written.
+        """
+        file_format = self._file_format(file_path, file_format)
+        if not self.scenarios:
+            raise RuntimeError("The {} cannot be written because it is empty.".format(self.__class__.__name__))
+
+        # whole scenarios per chunk, so that each chunk is a block of the cube
+        rows = len(self._basins) * len(_source_headers_arcmap)
+        step = max(1, (chunksize if chunksize else 1000000) // rows)
+        chunks = (self._long_format_chunk(start, min(start + step, len(self.scenarios)))
+                  for start in range(0, len(self.scenarios), step))
+
+        if file_format == 'csv':
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(file_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        elif file_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            writer = None
+            try:
+                for chunk in chunks:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(file_path, table.schema,
+                                                  compression=compression if compression else 'snappy')
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            # the strings are stored with a fixed width in HDF5 tables, so the widest of each column is used
+            itemsize = {
+                'scenario': max(len(name) for name in self._names()),
+                'nutrient': 1,
+                'basin': max(len(str(basin)) for basin in self._basins),
+                'category': max(len(category) for category in _source_categories),
+                'source': max(len(source) for source in _source_headers_arcmap)
+            }
+            with pd.HDFStore(file_path, mode='w', complevel=9 if compression else 0, complib=compression) as store:
+                for chunk in chunks:
+                    store.append('scenarios', chunk, format='table', index=False,
+                                 data_columns=['scenario', 'basin', 'source'], min_itemsize=itemsize)
+
+        return file_path
+
+    def _long_format_chunk(self, start, stop):
+        # the rows of the scenarios from start to stop, ordered by scenario, then basin, then source
+        cube = self.cube[:, :, start:stop]
+        n_basins, n_sources, n_scenarios = cube.shape
+        areas = np.array([scenario.areas['area'].reindex(self._basins).values
+                          for scenario in self.scenarios[start:stop]], dtype=float)
+
+        return pd.DataFrame({
+            'scenario': np.repeat(self._names()[start:stop], n_basins * n_sources),
+            'nutrient': self.nutrient,
+            'basin': np.tile(np.repeat(np.asarray(self._basins), n_sources), n_scenarios),
+            'category': np.tile(_source_categories, n_scenarios * n_basins),
+            'source': np.tile(_source_headers_arcmap, n_scenarios * n_basins),
+            'load': cube.transpose(2, 0, 1).reshape(-1),
+            'area': np.repeat(areas.reshape(-1), n_sources)
+        }, columns=['scenario', 'nutrient', 'basin', 'category', 'source', 'load', 'area'])
+
+    @classmethod
+    def read(cls, file_path, file_format=None, scenarios=None, chunksize=None):
+        """Read the scenarios of a table in long format written with
+        `write`, streaming the file in chunks of rows.
+
+        :Parameters:
+
+            file_path: `str`
+                The location of the file to read.
+
+            file_format: `str`, optional
+                The format of the file, one of 'csv', 'parquet'
+                (requires `pyarrow`), or 'hdf5' (requires `tables`).
+                If not provided, the format is inferred from the
+                extension of the file.
+
+            scenarios: `list`, optional
+                The names of the scenarios to read (in this order), the
+                rows for the other scenarios are skipped while the file
+                is read. If not provided, all scenarios are read.
+
+            chunksize: `int`, optional
+                The number of rows read at once. If not provided, the
+                file is read in chunks of 1,000,000 rows.
+
+        :Returns:
+
+            `ScenarioList`
+        """
+        file_format = cls._file_format(file_path, file_format)
+        chunksize = chunksize if chunksize else 1000000
+        columns = ['scenario', 'nutrient', 'basin', 'source', 'load', 'area']
+
+        if file_format == 'csv':
+            # the type of the basins is inferred (like in Scenario.read_from_csv), for integer identifiers to
+            # remain integers and give the same basin fingerprint as the scenarios they were written from
+            chunks = pd.read_csv(file_path, usecols=columns, chunksize=chunksize,
+                                 dtype={'scenario': str, 'nutrient': str, 'source': str})
+        elif file_format == 'parquet':
+            import pyarrow.parquet as pq
+            chunks = (batch.to_pandas() for batch in
+                      pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=columns))
+        else:
+            chunks = pd.read_hdf(file_path, 'scenarios', columns=columns, chunksize=chunksize)
+
+        # only keep the rows of the scenarios requested
+        wanted = set(scenarios) if scenarios is not None else None
+        frame = pd.concat([chunk if wanted is None else chunk[chunk['scenario'].isin(wanted)]
+                           for chunk in chunks], ignore_index=True)
+
+        names = list(pd.unique(frame['scenario']))
+        if scenarios is not None:
+            available = set(names)
+            missing = [name for name in scenarios if name not in available]
+            if missing:
+                raise KeyError("The following scenarios are not available in the file "
+                               "'{}': {}".format(file_path, missing))
+            names = list(scenarios)
+        nutrients = pd.unique(frame['nutrient'])
+        if len(nutrients) > 1:
+            raise ValueError("The scenarios in the file '{}' cannot be read into one {} because "
+                             "they are for different nutrients.".format(file_path, cls.__name__))
+
+        # place each row in the cube (scenario x basin x source) from the codes of its labels
+        basins = pd.Index(pd.unique(frame['basin']), name='basin')
+        codes = (pd.Index(names).get_indexer(frame['scenario']),
+                 basins.get_indexer(frame['basin']),
+                 pd.Index(_source_headers_arcmap).get_indexer(frame['source']))
+        if (codes[2] < 0).any():
+            raise ValueError("The file '{}' contains sources that are not valid: "
+                             "{}.".format(file_path, sorted(set(frame['source'][codes[2] < 0]))))
+        counts = np.zeros((len(names), len(basins), len(_source_headers_arcmap)), dtype=int)
+        np.add.at(counts, codes, 1)
+        if not (counts == 1).all():
+            raise ValueError("The scenarios in the file '{}' cannot be read into one {} because they do not "
+                             "contain exactly one load for each of their basins and sources, or because "
+                             "they do not share the same basins.".format(file_path, cls.__name__))
+
+        cube = np.empty(counts.shape)
+        cube[codes] = frame['load'].values
+        areas = np.empty(counts.shape[:2])
+        areas[codes[:2]] = frame['area'].values
+
+        # the scenarios are consistent by construction, so the list is assembled without checking them one by one
+        instance = cls()
+        fingerprint = None
+        for i, name in enumerate(names):
+            scenario = Scenario(name, nutrients[0])
+            scenario._set_load_values(np.array(cube[i]), basins)
+            scenario.areas = pd.DataFrame({'area': areas[i]}, index=basins)
+            if fingerprint is None:
+                fingerprint = scenario.basin_fingerprint
+            scenario._basin_fingerprint = fingerprint
+            instance.scenarios.append(scenario)
+            instance._cube_sources.append(scenario.load_values)
+
+        if names:
+            instance.nutrient = nutrients[0]
+            instance._name_set = set(names)
+            instance._basins = basins
+            instance._basin_fingerprint = fingerprint
+            instance._cube = cube
+
+        return instance
+
+    @staticmethod
+    def _file_format(file_path, file_format):
+        # infer the format of the file from its extension if not given
+        if file_format is None:
+            extension = path.splitext(file_path)[1].lower()
+            file_format = {'.csv': 'csv', '.parquet': 'parquet', '.h5': 'hdf5', '.hdf5': 'hdf5', '.hdf': 'hdf5'}.get(
+                extension)
+            if file_format is None:
+                raise ValueError("The format of the file '{}' cannot be inferred from its extension, "
+                                 "please specify it.".format(file_path))
+        if file_format not in ['csv', 'parquet', 'hdf5']:
+            raise ValueError("The file format can only be 'csv', 'parquet', or 'hdf5'.")
+
+        return file_format
 
     def plot_as_stacked_bars(self, file_name, output_location=None, file_format='pdf',
                              colour_palette=None, name_mapping=None, title_on=True,
@@ -78,27 +682,9 @@ class ScenarioList(MutableSequence):
         else:
             fancy_names = [_source_fancy_names[name] for name in _source_headers_arcmap]
 
-        # concatenate the scenarios into one dataframe
-        all_loads = [scenario.loads for scenario in self.scenarios]
-        all_names = [scenario.name for scenario in self.scenarios]
-
-        df_loads = pd.concat(all_loads, axis=1)
-        df_loads.columns = all_names
-
-        # reindex the created dataframe to make sure that the order of the sources is standard
-        # (because if the basins are not ordered in the same way, it could have changed the
-        # order of the sources during the concatenation)
-        df_loads = df_loads.reindex(labels=_source_headers_arcmap, level='source')
-
-        # group by the sources in each scenario
-        # (i.e. collapse values to selection level, i.e. lose the information per basin)
-        df_loads = df_loads.groupby(
-            ['source']).agg(
-            {name: 'sum' for name in all_names})
-
-        # make sure than the column ordering has not been changed
-        # because the agg method uses a dict which is not ordered
-        df_loads = df_loads[all_names]
+        # total loads per source (rows) in each scenario (columns), in the standard order of the sources
+        all_names = self._names()
+        df_loads = self.source_totals()
 
         # convert dataframe to array
         stack_vals = df_loads.values
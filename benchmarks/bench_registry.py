@@ -0,0 +1,68 @@
+"""Benchmark of the cost of the constructor of Scenario with the
+registry of names (see SLAMpy._registry), with many scenarios alive,
+with transient scenarios, within scopes, and across threads.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_registry.py [scenarios]
+"""
+from os import path
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+
+from SLAMpy import Scenario
+
+
+def _report(label, seconds, number):
+    print('{:<55} {:>10.2f} us'.format(label, seconds / number * 1e6))
+
+
+def main(n_scenarios=50000):
+    print('{} scenarios'.format(n_scenarios))
+
+    # constructor with few and with many scenarios alive (constant time expected)
+    start = timeit.default_timer()
+    alive = [Scenario('Alive{}'.format(i), 'P') for i in range(100)]
+    _report('constructor, 100 scenarios alive', timeit.default_timer() - start, 100)
+    start = timeit.default_timer()
+    alive += [Scenario('Alive{}'.format(i), 'P') for i in range(100, n_scenarios)]
+    _report('constructor, {} scenarios alive'.format(n_scenarios), timeit.default_timer() - start,
+            n_scenarios - 100)
+
+    # transient scenarios (the name is released as soon as the scenario is garbage-collected)
+    start = timeit.default_timer()
+    for i in range(n_scenarios):
+        Scenario('Transient', 'P')
+    _report('constructor, transient scenarios (same name)', timeit.default_timer() - start, n_scenarios)
+    print('{:<55} {:>10}'.format('names registered', len(Scenario._registry)))
+    del alive
+
+    # constructor within a scope (one per session of a long-running worker)
+    start = timeit.default_timer()
+    with Scenario.registry_scope():
+        scoped = [Scenario('Scoped{}'.format(i), 'P') for i in range(n_scenarios)]
+    _report('constructor, within a scope', timeit.default_timer() - start, n_scenarios)
+    del scoped
+
+    # constructor in several threads, each within its own scope
+    n_threads = 8
+
+    def worker():
+        with Scenario.registry_scope():
+            [Scenario('Thread{}'.format(i), 'P') for i in range(n_scenarios // n_threads)]
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    start = timeit.default_timer()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    _report('constructor, {} threads with their own scope'.format(n_threads), timeit.default_timer() - start,
+            n_threads * (n_scenarios // n_threads))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,71 @@
+"""Benchmark of the checks of the basins of the scenarios added to a
+ScenarioList (see ScenarioList._check_scenario) and of the refresh of
+its cube, both based on the basin fingerprint of the scenarios.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_scenariolist.py [basins] [scenarios]
+"""
+from os import path
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+
+from SLAMpy import Scenario, ScenarioList
+
+
+def _scenarios(n_basins, n_scenarios):
+    random = np.random.RandomState(42)
+    basins = np.array(['IE_{:07d}'.format(i) for i in range(n_basins)])
+    scenarios = list()
+    for i in range(n_scenarios):
+        scenario = Scenario('Scenario{}'.format(i), 'P')
+        # the same basins in a different order for each scenario
+        scenario._set_load_values(random.rand(n_basins, 9), basins[random.permutation(n_basins)])
+        scenarios.append(scenario)
+    return scenarios
+
+
+def _report(label, seconds, number=1):
+    print('{:<55} {:>10.3f} ms'.format(label, seconds / number * 1000.))
+
+
+def main(n_basins=100000, n_scenarios=20):
+    print('{} basins, {} scenarios'.format(n_basins, n_scenarios))
+    scenarios = _scenarios(n_basins, n_scenarios)
+
+    start = timeit.default_timer()
+    for scenario in scenarios:
+        scenario.basin_fingerprint
+    _report('basin fingerprint (first call, per scenario)', timeit.default_timer() - start, n_scenarios)
+    _report('basin fingerprint (cached, per scenario)',
+            timeit.timeit(lambda: [scenario.basin_fingerprint for scenario in scenarios], number=10),
+            10 * n_scenarios)
+    # i.e. what the check of the basins would cost without the fingerprint
+    _report('comparison of the sets of basins (per scenario)',
+            timeit.timeit(lambda: set(scenarios[0].basins) == set(scenarios[1].basins), number=3), 3)
+
+    def append_all():
+        scenario_list = ScenarioList()
+        for scenario in scenarios:
+            scenario_list.append(scenario)
+        return scenario_list
+
+    _report('append to a ScenarioList (per scenario)', timeit.timeit(append_all, number=3), 3 * n_scenarios)
+
+    scenario_list = append_all()
+    scenario_list.cube
+    _report('cube (unchanged)', timeit.timeit(lambda: scenario_list.cube, number=100), 100)
+
+    def refresh():
+        # re-assign the loads of one scenario, so that only its slice of the cube is refreshed
+        scenarios[-1]._set_load_values(scenarios[-1].load_values.copy(), scenarios[-1].basins)
+        return scenario_list.cube
+
+    _report('cube (one scenario re-assigned)', timeit.timeit(refresh, number=10), 10)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,331 @@
+"""Stand-in for the subset of arcpy used by SLAMpy, keeping the tables in
+memory, so that the geoprocessing functions can be tested without
+ArcGIS.
+
+A table is identified by its path (e.g. 'out/output.gdb/Arable', or
+'in_memory/Arable'), and holds its fields (by name, with their ArcGIS
+type) and its rows (as dictionaries, with the object ID under 'OID' and
+the geometry under 'SHAPE').
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import re
+import numpy as np
+
+
+class Geometry(object):
+    def __init__(self, area, wkb=None):
+        self.area = float(area)  # planar area in square metres
+        self.wkb = wkb if wkb is not None else repr(area).encode('utf-8')
+
+    def getArea(self, method='PLANAR', units='SQUAREMETERS'):
+        return self.area / 10000. if units.upper() == 'HECTARES' else self.area
+
+
+class Field(object):
+    def __init__(self, name, type_):
+        self.name = name
+        self.type = type_
+
+
+class _SpatialReference(object):
+    factoryCode = 2157  # Irish Transverse Mercator
+    metersPerUnit = 1.
+
+
+class _Description(object):
+    def __init__(self, path, table):
+        self.catalogPath = path
+        self.name = _posix(path).split('/')[-1]
+        if table is None:
+            self.dataType = 'Workspace'
+        else:
+            self.dataType = 'FeatureClass' if table['shape'] else 'Table'
+            self.fields = [Field(name, type_) for name, type_ in _fields(table).items()]
+            if table['shape']:
+                self.shapeType = 'Polygon'
+                self.spatialReference = _SpatialReference()
+
+
+class _Result(object):
+    def __init__(self, value):
+        self._value = value
+
+    def getOutput(self, index):
+        return self._value
+
+
+class _Env(object):
+    overwriteOutput = True
+    scratchFolder = None
+    workspace = None
+
+
+env = _Env()
+
+_tables = dict()
+_workspaces = set()
+_hidden = dict()
+
+# the number of geometries written by update cursors, and the calls of the geoprocessing tools (by tool name)
+geometry_writes = 0
+calls = list()
+
+
+def reset():
+    global geometry_writes
+    _tables.clear()
+    _workspaces.clear()
+    _hidden.clear()
+    geometry_writes = 0
+    del calls[:]
+
+
+def _posix(path):
+    return path.replace('\\', '/')
+
+
+def _is_in_memory(path):
+    return _posix(path).split('/')[0].lower() in ('in_memory', 'memory')
+
+
+@contextmanager
+def separate_memory():
+    """Hide the datasets kept in memory, like in a worker process that does not share the memory of its parent."""
+    for path in [path for path in _tables if _is_in_memory(path)]:
+        _hidden[path] = _tables.pop(path)
+    try:
+        yield
+    finally:
+        for path in [path for path in _tables if _is_in_memory(path)]:
+            del _tables[path]
+        _tables.update(_hidden)
+        _hidden.clear()
+
+
+def create_table(path, fields, rows, areas=None):
+    """
+    :param path: path of the table [required]
+    :param fields: ArcGIS types of the fields by name (in order) [required]
+    :param rows: values of the fields of each row (as dictionaries) [required]
+    :param areas: planar area of the geometry of each row, for a feature class [optional]
+    """
+    table = {'fields': OrderedDict(fields), 'rows': list(), 'shape': areas is not None}
+    for i, values in enumerate(rows):
+        row = dict((name, values.get(name)) for name in table['fields'])
+        row['OID'] = i + 1
+        if areas is not None:
+            row['SHAPE'] = Geometry(areas[i])
+        table['rows'].append(row)
+    _tables[path] = table
+
+    return path
+
+
+def rows(path, fields):
+    """:return: the values of the fields of each row of the table (as tuples)"""
+    return [tuple(_get(row, name) for name in fields) for row in _table(path)['rows']]
+
+
+def _table(path):
+    if path not in _tables:
+        raise RuntimeError("ERROR 000732: Dataset {} does not exist or is not supported".format(path))
+    return _tables[path]
+
+
+def _fields(table):
+    fields = OrderedDict([('OBJECTID', 'OID')])
+    if table['shape']:
+        fields['Shape'] = 'Geometry'
+    fields.update(table['fields'])
+    return fields
+
+
+def _get(row, name):
+    if name == 'OID@':
+        return row['OID']
+    if name == 'SHAPE@':
+        return row['SHAPE']
+    if name == 'SHAPE@AREA':
+        return row['SHAPE'].area
+    if name == 'SHAPE@WKB':
+        return bytearray(row['SHAPE'].wkb)
+    return row[name]
+
+
+def _set(row, name, value):
+    global geometry_writes
+    if name in ('OID@', 'SHAPE@AREA', 'SHAPE@WKB'):  # read-only tokens are ignored
+        return
+    if name == 'SHAPE@':
+        geometry_writes += 1
+        row['SHAPE'] = value
+        return
+    row[name] = value
+
+
+def _copy(in_data, out_data):
+    table = _table(in_data)
+    _tables[out_data] = {'fields': OrderedDict(table['fields']), 'rows': [dict(row) for row in table['rows']],
+                         'shape': table['shape']}
+
+
+# geoprocessing tools
+
+def Exists(path):
+    return path in _tables or _posix(path) in _workspaces
+
+
+def Describe(path):
+    if _posix(path) in _workspaces or _posix(path).lower() in ('in_memory', 'memory'):
+        return _Description(path, None)
+    return _Description(path, _table(path))
+
+
+def ListFields(path):
+    return [Field(name, type_) for name, type_ in _fields(_table(path)).items()]
+
+
+def CreateFileGDB_management(out_folder_path, out_name):
+    calls.append('CreateFileGDB')
+    _workspaces.add(_posix('/'.join([out_folder_path, out_name])))
+
+
+def Delete_management(path):
+    calls.append('Delete')
+    _tables.pop(path, None)
+    if _posix(path) in _workspaces:
+        _workspaces.discard(_posix(path))
+        for table in [table for table in _tables if _posix(table).startswith(_posix(path) + '/')]:
+            del _tables[table]
+
+
+def Copy_management(in_data, out_data):
+    calls.append('Copy')
+    _copy(in_data, out_data)
+
+
+def CopyFeatures_management(in_features, out_feature_class):
+    calls.append('CopyFeatures')
+    _copy(in_features, out_feature_class)
+
+
+def GetCount_management(path):
+    return _Result(str(len(_table(path)['rows'])))
+
+
+def AddField_management(in_table, field_name, field_type, field_is_nullable=None, field_is_required=None):
+    calls.append('AddField')
+    _add_field(in_table, field_name, field_type)
+
+
+def _add_field(in_table, field_name, field_type):
+    table = _table(in_table)
+    table['fields'][field_name] = field_type.capitalize()
+    for row in table['rows']:
+        row.setdefault(field_name, None)
+
+
+class _Management(object):
+    @staticmethod
+    def AddFields(in_table, field_description):
+        calls.append('AddFields')
+        for name, type_ in field_description:
+            _add_field(in_table, name, type_)
+
+
+management = _Management()
+
+
+def CalculateField_management(in_table, field, expression, expression_type=None, code_block=None):
+    """Evaluate the Python expression for each row, where '!name!' stands for the value of a field."""
+    calls.append('CalculateField')
+    table = _table(in_table)
+    namespace = dict()
+    if code_block:
+        exec(_dedent(code_block), namespace)
+    for row in table['rows']:
+        code = expression.replace('!shape.area@hectares!', repr(row['SHAPE'].getArea('PLANAR', 'HECTARES')))
+        code = re.sub(r'!(\w+)!', lambda match: repr(row[match.group(1)]), code)
+        row[field] = eval(code, namespace)
+
+
+def _dedent(code_block):
+    # the code blocks of the toolbox are indented relatively to the first line
+    lines = code_block.strip('\n').split('\n')
+    first = lines[0].lstrip()
+    body = [line for line in lines[1:] if line.strip()]
+    indent = min(len(line) - len(line.lstrip()) for line in body) if body else 0
+    return '\n'.join([first] + ['    ' + line[indent:] for line in body])
+
+
+class _Cursor(object):
+    def __init__(self, in_table, field_names, where_clause=None):
+        self._table = _table(in_table)
+        self.fields = list(field_names) if not isinstance(field_names, str) else \
+            [name for name in _fields(self._table) if not name == 'Shape'] if field_names == '*' else [field_names]
+        self._rows = iter(self._table['rows'])
+        self._current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._current = next(self._rows)
+        return [_get(self._current, 'OID@' if name == 'OBJECTID' else name) for name in self.fields]
+
+    next = __next__
+
+
+class _SearchCursor(_Cursor):
+    def __next__(self):
+        return tuple(super(_SearchCursor, self).__next__())
+
+    next = __next__
+
+
+class _UpdateCursor(_Cursor):
+    def updateRow(self, values):
+        if not len(values) == len(self.fields):
+            raise RuntimeError("The row does not have the same number of values as the cursor has fields.")
+        for name, value in zip(self.fields, values):
+            _set(self._current, name, value)
+
+
+def _numpy_type(type_):
+    return {'Double': 'f8', 'Single': 'f8', 'Integer': 'i8', 'SmallInteger': 'i8', 'OID': 'i8'}.get(type_, 'U64')
+
+
+def _table_to_numpy_array(in_table, field_names, skip_nulls=False, null_value=None):
+    table = _table(in_table)
+    types = _fields(table)
+    dtype = [(name, 'i8' if name == 'OID@' else 'f8' if name == 'SHAPE@AREA' else _numpy_type(types[name]))
+             for name in field_names]
+    values = list()
+    for row in table['rows']:
+        record = list()
+        for name in field_names:
+            value = _get(row, name)
+            if value is None:
+                if null_value is None or name not in null_value:
+                    raise RuntimeError("Null values in the field '{}' (see null_value).".format(name))
+                value = null_value[name]
+            record.append(value)
+        values.append(tuple(record))
+
+    return np.array(values, dtype=dtype)
+
+
+class _DataAccess(object):
+    SearchCursor = _SearchCursor
+    UpdateCursor = _UpdateCursor
+    TableToNumPyArray = staticmethod(_table_to_numpy_array)
+
+
+da = _DataAccess()
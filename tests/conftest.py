@@ -0,0 +1,20 @@
+from os import path
+import sys
+
+import pytest
+
+# the package is imported from the repository, with the stand-in for arcpy installed before it is first imported
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+sys.path.insert(0, path.dirname(path.realpath(__file__)))
+
+import arcpy_stub
+
+sys.modules['arcpy'] = arcpy_stub
+
+
+@pytest.fixture
+def arcpy(tmpdir):
+    arcpy_stub.reset()
+    arcpy_stub.env.scratchFolder = str(tmpdir)
+    yield arcpy_stub
+    arcpy_stub.reset()
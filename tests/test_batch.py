@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from SLAMpy import batch
+
+
+class _Silent(object):
+    def addMessage(self, msg):
+        pass
+
+
+class _Result(object):
+    def __init__(self, value):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+class _Pool(object):
+    # stand-in for the pool of processes of _load_apportionment, recording how it is created
+    created = list()
+
+    def __init__(self, processes, initializer=None, initargs=()):
+        _Pool.created.append((processes, initializer, initargs))
+        initializer(*initargs)
+
+    def apply_async(self, function, args):
+        return _Result(function(*args))
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+def _run_selection(name, selection, nutrient, sort_field):
+    if selection == 'broken':
+        return name, None, 'failed'
+    return name, {'loads': np.ones((2, 9)), 'basins': ['IE_1', 'IE_2'],
+                  'areas': pd.DataFrame({'area': [1., 2.]}, index=['IE_1', 'IE_2'])}, None
+
+
+def test_batch_uses_process_pool_of_load_apportionment(arcpy, monkeypatch):
+    monkeypatch.setattr(batch, '_process_pool', _Pool)
+    monkeypatch.setattr(batch, '_run_selection', _run_selection)
+    del _Pool.created[:]
+    arcpy.create_table('region', [('EU_CD', 'Text')], [{'EU_CD': 'IE_1'}, {'EU_CD': 'IE_2'}], areas=[1., 2.])
+
+    scenarios, failures = batch.run_batch([('Batch1', "EU_CD = 'IE_1'"), ('Batch2', 'broken')], 'P', 'EU_CD',
+                                          'region', 'out', {}, processes=2, messages=_Silent())
+
+    assert _Pool.created == [(2, batch._init_worker, ('region', {}, 'out', 'arcpy'))]
+    assert list(scenarios) == ['Batch1'] and list(failures) == ['Batch2']
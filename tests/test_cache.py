@@ -0,0 +1,53 @@
+from SLAMpy._cache import StageCheckpoint, argument_fingerprint, dataset_fingerprint, stage_key
+
+
+def _inputs(arcpy):
+    arcpy.CreateFileGDB_management('in', 'inputs.gdb')
+    arcpy.create_table('in/inputs.gdb/Arable', [('pSwFromGw', 'Double')], [{'pSwFromGw': 0.1}], areas=[1.])
+    arcpy.create_table('in/inputs.gdb/Pasture', [('pSwFromGw', 'Double')], [{'pSwFromGw': 0.2}], areas=[2.])
+
+
+def test_dataset_identified_by_its_own_content(arcpy):
+    _inputs(arcpy)
+    arable, pasture = dataset_fingerprint('in/inputs.gdb/Arable'), dataset_fingerprint('in/inputs.gdb/Pasture')
+    assert not arable == pasture
+
+    # a change in another dataset of the same geodatabase does not affect the fingerprint
+    arcpy._tables['in/inputs.gdb/Pasture']['rows'][0]['pSwFromGw'] = 0.3
+    assert dataset_fingerprint('in/inputs.gdb/Arable') == arable
+    assert not dataset_fingerprint('in/inputs.gdb/Pasture') == pasture
+
+    # a change in the attributes or in the geometries of the dataset does
+    arcpy._tables['in/inputs.gdb/Arable']['rows'][0]['pSwFromGw'] = 0.5
+    edited = dataset_fingerprint('in/inputs.gdb/Arable')
+    assert not edited == arable
+    arcpy._tables['in/inputs.gdb/Arable']['rows'][0]['SHAPE'] = arcpy.Geometry(1., wkb=b'other')
+    assert not dataset_fingerprint('in/inputs.gdb/Arable') == edited
+
+
+def test_other_arguments_identified_by_value(arcpy):
+    _inputs(arcpy)
+
+    assert argument_fingerprint('CODE_12') == repr('CODE_12')
+    assert argument_fingerprint(None) == repr(None)
+    assert argument_fingerprint('in/inputs.gdb/Arable') == dataset_fingerprint('in/inputs.gdb/Arable')
+
+
+def test_checkpoint_key_of_stage_not_affected_by_other_stage(arcpy, tmpdir):
+    _inputs(arcpy)
+    arcpy.create_table('out.gdb/Arable', [('Arab2calc', 'Double')], [{'Arab2calc': 1.}], areas=[1.])
+    checkpoint = StageCheckpoint(str(tmpdir.join('checkpoint.json')))
+
+    key = stage_key('agri_v2_geoprocessing', 'P', 'location', ['in/inputs.gdb/Arable'])
+    checkpoint.record('agri', key, ['out.gdb/Arable'], ['in/inputs.gdb/Arable'])
+
+    # e.g. the output of another stage written in the same geodatabase as the input
+    arcpy.create_table('in/inputs.gdb/Forestry', [('For1calc', 'Double')], [{'For1calc': 1.}], areas=[1.])
+    arcpy._tables['in/inputs.gdb/Pasture']['rows'][0]['pSwFromGw'] = 0.3
+
+    key = stage_key('agri_v2_geoprocessing', 'P', 'location', ['in/inputs.gdb/Arable'])
+    assert StageCheckpoint(checkpoint.manifest).fetch('agri', key) == ('out.gdb/Arable',)
+
+    arcpy._tables['in/inputs.gdb/Arable']['rows'][0]['pSwFromGw'] = 0.5
+    key = stage_key('agri_v2_geoprocessing', 'P', 'location', ['in/inputs.gdb/Arable'])
+    assert StageCheckpoint(checkpoint.manifest).fetch('agri', key) is None
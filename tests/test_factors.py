@@ -0,0 +1,41 @@
+import pytest
+
+from SLAMpy._factors import LandCoverFactors, land_cover_codes
+from SLAMpy._diffuse_land_cover import read_land_cover_factors, calculate_land_cover_load
+
+
+def test_only_codes_of_source_kept():
+    record = {'FactorName': 'P_factors', 'c311': 0.1, 'c312': 0.2, 'c313': 0.3, 'c324': 0.4, 'c321': 9., 'c411': 5.}
+
+    factors = LandCoverFactors.from_record(record, land_cover_codes['forest'])
+
+    assert len(factors) == 4
+    assert '321' not in factors and '411' not in factors
+    assert factors.lookup(['311', '321', '324']).tolist() == [0.1, 0., 0.4]
+
+
+def test_load_calculated_from_factors_of_codes(arcpy):
+    arcpy.create_table('factors', [('FactorName', 'Text'), ('c311', 'Double'), ('c312', 'Double'),
+                                   ('c321', 'Double')],
+                       [{'FactorName': 'N_factors', 'c311': 7., 'c312': 8., 'c321': 9.},
+                        {'FactorName': 'P_factors', 'c311': 0.5, 'c312': 0.25, 'c321': 9.}])
+    codes = ['311', '321', None, '312', '311']
+    arcpy.create_table('out.gdb/Forestry', [('CODE_12', 'Text')], [{'CODE_12': code} for code in codes],
+                       areas=[10000., 20000., 30000., 40000., 50000.])
+
+    factors = read_land_cover_factors('factors', 'P', codes=land_cover_codes['forest'])
+    calculate_land_cover_load('out.gdb/Forestry', 'CODE_12', factors, 'For1calc')
+
+    # the codes without a factor for forestry (e.g. '321' or null) get a load of zero, as before
+    assert arcpy.rows('out.gdb/Forestry', ['Area_ha', 'For1calc']) == [
+        (pytest.approx(1.), pytest.approx(0.5)), (pytest.approx(2.), 0.), (pytest.approx(3.), 0.),
+        (pytest.approx(4.), pytest.approx(1.)), (pytest.approx(5.), pytest.approx(2.5))]
+    assert arcpy.geometry_writes == 0
+
+
+def test_missing_nutrient(arcpy):
+    arcpy.create_table('factors', [('FactorName', 'Text'), ('c311', 'Double')],
+                       [{'FactorName': 'N_factors', 'c311': 7.}])
+
+    with pytest.raises(Exception):
+        read_land_cover_factors('factors', 'P')
@@ -0,0 +1,70 @@
+import pytest
+
+from SLAMpy._fields import calculate_fields, area_ha, product
+from SLAMpy._diffuse_agriculture import agri_v2_geoprocessing
+
+
+class _Silent(object):
+    def addMessage(self, msg):
+        pass
+
+
+def _overlay(arcpy, path):
+    return arcpy.create_table(path, [('pSwFromGw', 'Double'), ('pTotaltoSWreceptor', 'Double')],
+                              [{'pSwFromGw': 0.1, 'pTotaltoSWreceptor': 1.5},
+                               {'pSwFromGw': 0.25, 'pTotaltoSWreceptor': 2.},
+                               {'pSwFromGw': 0., 'pTotaltoSWreceptor': 0.75}],
+                              areas=[12500., 40000., 3.])
+
+
+def _add_field_calculate_field(arcpy, in_table, prefix):
+    # the sequence of the geoprocessing tools used before calculate_fields
+    for field, expression in [("Area_ha", "!shape.area@hectares!"),
+                              ("GW{}2calc".format(prefix), "!pSwFromGw! * !Area_ha!"),
+                              ("{}2calc".format(prefix), "!pTotaltoSWreceptor! * !Area_ha!")]:
+        arcpy.AddField_management(in_table=in_table, field_name=field, field_type="DOUBLE",
+                                  field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
+        arcpy.CalculateField_management(in_table=in_table, field=field, expression=expression,
+                                        expression_type="PYTHON_9.3")
+
+
+def test_single_pass_matches_add_field_calculate_field(arcpy):
+    _overlay(arcpy, 'overlay/Arable')
+    _overlay(arcpy, 'overlay/Pasture')
+    _overlay(arcpy, 'expected/Arable')
+    _overlay(arcpy, 'expected/Pasture')
+    _add_field_calculate_field(arcpy, 'expected/Arable', 'Arab')
+    _add_field_calculate_field(arcpy, 'expected/Pasture', 'Past')
+
+    arcpy.calls[:] = []
+    agri_v2_geoprocessing('Test', 'P', 'location', 'in_arable', 'in_pasture', 'out.gdb', _Silent(),
+                          out_arable='out.gdb/Arable', out_pasture='out.gdb/Pasture',
+                          in_overlay_arable='overlay/Arable', in_overlay_pasture='overlay/Pasture')
+
+    for name, prefix in [('Arable', 'Arab'), ('Pasture', 'Past')]:
+        fields = ['Area_ha', 'GW{}2calc'.format(prefix), '{}2calc'.format(prefix)]
+        for row, expected in zip(arcpy.rows('out.gdb/' + name, fields), arcpy.rows('expected/' + name, fields)):
+            assert row == pytest.approx(expected)
+    # one schema change and one update pass per output, without writing the geometries back
+    assert arcpy.calls == ['CopyFeatures', 'AddFields', 'CopyFeatures', 'AddFields']
+    assert arcpy.geometry_writes == 0
+
+
+def test_geometry_token_refused(arcpy):
+    arcpy.create_table('out.gdb/Arable', [('pSwFromGw', 'Double')], [{'pSwFromGw': 0.1}], areas=[1.])
+
+    with pytest.raises(ValueError):
+        calculate_fields(in_table='out.gdb/Arable', in_fields=['SHAPE@', 'pSwFromGw'],
+                         out_fields=[("GWArab2calc", lambda v: product(v['pSwFromGw'], v['SHAPE@'].area))])
+    assert arcpy.geometry_writes == 0
+
+
+def test_area_in_unit_of_spatial_reference(arcpy, monkeypatch):
+    arcpy.create_table('out.gdb/Arable', [], [{}], areas=[2.])
+    # e.g. a spatial reference in kilometres, where 'SHAPE@AREA' is in square kilometres
+    monkeypatch.setattr(arcpy._SpatialReference, 'metersPerUnit', 1000.)
+
+    calculate_fields(in_table='out.gdb/Arable', in_fields=['SHAPE@AREA'],
+                     out_fields=[("Area_ha", area_ha('out.gdb/Arable'))])
+
+    assert arcpy.rows('out.gdb/Arable', ['Area_ha']) == [(pytest.approx(200.),)]
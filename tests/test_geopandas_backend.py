@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+gpd = pytest.importorskip('geopandas')
+shapely = pytest.importorskip('shapely.geometry')
+
+from SLAMpy._geopandas_backend import summarise_v3_loads
+from SLAMpy._totals import sources_v3, input_fields, calculate_totals
+
+
+class _Silent(object):
+    def addMessage(self, msg):
+        pass
+
+
+def test_summary_totals_match_post_processing():
+    location = gpd.GeoDataFrame({'_basin': ['A', 'B', 'C'], 'AREAKM2': [1., 2., 0.]},
+                                geometry=[shapely.Point(0, 0), shapely.Point(1, 1), shapely.Point(2, 2)])
+    nan = np.nan
+    loads = {
+        'arable': pd.DataFrame({'_basin': ['A', 'B'], 'GWArab2calc': [1., 2.], 'Arab2calc': [10., 20.]}),
+        'pasture': pd.DataFrame({'_basin': ['A', 'C'], 'GWPast2calc': [3., nan], 'Past2calc': [30., 40.]}),
+        'atm_depo': pd.DataFrame({'_basin': ['A'], 'Atm2calc': [0.5]}),
+        'forest': pd.DataFrame({'_basin': ['B'], 'For1calc': [4.]}),
+        'peat': pd.DataFrame({'_basin': ['C'], 'Peat1calc': [5.]}),
+        'urban': pd.DataFrame({'_basin': ['A'], 'Urb1calc': [6.]}),
+        'ipc': pd.DataFrame({'_basin': ['A', 'B'], 'IPInd2calc': [7., nan]}),
+        'sect4': pd.DataFrame({'_basin': ['A', 'B'], 'S4Ind2calc': [8., 9.]}),
+        'dwts': pd.DataFrame({'_basin': ['C'], 'GWSept2calc': [1.], 'Sept2calc': [2.]}),
+        'agglo': pd.DataFrame({'_basin': ['B'], 'Wast3calc': [11.]})
+    }
+
+    summary = summarise_v3_loads('P', location, loads, _Silent())
+
+    # the same engine and the same fields as the arcpy post-processing
+    expected = calculate_totals({name: summary[name].values for name in input_fields(sources_v3)}, sources_v3)
+    for name, values in expected.items():
+        np.testing.assert_allclose(summary[name].values, values, err_msg=name)
+
+    # the load of a source is the first of its fields that is not null, like in the arcpy post-processing
+    np.testing.assert_allclose(summary['Pasture'].values, [3., 0., 40.])
+    np.testing.assert_allclose(summary['Arable'].values, [1., 2., 0.])
+    np.testing.assert_allclose(summary['Industry'].values, [7., 9., 0.])
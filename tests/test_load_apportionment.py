@@ -0,0 +1,170 @@
+from os import sep
+
+import pytest
+
+from SLAMpy import _load_apportionment
+from SLAMpy._cache import StageCheckpoint
+
+
+class _Messages(object):
+    def __init__(self):
+        self.messages = list()
+
+    def addMessage(self, msg):
+        self.messages.append(msg)
+
+
+class _Result(object):
+    def __init__(self, value):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+class _SeparateMemoryPool(object):
+    # stand-in for a pool of processes, running each task in a worker that does not share the memory of its parent
+    def __init__(self, arcpy):
+        self._arcpy = arcpy
+
+    def apply_async(self, function, args):
+        with self._arcpy.separate_memory():
+            return _Result(function(*args))
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+def _scaled_load(project_name, nutrient, location, factor, out_gdb, messages):
+    import arcpy
+    messages.addMessage("> Calculating {} load scaled by {}.".format(nutrient, factor))
+    out_load = sep.join([out_gdb, project_name + '_{}_Scaled{}'.format(nutrient, factor)])
+    values = [row[0] for row in arcpy.da.SearchCursor(location, ['value'])]
+    arcpy.create_table(out_load, [('Load', 'Double')], [{'Load': value * factor} for value in values])
+    return out_load
+
+
+def _stages(location):
+    return [('scaled{}'.format(factor), ['scaled{}'.format(factor)], _scaled_load, ('Test', 'P', location, factor),
+             {}) for factor in (1, 2, 3)]
+
+
+def _run(arcpy, monkeypatch, location, processes):
+    messages, completed = _Messages(), list()
+    monkeypatch.setattr(_load_apportionment, '_process_pool', lambda processes: _SeparateMemoryPool(arcpy))
+
+    def completed_stage(name, categories, args, stage_outputs):
+        completed.append((name, stage_outputs))
+
+    stages = _stages(location)
+    if processes > 1:
+        _load_apportionment._run_stages_in_parallel('Test', stages, 'out/output.gdb', messages, processes,
+                                                    completed_stage)
+    else:
+        for name, categories, function, args, kwargs in stages:
+            completed_stage(name, categories, args,
+                            _load_apportionment._as_tuple(function(*(args + ('out/output.gdb', messages)))))
+
+    results = dict((name, arcpy.rows(outputs[0], ['Load'])) for name, outputs in completed)
+    return completed, results, messages.messages
+
+
+@pytest.mark.parametrize('location', ['in/inputs.gdb/Location', 'in_memory/Location'])
+def test_parallel_matches_sequential(arcpy, monkeypatch, location):
+    arcpy.CreateFileGDB_management('out', 'output.gdb')
+    arcpy.create_table(location, [('value', 'Double')], [{'value': 1.5}, {'value': 4.}], areas=[1., 2.])
+
+    sequential = _run(arcpy, monkeypatch, location, processes=1)
+    for name, outputs in sequential[0]:
+        arcpy.Delete_management(outputs[0])
+    del arcpy.calls[:]
+    parallel = _run(arcpy, monkeypatch, location, processes=3)
+
+    # same outputs (under the same names in the output geodatabase), results, and messages in the order of the stages
+    assert parallel[0] == sequential[0]
+    assert parallel[1] == sequential[1]
+    assert parallel[2][1:] == sequential[2]
+
+    # the location kept in memory is copied on disk once before the workers read it, and deleted afterwards
+    assert arcpy.calls.count('Copy') == 3 + (1 if location.startswith('in_memory') else 0)
+    assert not any(path.startswith('out/Test_shared_scratch.gdb') for path in arcpy._tables)
+    assert not arcpy.Exists('out/Test_shared_scratch.gdb')
+    assert arcpy.Exists(location)
+
+
+def test_in_memory_not_readable_by_workers(arcpy, monkeypatch):
+    arcpy.CreateFileGDB_management('out', 'output.gdb')
+    arcpy.create_table('in_memory/Location', [('value', 'Double')], [{'value': 1.5}], areas=[1.])
+    # i.e. without the copies on disk, the workers cannot find the location
+    monkeypatch.setattr(_load_apportionment, '_on_disk', lambda value, shared_gdb, copies: value)
+
+    with pytest.raises(RuntimeError):
+        _run(arcpy, monkeypatch, 'in_memory/Location', processes=3)
+
+
+_source_functions = [('agri_v2_geoprocessing', ['arable', 'pasture']), ('atmos_v2_geoprocessing', ['atm_depo']),
+                     ('_land_cover_sources_v1_geoprocessing', ['forest', 'peat', 'urban']),
+                     ('industry_v2_geoprocessing', ['ipc', 'sect4']), ('septic_v2_geoprocessing', ['dwts']),
+                     ('wastewater_v3_geoprocessing', ['agglo'])]
+
+
+def _fake_sources(arcpy, monkeypatch, calls, failing=None):
+    # stand-ins for the source tools, recording their calls, where the failing one raises
+    def fake(function_name, categories):
+        def function(project_name, nutrient, location, *args, **kwargs):
+            out_gdb = args[-2]
+            calls.append(function_name)
+            if function_name == failing:
+                raise RuntimeError("ERROR 999999: Error executing function.")
+            outputs = tuple(arcpy.create_table(sep.join([out_gdb, '{}_{}_{}'.format(project_name, nutrient, c)]),
+                                               [('Load', 'Double')], [{'Load': 1.}], areas=[1.])
+                            for c in categories)
+            return outputs if len(outputs) > 1 else outputs[0]
+        function.__name__ = function_name
+        return function
+
+    for function_name, categories in _source_functions:
+        monkeypatch.setattr(_load_apportionment, function_name, fake(function_name, categories))
+
+
+def _run_v3(checkpoint, resume):
+    inputs = ['in/inputs.gdb/{}'.format(name) for name in ('Arable', 'Pasture', 'AtmDepo', 'LandCover')] + \
+        ['in/factors.xlsx/Corine_P$'] + \
+        ['in/inputs.gdb/{}'.format(name) for name in ('IPC', 'Sect4', 'Septic', 'Agglo')] + ['pt_cd']
+    existing = [None] * 10
+    return _load_apportionment.load_apportionment_v3_geoprocessing(
+        *(['Test', 'P', 'in/inputs.gdb/Location', 'CODE_12'] + inputs + existing + ['out/output.gdb', _Messages()]),
+        checkpoint=checkpoint, resume=resume)
+
+
+def test_resume_after_failed_stage(arcpy, monkeypatch, tmpdir):
+    arcpy.CreateFileGDB_management('out', 'output.gdb')
+    arcpy.CreateFileGDB_management('in', 'inputs.gdb')
+    for name in ('Location', 'Arable', 'Pasture', 'AtmDepo', 'LandCover', 'IPC', 'Sect4', 'Septic', 'Agglo'):
+        arcpy.create_table('in/inputs.gdb/' + name, [('value', 'Double')], [{'value': 1.}], areas=[1.])
+    arcpy.create_table('in/factors.xlsx/Corine_P$', [('c311', 'Double')], [{'c311': 1.}])
+    manifest = str(tmpdir.join('checkpoint.json'))
+
+    # the run fails at the industry stage, after the stages before it were completed and recorded
+    calls = list()
+    _fake_sources(arcpy, monkeypatch, calls, failing='industry_v2_geoprocessing')
+    with pytest.raises(RuntimeError):
+        _run_v3(StageCheckpoint(manifest), resume=False)
+    assert calls == [name for name, categories in _source_functions[:4]]
+
+    # the run resumed only runs the stages not completed (with a new checkpoint read from the manifest)
+    calls = list()
+    _fake_sources(arcpy, monkeypatch, calls)
+    outputs = _run_v3(StageCheckpoint(manifest), resume=True)
+    assert calls == [name for name, categories in _source_functions[3:]]
+    assert outputs == tuple('out/output.gdb/Test_P_{}'.format(category)
+                            for name, categories in _source_functions for category in categories)
+
+    # the stages whose input changed since are run again
+    del calls[:]
+    arcpy._tables['in/inputs.gdb/AtmDepo']['rows'][0]['value'] = 2.
+    _run_v3(StageCheckpoint(manifest), resume=True)
+    assert calls == ['atmos_v2_geoprocessing']
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from SLAMpy._post_processing import calculate_totals_in_table
+from SLAMpy._totals import sources_v2, sources_v3, input_fields, calculate_totals
+
+
+def _summary(arcpy, sources, records):
+    fields = input_fields(sources)
+    arcpy.create_table('out.gdb/Summary', [('EU_CD', 'Text')] + [(name, 'Double') for name in fields], records,
+                       areas=[1.] * len(records))
+    return fields
+
+
+@pytest.mark.parametrize('sources', [sources_v3, sources_v2])
+def test_totals_in_table_match_calculate_totals(arcpy, sources):
+    fields = input_fields(sources)
+    random = np.random.RandomState(42)
+    records = list()
+    for i in range(20):
+        # about a third of the summary fields are null (i.e. no feature of the source in the sub-region)
+        record = dict((name, None if random.rand() < 0.3 else float(random.rand() * 100)) for name in fields)
+        record['EU_CD'] = 'IE_{:02d}'.format(i)
+        records.append(record)
+    records.append(dict([(name, None) for name in fields], AREAKM2=0., EU_CD='IE_null'))
+    _summary(arcpy, sources, records)
+
+    totals = calculate_totals_in_table('out.gdb/Summary', sources, index_field='EU_CD')
+
+    expected = calculate_totals(dict((name, [np.nan if r[name] is None else r[name] for r in records])
+                                     for name in fields), sources)
+    written = arcpy.rows('out.gdb/Summary', list(expected))
+    for j, (name, values) in enumerate(expected.items()):
+        np.testing.assert_allclose(totals[name], values, err_msg=name)
+        np.testing.assert_allclose([row[j] for row in written], values, err_msg=name)
+    assert totals['EU_CD'].tolist() == [r['EU_CD'] for r in records]
+
+    # the sub-region without any source has all its calculated fields at zero (rather than null)
+    assert written[-1] == tuple([0.] * len(expected))
+
+
+def test_source_falls_back_to_second_field_only_if_first_is_null(arcpy):
+    fields = input_fields(sources_v3)
+    records = [dict([(name, None) for name in fields], AREAKM2=1., EU_CD='IE_1', SUM_GWPast2calc=2., SUM_Past2calc=5.),
+               dict([(name, None) for name in fields], AREAKM2=1., EU_CD='IE_2', SUM_Past2calc=5.)]
+    _summary(arcpy, sources_v3, records)
+
+    totals = calculate_totals_in_table('out.gdb/Summary', sources_v3)
+
+    assert totals['Pasture'].tolist() == [2., 5.]
+    assert arcpy.rows('out.gdb/Summary', ['Pasture', 'Total']) == [(2., 2.), (5., 5.)]
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from SLAMpy.scenario import Scenario
+
+
+def test_scope_only_applies_to_its_thread():
+    outside = Scenario('Registry', 'P')
+    errors, ready, done = list(), threading.Event(), threading.Event()
+
+    def other_thread():
+        # the scope opened by the main thread does not release the name for the other threads
+        ready.wait()
+        try:
+            Scenario('Registry', 'P')
+        except RuntimeError as error:
+            errors.append(error)
+        done.set()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    with Scenario.registry_scope() as registry:
+        inside = Scenario('Registry', 'P')
+        assert 'Registry' in registry
+        ready.set()
+        done.wait()
+    thread.join()
+
+    assert len(errors) == 1
+    with pytest.raises(RuntimeError):
+        Scenario('Registry', 'P')
+    del outside, inside
+
+
+def test_scopes_opened_concurrently():
+    names, errors = list(), list()
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        with Scenario.registry_scope():
+            scenarios = [Scenario('Scoped{}'.format(j), 'P') for j in range(100)]
+            barrier.wait()
+            names.append(sorted(scenario.name for scenario in scenarios))
+            try:
+                Scenario('Scoped0', 'P')
+            except RuntimeError as error:
+                errors.append(error)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(names) == 8 and len(errors) == 8
+    assert 'Scoped0' not in Scenario._registry
+
+
+def test_same_name_in_several_threads():
+    created, errors = list(), list()
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        try:
+            created.append(Scenario('Shared', 'P'))
+        except RuntimeError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1 and len(errors) == 7
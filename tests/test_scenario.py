@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from SLAMpy.scenario import Scenario
+
+
+def _scenario(basins):
+    scenario = Scenario('Test', 'P')
+    scenario._set_load_values(np.arange(len(basins) * 9, dtype=float).reshape(len(basins), 9), basins)
+    scenario.areas = pd.DataFrame({'area': np.arange(len(basins), dtype=float) + 1.}, index=scenario.basins)
+    return scenario
+
+
+def test_parquet_basins_in_requested_order(tmpdir):
+    pytest.importorskip('pyarrow')
+    scenario = _scenario(['IE_1', 'IE_2', 'IE_3', 'IE_4'])
+    file_path = scenario.write_to_parquet(str(tmpdir))
+
+    read = Scenario.read_from_parquet(file_path, basins=['IE_4', 'IE_1', 'IE_3'], name='Read')
+
+    assert list(read.basins) == ['IE_4', 'IE_1', 'IE_3']
+    np.testing.assert_array_equal(read._load_values, scenario._load_values[[3, 0, 2]])
+    assert read.areas['area'].tolist() == [4., 1., 3.]
+
+
+def test_parquet_missing_basins(tmpdir):
+    pytest.importorskip('pyarrow')
+    file_path = _scenario(['IE_1', 'IE_2']).write_to_parquet(str(tmpdir))
+
+    with pytest.raises(KeyError) as error:
+        Scenario.read_from_parquet(file_path, basins=['IE_2', 'IE_5'], name='Read')
+    assert 'IE_5' in str(error.value)
+
+
+def test_basin_fingerprint_same_in_all_processes():
+    code = "import numpy as np; from SLAMpy.scenario import Scenario; s = Scenario('Test', 'P'); " \
+           "s._set_load_values(np.zeros((3, 9)), ['IE_2', 'IE_1', 'IE_3']); print(s.basin_fingerprint)"
+    root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    fingerprints = set()
+    for seed in ('1', '2'):
+        environment = dict(os.environ, PYTHONHASHSEED=seed)
+        fingerprints.add(subprocess.check_output([sys.executable, '-c', code], cwd=root, env=environment))
+    assert len(fingerprints) == 1
+
+    scenario = _scenario(['IE_1', 'IE_2', 'IE_3'])
+    assert repr(scenario.basin_fingerprint).encode('utf-8') in fingerprints.pop()
@@ -0,0 +1,66 @@
+import pytest
+
+from SLAMpy import scenario as scenario_module
+from SLAMpy.scenario import ScenarioV3
+
+from test_load_apportionment import _fake_sources
+
+
+def _inputs(in_dwts):
+    return dict(in_arable='in/inputs.gdb/Arable', in_pasture='in/inputs.gdb/Pasture',
+                in_atm_depo='in/inputs.gdb/AtmDepo', in_land_cover='in/inputs.gdb/LandCover', in_lc_field='CODE_12',
+                in_factors='in/factors.xlsx/Corine_P$', in_ipc='in/inputs.gdb/IPC', in_sect4='in/inputs.gdb/Sect4',
+                in_dwts=in_dwts, in_agglo='in/inputs.gdb/Agglo', in_uww_field='pt_cd')
+
+
+@pytest.fixture
+def scenario(arcpy, monkeypatch):
+    arcpy.CreateFileGDB_management('out', 'output.gdb')
+    arcpy.CreateFileGDB_management('in', 'inputs.gdb')
+    for name in ('Region', 'Arable', 'Pasture', 'AtmDepo', 'LandCover', 'IPC', 'Sect4', 'Septic', 'Septic2',
+                 'Agglo'):
+        arcpy.create_table('in/inputs.gdb/' + name, [('value', 'Double')], [{'value': 1.}], areas=[1.])
+    arcpy.create_table('in/factors.xlsx/Corine_P$', [('c311', 'Double')], [{'c311': 1.}])
+
+    # stand-ins for the source tools, the summary, and the post-processing, writing in the output geodatabase
+    _fake_sources(arcpy, monkeypatch, list())
+
+    def summary(project_name, nutrient, location, sort_field, out_gdb, *args):
+        return arcpy.create_table(out_gdb + '/{}_{}_Summary'.format(project_name, nutrient), [], [{}], areas=[1.])
+
+    monkeypatch.setattr(scenario_module, 'load_apportionment_v3_stats_and_summary', summary)
+    monkeypatch.setattr(scenario_module, 'postprocessing_v3_geoprocessing', lambda *args, **kwargs: dict())
+    with ScenarioV3.registry_scope():
+        scenario = ScenarioV3('Graph', 'P', 'EU_CD', 'in/inputs.gdb/Region')
+        monkeypatch.setattr(scenario, '_set_from_task_graph', lambda *args: None)
+        yield scenario
+
+
+def test_only_affected_tasks_stale(arcpy, scenario):
+    graph = scenario.task_graph('out/output.gdb', **_inputs('in/inputs.gdb/Septic'))
+    assert graph.stale() == list(graph.keys())
+    graph.run()
+
+    # the outputs written in the output geodatabase by the first run do not affect the keys of the tasks
+    graph = scenario.task_graph('out/output.gdb', **_inputs('in/inputs.gdb/Septic'))
+    assert graph.stale() == []
+
+    # another input for the septic tank systems only affects their tool and the tasks downstream of it
+    graph = scenario.task_graph('out/output.gdb', **_inputs('in/inputs.gdb/Septic2'))
+    assert graph.stale() == ['dwts', 'summary', 'postprocessing', 'loads']
+    graph.run()
+
+    # and so does a change in the content of that input
+    arcpy._tables['in/inputs.gdb/Septic2']['rows'][0]['value'] = 2.
+    graph = scenario.task_graph('out/output.gdb', **_inputs('in/inputs.gdb/Septic2'))
+    assert graph.stale() == ['dwts', 'summary', 'postprocessing', 'loads']
+
+
+def test_keys_independent_of_workspaces(arcpy, scenario):
+    keys = scenario.task_graph('out/output.gdb', **_inputs('in/inputs.gdb/Septic')).keys()
+
+    arcpy.CreateFileGDB_management('scratch', 'scratch.gdb')
+    other = scenario.task_graph('out/output.gdb', scratch_workspace='scratch/scratch.gdb',
+                                **_inputs('in/inputs.gdb/Septic')).keys()
+
+    assert other == keys